@@ -12,6 +12,7 @@ Features:
 import json
 import os
 import re
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
@@ -122,6 +123,9 @@ class CacheManager:
         # Create directories if they don't exist
         self.ticker_cache_dir.mkdir(parents=True, exist_ok=True)
         
+        # Guards metadata and metadata.json when fetches run on worker threads
+        self._lock = threading.Lock()
+        
         # Load or initialize metadata
         self.metadata = self._load_metadata()
     
@@ -143,10 +147,24 @@ class CacheManager:
             'api_calls_saved': 0,
         }
     
+    @staticmethod
+    def _write_json_atomic(path: Path, data: Dict):
+        """Write JSON to a sibling .tmp file, then swap it into place."""
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    
+    def _bump(self, **counts):
+        """Add to metadata counters (cache_hits, cache_misses, ...) under the lock."""
+        with self._lock:
+            for key, n in counts.items():
+                self.metadata[key] = self.metadata.get(key, 0) + n
+    
     def _save_metadata(self):
         """Save cache metadata."""
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.metadata, f, indent=2)
+        with self._lock:
+            self._write_json_atomic(self.metadata_file, self.metadata)
     
     def _get_cache_path(self, ticker: str) -> Path:
         """Get cache file path for a ticker."""
@@ -170,7 +188,7 @@ class CacheManager:
         cache_path = self._get_cache_path(ticker)
         
         if not cache_path.exists():
-            self.metadata['cache_misses'] = self.metadata.get('cache_misses', 0) + 1
+            self._bump(cache_misses=1)
             return None
         
         try:
@@ -182,12 +200,11 @@ class CacheManager:
             age = datetime.now() - cached_time
             
             if age > timedelta(hours=max_age_hours):
-                self.metadata['cache_misses'] = self.metadata.get('cache_misses', 0) + 1
+                self._bump(cache_misses=1)
                 return None
             
             # Cache hit!
-            self.metadata['cache_hits'] = self.metadata.get('cache_hits', 0) + 1
-            self.metadata['api_calls_saved'] = self.metadata.get('api_calls_saved', 0) + 6  # 6 calls per ticker
+            self._bump(cache_hits=1, api_calls_saved=6)  # 6 calls per ticker
             
             return cached
             
@@ -209,11 +226,12 @@ class CacheManager:
         data['_cached_at'] = datetime.now().isoformat()
         data['_ticker_normalized'] = normalized
         
-        with open(cache_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        self._write_json_atomic(cache_path, data)
         
         # Update metadata
-        self.metadata['total_tickers'] = len(list(self.ticker_cache_dir.glob('*.json')))
+        total = len(list(self.ticker_cache_dir.glob('*.json')))
+        with self._lock:
+            self.metadata['total_tickers'] = total
         self._save_metadata()
     
     def invalidate(self, ticker: str):
@@ -221,21 +239,24 @@ class CacheManager:
         cache_path = self._get_cache_path(ticker)
         if cache_path.exists():
             cache_path.unlink()
-            self.metadata['total_tickers'] = len(list(self.ticker_cache_dir.glob('*.json')))
+            total = len(list(self.ticker_cache_dir.glob('*.json')))
+            with self._lock:
+                self.metadata['total_tickers'] = total
             self._save_metadata()
     
     def clear_all(self):
         """Clear entire cache."""
         for cache_file in self.ticker_cache_dir.glob('*.json'):
             cache_file.unlink()
-        self.metadata = {
-            'created': datetime.now().isoformat(),
-            'last_refresh': None,
-            'total_tickers': 0,
-            'cache_hits': 0,
-            'cache_misses': 0,
-            'api_calls_saved': 0,
-        }
+        with self._lock:
+            self.metadata = {
+                'created': datetime.now().isoformat(),
+                'last_refresh': None,
+                'total_tickers': 0,
+                'cache_hits': 0,
+                'cache_misses': 0,
+                'api_calls_saved': 0,
+            }
         self._save_metadata()
     
     def get_stats(self) -> Dict:
@@ -279,7 +300,8 @@ class CacheManager:
     
     def mark_refresh_complete(self):
         """Mark that a batch refresh has completed."""
-        self.metadata['last_refresh'] = datetime.now().isoformat()
+        with self._lock:
+            self.metadata['last_refresh'] = datetime.now().isoformat()
         self._save_metadata()
 
 
@@ -289,16 +311,20 @@ class CachedFMPFetcher:
     Wraps the existing FMPDataFetcher with cache lookup.
     """
     
-    def __init__(self, cache_dir: str = None):
+    def __init__(self, cache_dir: str = None, calls_per_minute: Optional[int] = None):
         self.cache = CacheManager(cache_dir)
         self._fetcher = None  # Lazy load FMP fetcher
+        self._calls_per_minute = calls_per_minute
+        self._fetcher_lock = threading.Lock()
     
     @property
     def fetcher(self):
-        """Lazy load the FMP fetcher."""
+        """Lazy load the FMP fetcher (once, even if worker threads race here)."""
         if self._fetcher is None:
-            from fmp_data import FinancialDataProcessor
-            self._fetcher = FinancialDataProcessor()
+            with self._fetcher_lock:
+                if self._fetcher is None:
+                    from fmp_data import FinancialDataProcessor
+                    self._fetcher = FinancialDataProcessor(calls_per_minute=self._calls_per_minute)
         return self._fetcher
     
     def get_ticker_data(self, ticker: str, force_refresh: bool = False, use_ttm: bool = False) -> Optional[Dict]:
@@ -30,6 +30,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
 import pandas as pd
+from table_io import HAS_PYARROW, artifact_path, read_table
 
 
 class DataPipelineManager:
@@ -180,6 +181,11 @@ class DataPipelineManager:
     def get_cached_valuations(self) -> Optional[pd.DataFrame]:
         """Get cached valuations without API call."""
         val_file = self.cache_dir / "weekly_valuations.csv"
+        # Tier 3 writes a typed Parquet copy next to the CSV when pyarrow is installed
+        parquet_file = Path(artifact_path(val_file, "parquet"))
+        if (HAS_PYARROW and parquet_file.exists() and val_file.exists()
+                and parquet_file.stat().st_mtime >= val_file.stat().st_mtime):
+            return read_table(str(parquet_file))
         if val_file.exists():
             return pd.read_csv(val_file)
         return None
@@ -4,11 +4,21 @@ Uses FMP stable API endpoints with currency conversion
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from config import FMP_API_KEY
 
+try:
+    import requests_cache
+    HAS_REQUESTS_CACHE = True
+except ImportError:
+    HAS_REQUESTS_CACHE = False
+
 # Exchange rates to USD (update periodically)
 EXCHANGE_RATES_TO_USD = {
     "USD": 1.0,
@@ -39,10 +49,43 @@ def convert_to_usd(value, currency):
 
 
 class FMPDataFetcher:
-    def __init__(self, api_key: str = FMP_API_KEY):
+    def __init__(self, api_key: str = FMP_API_KEY, http_cache: Optional[str] = None,
+                 calls_per_minute: Optional[int] = None):
         self.api_key = api_key
         self.base_url = "https://financialmodelingprep.com/stable"
         self.request_delay = 0.15
+        # With calls_per_minute, call starts are spaced across every thread
+        # sharing this fetcher instead of sleeping request_delay after each call
+        self.min_interval = 60 / calls_per_minute if calls_per_minute else None
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+        # One pooled keep-alive session so calls reuse TCP/TLS connections.
+        # Given http_cache (and requests-cache installed), GETs are also served
+        # from that sqlite file for 24h, keyed without the apikey.
+        if http_cache and HAS_REQUESTS_CACHE:
+            self.session = requests_cache.CachedSession(
+                http_cache,
+                backend="sqlite",
+                expire_after=timedelta(hours=24),
+                allowable_methods=["GET"],
+                ignored_parameters=["apikey"],
+            )
+        else:
+            self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=64,
+            pool_maxsize=64,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504]),
+        ))
+    
+    def _wait_for_slot(self):
+        """Block until this call may start under the calls_per_minute budget."""
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
         
     def _make_request(self, endpoint: str, params: Dict = None):
         if params is None:
@@ -50,9 +93,12 @@ class FMPDataFetcher:
         params["apikey"] = self.api_key
         url = f"{self.base_url}/{endpoint}"
         try:
-            response = requests.get(url, params=params, timeout=30)
+            if self.min_interval:
+                self._wait_for_slot()
+            response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            time.sleep(self.request_delay)
+            if not self.min_interval and not getattr(response, "from_cache", False):
+                time.sleep(self.request_delay)
             return response.json()
         except Exception as e:
             print(f"  API error for {endpoint}: {e}")
@@ -111,7 +157,9 @@ class FMPDataFetcher:
         """Get insider ownership percentage - uses v4 endpoint"""
         url = f"{self.base_url}/v4/institutional-ownership/symbol-ownership?symbol={ticker}&apikey={self.api_key}"
         try:
-            response = requests.get(url)
+            if self.min_interval:
+                self._wait_for_slot()
+            response = self.session.get(url, timeout=30)
             if response.status_code == 200:
                 return response.json()
         except:
@@ -122,7 +170,9 @@ class FMPDataFetcher:
         """Get recent insider transactions"""
         url = f"{self.base_url}/v4/insider-trading?symbol={ticker}&limit={limit}&apikey={self.api_key}"
         try:
-            response = requests.get(url)
+            if self.min_interval:
+                self._wait_for_slot()
+            response = self.session.get(url, timeout=30)
             if response.status_code == 200:
                 return response.json()
         except:
@@ -131,26 +181,35 @@ class FMPDataFetcher:
 
 
 class FinancialDataProcessor:
-    def __init__(self):
-        self.fetcher = FMPDataFetcher()
+    def __init__(self, http_cache: Optional[str] = None, calls_per_minute: Optional[int] = None):
+        self.fetcher = FMPDataFetcher(http_cache=http_cache, calls_per_minute=calls_per_minute)
     
-    def get_all_metrics(self, ticker, use_ttm=False):
+    def get_all_metrics(self, ticker, use_ttm=False, verbose=True):
         ttm_label = " (TTM)" if use_ttm else ""
-        print(f"  Fetching data for {ticker}{ttm_label}...", end=" ")
+        if verbose:
+            print(f"  Fetching data for {ticker}{ttm_label}...", end=" ")
         metrics = {"ticker": ticker, "fetch_date": datetime.now().isoformat(), "data_quality": "complete"}
         
         try:
-            profile = self.fetcher.get_company_profile(ticker)
-            income_stmts = self.fetcher.get_income_statement(ticker, limit=4)
-            balance_sheets = self.fetcher.get_balance_sheet(ticker, limit=4)
-            cash_flows = self.fetcher.get_cash_flow(ticker, limit=4)
-            key_metrics = self.fetcher.get_key_metrics(ticker, limit=4)
-            
-            # Insider data for alignment score
-            insider_trading = self.fetcher.get_insider_trading(ticker, limit=100)
+            # Independent endpoints - fan out so latency is the slowest call, not the sum
+            with ThreadPoolExecutor(max_workers=6) as ex:
+                f_profile = ex.submit(self.fetcher.get_company_profile, ticker)
+                f_income = ex.submit(self.fetcher.get_income_statement, ticker, limit=4)
+                f_balance = ex.submit(self.fetcher.get_balance_sheet, ticker, limit=4)
+                f_cash = ex.submit(self.fetcher.get_cash_flow, ticker, limit=4)
+                f_metrics = ex.submit(self.fetcher.get_key_metrics, ticker, limit=4)
+                # Insider data for alignment score
+                f_insider = ex.submit(self.fetcher.get_insider_trading, ticker, limit=100)
+            profile = f_profile.result()
+            income_stmts = f_income.result()
+            balance_sheets = f_balance.result()
+            cash_flows = f_cash.result()
+            key_metrics = f_metrics.result()
+            insider_trading = f_insider.result()
             
             if not all([profile, income_stmts, balance_sheets, cash_flows, key_metrics]):
-                print("Missing data")
+                if verbose:
+                    print("Missing data")
                 metrics["data_quality"] = "incomplete"
                 return metrics
             
@@ -737,10 +796,12 @@ class FinancialDataProcessor:
                 metrics["alignment_emoji"] = "🔴"
                 metrics["mgmt_aligned"] = False
             
-            print("OK")
+            if verbose:
+                print("OK")
             
         except Exception as e:
-            print(f"Error: {e}")
+            if verbose:
+                print(f"Error: {e}")
             metrics["data_quality"] = "error"
         
         return metrics
@@ -5,22 +5,32 @@ Runs all 6 IRR models independently on a set of tickers.
 Reads from cache/raw/ (zero API calls).
 """
 
+import hashlib
 import json
 import math
+import pickle
 from pathlib import Path
 
+import numpy as np
+
 PROJECT_DIR = Path(__file__).parent
 RAW_DIR = PROJECT_DIR / "cache" / "raw"
+EXTRACTED_DIR = PROJECT_DIR / "cache" / "extracted"
+RAW_SUFFIXES = ("profile", "income", "cashflow", "balance", "metrics")
 
 # ─── Helpers ───
 
-def load_json(ticker, suffix):
+def raw_path(ticker, suffix):
     aliases = {"income-statement":"income","cash-flow-statement":"cashflow",
                "balance-sheet-statement":"balance","income":"income-statement",
                "cashflow":"cash-flow-statement","balance":"balance-sheet-statement"}
     p = RAW_DIR / f"{ticker}_{suffix}.json"
     if not p.exists() and suffix in aliases:
         p = RAW_DIR / f"{ticker}_{aliases[suffix]}.json"
+    return p
+
+def load_json(ticker, suffix):
+    p = raw_path(ticker, suffix)
     if not p.exists():
         return None
     with open(p) as f:
@@ -250,20 +260,80 @@ def extract_all(ticker):
         "shares_series": shares_s, "nopat_series": nopat_s,
     }
 
+def extract_all_cached(ticker):
+    """extract_all(), memoized to cache/extracted/ keyed by raw JSON mtimes.
+
+    Any change to a source file (or one appearing/disappearing) changes the
+    key, so stale entries are simply never read again.
+    """
+    mtimes = []
+    for suffix in RAW_SUFFIXES:
+        p = raw_path(ticker, suffix)
+        mtimes.append(p.stat().st_mtime_ns if p.exists() else None)
+    key = hashlib.sha1(repr((ticker, tuple(mtimes))).encode()).hexdigest()
+    cache_file = EXTRACTED_DIR / f"{ticker}_{key[:16]}.pkl"
+
+    if cache_file.exists():
+        try:
+            with open(cache_file, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    d = extract_all(ticker)
+    try:
+        EXTRACTED_DIR.mkdir(parents=True, exist_ok=True)
+        for old in EXTRACTED_DIR.glob(f"{ticker}_*.pkl"):
+            old.unlink()
+        with open(cache_file, "wb") as f:
+            pickle.dump(d, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError:
+        pass
+    return d
+
 # ─── IRR Solver ───
 
 def solve_irr(price, cash_flows, terminal_value, n=None):
-    """Binary search for IRR given initial price, annual CFs, and terminal value."""
+    """IRR given initial price, annual CFs, and terminal value.
+
+    Solves price = sum(cf_t * v^t) + TV * v^n for v = 1/(1+r) with np.roots
+    (one companion-matrix eigensolve). Falls back to bisection unless exactly
+    one real root lands inside the bisection bracket (-30%, 150%), so
+    out-of-band and multi-root cases keep the old answer.
+    """
     if n is None:
         n = len(cash_flows)
     if price <= 0:
         return None
 
+    # Coefficients of v^n .. v^0 (highest degree first)
+    coeffs = [0.0] * (n + 1)
+    for t, cf in enumerate(cash_flows):
+        coeffs[n - (t + 1)] += cf
+    coeffs[0] += terminal_value
+    coeffs[n] -= price
+
+    if coeffs[0] != 0:
+        roots = np.roots(coeffs)
+        real = roots.real[(np.abs(roots.imag) <= 1e-9 * np.abs(roots)) & (roots.real > 0)]
+        irrs = [1 / v - 1 for v in real if -0.30 < 1 / v - 1 < 1.50]
+        if len(irrs) == 1:
+            return float(irrs[0])
+
+    return _solve_irr_bisect(price, cash_flows, terminal_value, n)
+
+def _solve_irr_bisect(price, cash_flows, terminal_value, n):
+    """Binary search for IRR given initial price, annual CFs, and terminal value."""
     lo, hi = -0.30, 1.50
     for _ in range(200):
         mid = (lo + hi) / 2
-        pv = sum(cf / (1 + mid) ** (t + 1) for t, cf in enumerate(cash_flows))
-        pv += terminal_value / (1 + mid) ** n
+        base = 1.0 + mid
+        factor = base
+        pv = 0.0
+        for cf in cash_flows:
+            pv += cf / factor
+            factor *= base
+        pv += terminal_value / base ** n
         if pv > price:
             lo = mid
         else:
@@ -389,7 +459,7 @@ def run_comparison(tickers):
     growth_keys = ["sbc_adj_cagr", "fcf_ps_cagr", "nopat_ps_cagr", "rev_ps_cagr", "eps_cagr"]
 
     for ticker in tickers:
-        d = extract_all(ticker)
+        d = extract_all_cached(ticker)
         if d.get("error"):
             print(f"\n{'='*100}")
             print(f"  {ticker}: {d['error']}")
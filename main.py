@@ -13,6 +13,10 @@ Based on Investment Charter v1.0 (January 26, 2026)
 """
 
 import argparse
+import functools
+import heapq
+import os
+import numpy as np
 import pandas as pd
 import json
 from datetime import datetime
@@ -20,34 +24,86 @@ from pathlib import Path
 
 from config import OUTPUT_CONFIG
 from fmp_data import fetch_universe_data, FinancialDataProcessor
-from tier1_filter import run_tier1_filter, Tier1Filter
-from tier2_scorer import run_tier2_scoring, Tier2Scorer
-from tier3_valuation import run_tier3_valuation, DCFValuation
+from tier1_filter import run_tier1_filter_df, Tier1Filter
+from tier2_scorer import run_tier2_scoring_df, Tier2Scorer
+from tier3_valuation import run_tier3_valuation_df, DCFValuation
+from table_io import FORMATS, artifact_path, csv_engine, write_table
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Dashboard numeric fields, coerced column-wide before the per-company loop
+DASHBOARD_FLOAT_COLS = [
+    "incremental_roic", "roic_current", "revenue_growth_3y", "fcf_conversion",
+    "gross_margin", "net_debt_ebitda",
+    "current_price", "intrinsic_value", "implied_irr", "margin_of_safety",
+    "buy_15_price", "buy_12_price", "buy_10_price",
+]
+DASHBOARD_SCORE_COLS = [
+    "total_score", "score_incremental_roic", "score_reinvestment_runway",
+    "score_revenue_growth", "score_fcf_conversion", "score_gross_margin_trend",
+    "score_capex_efficiency",
+]
+
+
+def write_json(path, data) -> None:
+    """
+    Write data as indented JSON (orjson when installed, stdlib json otherwise).
+    
+    Goes through a sibling .tmp file and os.replace so a run killed mid-write
+    never leaves a truncated file for the dashboard to read.
+    """
+    tmp = f"{path}.tmp"
+    if HAS_ORJSON:
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(
+                data,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+                default=str,
+            ))
+    else:
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2, default=str)
+    os.replace(tmp, path)
 
 
 def load_universe(source: str) -> list:
-    """Load ticker universe from CSV file."""
-    df = pd.read_csv(source)
+    """Load ticker universe from CSV file (memoized until the file changes)."""
+    return list(_load_universe_cached(str(source), os.stat(source).st_mtime_ns))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_universe_cached(source: str, mtime_ns: int) -> tuple:
+    """Parse the ticker column; mtime_ns is only part of the cache key."""
+    ticker_cols = ["Ticker", "ticker", "Symbol", "symbol", "TICKER"]
+    
+    # Only parse the candidate ticker columns, not every field of a wide CSV
+    header = pd.read_csv(source, nrows=0).columns
+    df = pd.read_csv(source, usecols=[c for c in ticker_cols if c in header], engine=csv_engine(source))
     
     # Find ticker column
-    ticker_cols = ["Ticker", "ticker", "Symbol", "symbol", "TICKER"]
     for col in ticker_cols:
         if col in df.columns:
             tickers = df[col].dropna().tolist()
             # Clean tickers (remove .TO, .V suffixes for FMP)
             tickers = [t.split(".")[0] if "." in t else t for t in tickers]
-            return tickers
+            return tuple(tickers)
     
     raise ValueError(f"No ticker column found. Expected one of: {ticker_cols}")
 
 
-def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
+def run_full_pipeline(tickers: list, output_dir: str = ".", fmt: str = "csv") -> dict:
     """
     Run the complete three-tier pipeline.
     
     Args:
         tickers: List of ticker symbols to screen
         output_dir: Directory to save output files
+        fmt: Intermediate artifact format ("csv" or "parquet"); the Top 20
+             buy list is always CSV
     
     Returns:
         Dict with summary statistics
@@ -55,19 +111,29 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     start_time = datetime.now()
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
+    uni_size = len(tickers)
+    
+    # Resolve every artifact path once up front
+    raw_data_file = output_path / "universe_data.csv"
+    data_file = artifact_path(raw_data_file, fmt)
+    tier1_passed_file = artifact_path(output_path / OUTPUT_CONFIG["universe_file"], fmt)
+    tier1_failed_file = artifact_path(output_path / "universe_tier1_failed.csv", fmt)
+    tier2_file = artifact_path(output_path / OUTPUT_CONFIG["scored_file"], fmt)
+    top20_file = output_path / OUTPUT_CONFIG["top20_file"]
+    json_file = output_path / OUTPUT_CONFIG["watchlist_json"]
     
     print(f"\n{'='*70}")
     print("CAPITAL COMPOUNDER INVESTMENT SYSTEM")
     print("Three-Tier Screening Pipeline")
     print(f"{'='*70}")
     print(f"Started: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Universe: {len(tickers)} tickers")
+    print(f"Universe: {uni_size} tickers")
     print(f"Output: {output_path.absolute()}")
     print(f"{'='*70}")
     
     results = {
         "run_date": start_time.isoformat(),
-        "input_universe": len(tickers),
+        "input_universe": uni_size,
     }
     
     # =========================================================================
@@ -77,8 +143,10 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     print("STAGE 1: FETCHING FINANCIAL DATA")
     print("="*70)
     
-    data_file = output_path / "universe_data.csv"
-    raw_df = fetch_universe_data(tickers, str(data_file))
+    # fetch_universe_data always writes CSV; table_io converts it if needed
+    raw_df = fetch_universe_data(tickers, str(raw_data_file))
+    if fmt == "parquet":
+        write_table(raw_df, data_file)
     
     results["data_fetched"] = len(raw_df)
     results["data_complete"] = len(raw_df[raw_df["data_quality"] == "complete"])
@@ -86,11 +154,8 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     # =========================================================================
     # STAGE 2: Tier 1 Hard Filters
     # =========================================================================
-    tier1_passed_file = output_path / OUTPUT_CONFIG["universe_file"]
-    tier1_failed_file = output_path / "universe_tier1_failed.csv"
-    
-    passed_df, failed_df = run_tier1_filter(
-        str(data_file),
+    passed_df, failed_df = run_tier1_filter_df(
+        raw_df,
         str(tier1_passed_file),
         str(tier1_failed_file)
     )
@@ -101,14 +166,13 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     # =========================================================================
     # STAGE 3: Tier 2 Quality Scoring
     # =========================================================================
-    tier2_file = output_path / OUTPUT_CONFIG["scored_file"]
-    
     if len(passed_df) > 0:
-        scored_df = run_tier2_scoring(str(tier1_passed_file), str(tier2_file))
+        scored_df = run_tier2_scoring_df(passed_df, str(tier2_file))
         
-        results["tier2_exceptional"] = len(scored_df[scored_df["tier_label"] == "EXCEPTIONAL"])
-        results["tier2_elite"] = len(scored_df[scored_df["tier_label"] == "ELITE"])
-        results["tier2_quality"] = len(scored_df[scored_df["tier_label"] == "QUALITY"])
+        tier_counts = scored_df["tier_label"].value_counts()
+        results["tier2_exceptional"] = int(tier_counts.get("EXCEPTIONAL", 0))
+        results["tier2_elite"] = int(tier_counts.get("ELITE", 0))
+        results["tier2_quality"] = int(tier_counts.get("QUALITY", 0))
     else:
         print("\n⚠️ No companies passed Tier 1 - skipping Tier 2 & 3")
         scored_df = pd.DataFrame()
@@ -119,16 +183,15 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     # =========================================================================
     # STAGE 4: Tier 3 DCF Valuation
     # =========================================================================
-    top20_file = output_path / OUTPUT_CONFIG["top20_file"]
-    
     elite_plus = results["tier2_exceptional"] + results["tier2_elite"]
     if elite_plus > 0:
-        valued_df = run_tier3_valuation(str(tier2_file), str(top20_file))
+        valued_df = run_tier3_valuation_df(scored_df, str(top20_file))
         
         complete_vals = valued_df[valued_df.get("valuation_status", "") == "complete"]
         results["valuations_complete"] = len(complete_vals)
-        results["buy_signals"] = len(complete_vals[complete_vals["action_signal"] == "BUY"])
-        results["watch_signals"] = len(complete_vals[complete_vals["action_signal"] == "WATCH"])
+        signal_counts = complete_vals["action_signal"].value_counts()
+        results["buy_signals"] = int(signal_counts.get("BUY", 0))
+        results["watch_signals"] = int(signal_counts.get("WATCH", 0))
     else:
         print("\n⚠️ No ELITE+ companies - skipping Tier 3 valuation")
         valued_df = pd.DataFrame()
@@ -149,9 +212,7 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
         results
     )
     
-    json_file = output_path / OUTPUT_CONFIG["watchlist_json"]
-    with open(json_file, "w") as f:
-        json.dump(dashboard_data, f, indent=2, default=str)
+    write_json(json_file, dashboard_data)
     print(f"✅ Dashboard JSON: {json_file}")
     
     # =========================================================================
@@ -165,10 +226,15 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     print("PIPELINE COMPLETE")
     print(f"{'='*70}")
     print(f"Duration: {duration:.1f} seconds")
+    data_complete = results["data_complete"]
+    tier1_passed = results["tier1_passed"]
+    pct_complete = data_complete / uni_size * 100
+    pct_tier1 = tier1_passed / uni_size * 100
+    
     print(f"\nFUNNEL SUMMARY:")
-    print(f"  Input Universe:     {results['input_universe']:>4} tickers")
-    print(f"  Data Complete:      {results['data_complete']:>4} ({results['data_complete']/results['input_universe']*100:.0f}%)")
-    print(f"  Tier 1 Passed:      {results['tier1_passed']:>4} ({results['tier1_passed']/results['input_universe']*100:.0f}%)")
+    print(f"  Input Universe:     {uni_size:>4} tickers")
+    print(f"  Data Complete:      {data_complete:>4} ({pct_complete:.0f}%)")
+    print(f"  Tier 1 Passed:      {tier1_passed:>4} ({pct_tier1:.0f}%)")
     print(f"  EXCEPTIONAL:        {results['tier2_exceptional']:>4}")
     print(f"  ELITE:              {results['tier2_elite']:>4}")
     print(f"  Valuations:         {results.get('valuations_complete', 0):>4}")
@@ -180,7 +246,7 @@ def run_full_pipeline(tickers: list, output_dir: str = ".") -> dict:
     print("SYSTEM HEALTH CHECK")
     print(f"{'='*70}")
     
-    universe_size = results["tier1_passed"]
+    universe_size = tier1_passed
     if 30 <= universe_size <= 50:
         print(f"✅ Universe size: {universe_size} (target: 30-50)")
     elif universe_size > 100:
@@ -227,61 +293,70 @@ def create_dashboard_json(valued_df: pd.DataFrame, summary: dict) -> dict:
     else:
         complete = valued_df.copy()
     
-    for _, row in complete.iterrows():
+    # Coerce whole columns once: floats rounded with NaN -> None, scores NaN -> 0
+    for col in DASHBOARD_FLOAT_COLS + DASHBOARD_SCORE_COLS:
+        if col not in complete.columns:
+            complete[col] = None
+    floats = np.round(
+        complete[DASHBOARD_FLOAT_COLS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64), 4
+    )
+    float_cells = floats.astype(object)
+    float_cells[np.isnan(floats)] = None
+    complete[DASHBOARD_FLOAT_COLS] = float_cells
+    complete[DASHBOARD_SCORE_COLS] = (
+        complete[DASHBOARD_SCORE_COLS].apply(pd.to_numeric, errors="coerce").fillna(0).astype(int)
+    )
+    
+    # Plain dicts are much cheaper to walk than the Series iterrows() builds per row
+    for row in complete.to_dict(orient="records"):
         company = {
             "ticker": row.get("ticker", ""),
             "name": row.get("company_name", ""),
             "sector": row.get("sector", ""),
             "tier_label": row.get("tier_label", ""),
-            "total_score": int(row.get("total_score", 0)) if pd.notna(row.get("total_score")) else 0,
+            "total_score": row["total_score"],
             "metrics": {
-                "incremental_roic": _safe_float(row.get("incremental_roic")),
-                "roic_current": _safe_float(row.get("roic_current")),
-                "revenue_growth_3y": _safe_float(row.get("revenue_growth_3y")),
-                "fcf_conversion": _safe_float(row.get("fcf_conversion")),
-                "gross_margin": _safe_float(row.get("gross_margin")),
+                "incremental_roic": row["incremental_roic"],
+                "roic_current": row["roic_current"],
+                "revenue_growth_3y": row["revenue_growth_3y"],
+                "fcf_conversion": row["fcf_conversion"],
+                "gross_margin": row["gross_margin"],
                 "gross_margin_trend": row.get("gross_margin_trend", "unknown"),
-                "net_debt_ebitda": _safe_float(row.get("net_debt_ebitda")),
+                "net_debt_ebitda": row["net_debt_ebitda"],
             },
             "valuation": {
-                "current_price": _safe_float(row.get("current_price")),
-                "intrinsic_value": _safe_float(row.get("intrinsic_value")),
-                "implied_irr": _safe_float(row.get("implied_irr")),
-                "margin_of_safety": _safe_float(row.get("margin_of_safety")),
-                "buy_15_price": _safe_float(row.get("buy_15_price")),
-                "buy_12_price": _safe_float(row.get("buy_12_price")),
-                "buy_10_price": _safe_float(row.get("buy_10_price")),
+                "current_price": row["current_price"],
+                "intrinsic_value": row["intrinsic_value"],
+                "implied_irr": row["implied_irr"],
+                "margin_of_safety": row["margin_of_safety"],
+                "buy_15_price": row["buy_15_price"],
+                "buy_12_price": row["buy_12_price"],
+                "buy_10_price": row["buy_10_price"],
                 "action_signal": row.get("action_signal", "HOLD"),
             },
             "scores": {
-                "incremental_roic": int(row.get("score_incremental_roic", 0)) if pd.notna(row.get("score_incremental_roic")) else 0,
-                "reinvestment_runway": int(row.get("score_reinvestment_runway", 0)) if pd.notna(row.get("score_reinvestment_runway")) else 0,
-                "revenue_growth": int(row.get("score_revenue_growth", 0)) if pd.notna(row.get("score_revenue_growth")) else 0,
-                "fcf_conversion": int(row.get("score_fcf_conversion", 0)) if pd.notna(row.get("score_fcf_conversion")) else 0,
-                "gross_margin_trend": int(row.get("score_gross_margin_trend", 0)) if pd.notna(row.get("score_gross_margin_trend")) else 0,
-                "capex_efficiency": int(row.get("score_capex_efficiency", 0)) if pd.notna(row.get("score_capex_efficiency")) else 0,
+                "incremental_roic": row["score_incremental_roic"],
+                "reinvestment_runway": row["score_reinvestment_runway"],
+                "revenue_growth": row["score_revenue_growth"],
+                "fcf_conversion": row["score_fcf_conversion"],
+                "gross_margin_trend": row["score_gross_margin_trend"],
+                "capex_efficiency": row["score_capex_efficiency"],
             },
         }
         dashboard["companies"].append(company)
     
-    # Sort by implied IRR
-    dashboard["companies"].sort(key=lambda x: x["valuation"]["implied_irr"] or 0, reverse=True)
+    # Sort by implied IRR, keeping only the top N when the config caps it
+    companies = dashboard["companies"]
+    top_n = OUTPUT_CONFIG.get("dashboard_top_n", len(companies))
+    irr_key = lambda x: x["valuation"]["implied_irr"] or 0
+    if top_n < len(companies):
+        dashboard["companies"] = heapq.nlargest(top_n, companies, key=irr_key)
+    else:
+        companies.sort(key=irr_key, reverse=True)
     
     return dashboard
 
 
-def _safe_float(val):
-    """Convert value to float, handling None/NaN."""
-    if val is None:
-        return None
-    if isinstance(val, float) and pd.isna(val):
-        return None
-    try:
-        return round(float(val), 4)
-    except (ValueError, TypeError):
-        return None
-
-
 def main():
     """Main entry point."""
     parser = argparse.ArgumentParser(
@@ -303,6 +378,12 @@ def main():
         default="./output",
         help="Output directory (default: ./output)"
     )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="Format for intermediate tier files (parquet needs pyarrow; default: csv)"
+    )
     
     args = parser.parse_args()
     
@@ -321,12 +402,11 @@ def main():
             return
     
     # Run pipeline
-    results = run_full_pipeline(tickers, args.output)
+    results = run_full_pipeline(tickers, args.output, fmt=args.format)
     
     # Save results summary
     summary_file = Path(args.output) / "pipeline_summary.json"
-    with open(summary_file, "w") as f:
-        json.dump(results, f, indent=2, default=str)
+    write_json(summary_file, results)
     print(f"\n📊 Summary saved: {summary_file}")
 
 
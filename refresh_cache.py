@@ -15,8 +15,12 @@ Cron example (run at 2am daily):
 
 import argparse
 import sys
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 from typing import List
 
 from cache_manager import CachedFMPFetcher, CacheManager
@@ -48,78 +52,130 @@ DEFAULT_UNIVERSE = [
 ]
 
 
-def progress_bar(current: int, total: int, ticker: str, width: int = 40):
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all fetch workers.
+    Refills at rate_limit_per_min/60 tokens per second; acquire() blocks until
+    enough tokens are available.
+    """
+    
+    def __init__(self, rate_limit_per_min: int, capacity: float = None):
+        self.rate = rate_limit_per_min / 60.0
+        self.capacity = capacity if capacity is not None else max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, n: float = 1.0):
+        """Take n tokens, sleeping until the bucket has refilled enough."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+PROGRESS_WIDTH = 40
+PROGRESS_EVERY = 32  # redraw at least this often even if the bar hasn't moved
+
+
+@lru_cache(maxsize=None)
+def _bar(filled: int, width: int) -> str:
+    return '█' * filled + '░' * (width - filled)
+
+
+def progress_bar(current: int, total: int, ticker: str, width: int = PROGRESS_WIDTH):
     """Display a progress bar."""
     pct = current / total
     filled = int(width * pct)
-    bar = '█' * filled + '░' * (width - filled)
-    print(f'\r  [{bar}] {current}/{total} ({pct*100:.1f}%) - {ticker:8}', end='', flush=True)
+    print(f'\r  [{_bar(filled, width)}] {current}/{total} ({pct*100:.1f}%) - {ticker:8}', end='', flush=True)
 
 
-def refresh_cache(tickers: List[str], rate_limit_per_min: int = 300, use_ttm: bool = False):
+def refresh_cache(tickers: List[str], rate_limit_per_min: int = 300, use_ttm: bool = False,
+                  max_workers: int = 16):
     """
     Refresh cache for a list of tickers with rate limiting.
     
     Args:
         tickers: List of ticker symbols
         rate_limit_per_min: API calls per minute limit (default 300 for paid plan)
+        max_workers: Concurrent fetch threads (all share one rate limiter)
     """
     print("="*70)
     print("CAPITAL COMPOUNDERS - CACHE REFRESH")
     print(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*70)
     
-    # Calculate delay between tickers (6 API calls per ticker)
+    # Throughput is capped by the API limit (6 API calls per ticker)
     calls_per_ticker = 6
     tickers_per_minute = rate_limit_per_min / calls_per_ticker
-    delay_between_tickers = 60 / tickers_per_minute  # seconds
     
     print(f"\nConfiguration:")
     print(f"  Tickers to refresh: {len(tickers)}")
     print(f"  API rate limit: {rate_limit_per_min}/min")
-    print(f"  Delay between tickers: {delay_between_tickers:.2f}s")
-    print(f"  Estimated time: {len(tickers) * delay_between_tickers / 60:.1f} minutes")
+    print(f"  Workers: {max_workers}")
+    print(f"  Estimated time: {len(tickers) / tickers_per_minute:.1f} minutes")
     
     # Initialize fetcher
     fetcher = CachedFMPFetcher()
+    bucket = TokenBucket(rate_limit_per_min, capacity=max(calls_per_ticker, rate_limit_per_min / 60))
     
     print(f"\nRefreshing...\n")
     
-    stats = {
-        'total': len(tickers),
-        'success': 0,
-        'failed': 0,
-        'skipped': 0,
-        'errors': [],
-    }
+    outcomes = Counter()
+    errors = []
+    
+    def _fetch_one(ticker):
+        bucket.acquire(calls_per_ticker)
+        return fetcher.get_ticker_data(ticker, force_refresh=True, use_ttm=use_ttm)
     
     start_time = time.time()
     
-    for i, ticker in enumerate(tickers):
-        progress_bar(i + 1, len(tickers), ticker)
-        
-        try:
-            result = fetcher.get_ticker_data(ticker, force_refresh=True, use_ttm=use_ttm)
+    total = len(tickers)
+    last_filled = -1
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(_fetch_one, t): t for t in tickers}
+        for i, future in enumerate(as_completed(futures)):
+            ticker = futures[future]
             
-            if result and result.get('data_quality') not in ['error', 'incomplete', None]:
-                stats['success'] += 1
-            elif result and result.get('data_quality') == 'incomplete':
-                stats['skipped'] += 1
-            else:
-                stats['failed'] += 1
-                error_msg = result.get('error', 'Unknown error') if result else 'No data returned'
-                stats['errors'].append({'ticker': ticker, 'error': error_msg})
+            # Only redraw when the bar moves (or periodically), not on every ticker
+            filled = (i + 1) * PROGRESS_WIDTH // total
+            if filled != last_filled or i % PROGRESS_EVERY == 0 or i + 1 == total:
+                progress_bar(i + 1, total, ticker)
+                last_filled = filled
+            
+            try:
+                result = future.result()
                 
-        except Exception as e:
-            stats['failed'] += 1
-            stats['errors'].append({'ticker': ticker, 'error': str(e)})
-        
-        # Rate limiting
-        if i < len(tickers) - 1:  # Don't delay after last ticker
-            time.sleep(delay_between_tickers)
+                if result and result.get('data_quality') not in ['error', 'incomplete', None]:
+                    outcomes['success'] += 1
+                elif result and result.get('data_quality') == 'incomplete':
+                    outcomes['skipped'] += 1
+                else:
+                    outcomes['failed'] += 1
+                    error_msg = result.get('error', 'Unknown error') if result else 'No data returned'
+                    errors.append({'ticker': ticker, 'error': error_msg})
+                    
+            except Exception as e:
+                outcomes['failed'] += 1
+                errors.append({'ticker': ticker, 'error': str(e)})
     
     elapsed = time.time() - start_time
     
+    stats = {
+        'total': total,
+        'success': outcomes['success'],
+        'failed': outcomes['failed'],
+        'skipped': outcomes['skipped'],
+        'errors': errors,
+    }
+    
     # Mark refresh complete
     fetcher.cache.mark_refresh_complete()
     
@@ -156,6 +212,7 @@ def main():
     parser.add_argument('--tickers', nargs='+', help='Specific tickers to refresh')
     parser.add_argument('--file', type=str, help='File with tickers (one per line)')
     parser.add_argument('--rate-limit', type=int, default=300, help='API calls per minute (default: 300)')
+    parser.add_argument('--workers', type=int, default=16, help='Concurrent fetch threads (default: 16)')
     parser.add_argument('--stats', action='store_true', help='Show cache stats only')
     parser.add_argument('--clear', action='store_true', help='Clear cache before refresh')
     parser.add_argument('--ttm', action='store_true', help='Use TTM (trailing twelve months) data from quarterly statements')
@@ -189,17 +246,12 @@ def main():
     else:
         tickers = DEFAULT_UNIVERSE
     
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_tickers = []
-    for t in tickers:
-        t_upper = t.upper()
-        if t_upper not in seen:
-            seen.add(t_upper)
-            unique_tickers.append(t)
+    # Remove duplicates while preserving order (fetcher upper-cases anyway)
+    unique_tickers = list(dict.fromkeys(t.upper() for t in tickers))
     
     # Run refresh
-    refresh_cache(unique_tickers, rate_limit_per_min=args.rate_limit, use_ttm=args.ttm)
+    refresh_cache(unique_tickers, rate_limit_per_min=args.rate_limit, use_ttm=args.ttm,
+                  max_workers=args.workers)
 
 
 if __name__ == '__main__':
@@ -31,15 +31,15 @@ from pathlib import Path
 from datetime import datetime
 
 
-def run_with_sample_data(output_dir: str = "output"):
+def run_with_sample_data(output_dir: str = "output", fmt: str = "csv"):
     """Run the system with sample data for demonstration."""
     from sample_data import generate_sample_data
-    from tier1_filter import run_tier1_filter
-    from tier2_scorer import run_tier2_scoring
-    from tier3_valuation import run_tier3_valuation
+    from tier1_filter import run_tier1_filter_df
+    from tier2_scorer import run_tier2_scoring_df
+    from tier3_valuation import run_tier3_valuation_df
     from dashboard_generator import generate_dashboard
-    from main import create_dashboard_json
-    import json
+    from main import create_dashboard_json, write_json
+    from table_io import artifact_path
     
     os.makedirs(output_dir, exist_ok=True)
     
@@ -48,47 +48,48 @@ def run_with_sample_data(output_dir: str = "output"):
     print("="*70)
     
     # Generate sample data
-    df = generate_sample_data(f'{output_dir}/universe_data.csv')
+    df = generate_sample_data(artifact_path(f'{output_dir}/universe_data.csv', fmt))
     
-    # Run pipeline
-    passed, failed = run_tier1_filter(
-        f'{output_dir}/universe_data.csv',
-        f'{output_dir}/universe_tier1_passed.csv',
-        f'{output_dir}/universe_tier1_failed.csv'
+    # Run pipeline (DataFrames are handed between tiers; CSVs are outputs only)
+    passed, failed = run_tier1_filter_df(
+        df,
+        artifact_path(f'{output_dir}/universe_tier1_passed.csv', fmt),
+        artifact_path(f'{output_dir}/universe_tier1_failed.csv', fmt)
     )
     
     if len(passed) == 0:
         print("\n⚠️ No companies passed Tier 1 filters!")
         return
     
-    scored = run_tier2_scoring(
-        f'{output_dir}/universe_tier1_passed.csv',
-        f'{output_dir}/universe_tier2_scored.csv'
+    scored = run_tier2_scoring_df(
+        passed,
+        artifact_path(f'{output_dir}/universe_tier2_scored.csv', fmt)
     )
     
-    elite_count = len(scored[scored['tier_label'].isin(['EXCEPTIONAL', 'ELITE'])])
+    tier_counts = scored['tier_label'].value_counts()
+    elite_count = int(tier_counts.get('EXCEPTIONAL', 0) + tier_counts.get('ELITE', 0))
     if elite_count == 0:
         print("\n⚠️ No ELITE+ companies found!")
         return
     
-    valued = run_tier3_valuation(
-        f'{output_dir}/universe_tier2_scored.csv',
+    valued = run_tier3_valuation_df(
+        scored,
         f'{output_dir}/top20_buylist.csv'
     )
     
     # Generate dashboard
+    signal_counts = valued['action_signal'].value_counts().to_dict() if 'action_signal' in valued.columns else {}
     summary = {
         'input_universe': len(df),
         'tier1_passed': len(passed),
-        'tier2_exceptional': len(scored[scored['tier_label'] == 'EXCEPTIONAL']),
-        'tier2_elite': len(scored[scored['tier_label'] == 'ELITE']),
-        'buy_signals': len(valued[valued.get('action_signal', '') == 'BUY']) if 'action_signal' in valued.columns else 0,
-        'watch_signals': len(valued[valued.get('action_signal', '') == 'WATCH']) if 'action_signal' in valued.columns else 0,
+        'tier2_exceptional': int(tier_counts.get('EXCEPTIONAL', 0)),
+        'tier2_elite': int(tier_counts.get('ELITE', 0)),
+        'buy_signals': int(signal_counts.get('BUY', 0)),
+        'watch_signals': int(signal_counts.get('WATCH', 0)),
     }
     
     dashboard_data = create_dashboard_json(valued, summary)
-    with open(f'{output_dir}/watchlist_dashboard.json', 'w') as f:
-        json.dump(dashboard_data, f, indent=2)
+    write_json(f'{output_dir}/watchlist_dashboard.json', dashboard_data)
     
     generate_dashboard(f'{output_dir}/watchlist_dashboard.json', 
                        f'{output_dir}/capital_compounders_dashboard.html')
@@ -100,15 +101,15 @@ def run_with_sample_data(output_dir: str = "output"):
 
 
 def run_with_live_data(tickers: list = None, input_file: str = None, 
-                       output_dir: str = "output", api_key: str = None):
+                       output_dir: str = "output", api_key: str = None, fmt: str = "csv"):
     """Run the system with live FMP API data."""
     from fmp_data import fetch_universe_data
-    from tier1_filter import run_tier1_filter
-    from tier2_scorer import run_tier2_scoring
-    from tier3_valuation import run_tier3_valuation
+    from tier1_filter import run_tier1_filter_df
+    from tier2_scorer import run_tier2_scoring_df
+    from tier3_valuation import run_tier3_valuation_df
     from dashboard_generator import generate_dashboard
-    from main import create_dashboard_json, load_universe
-    import json
+    from main import create_dashboard_json, load_universe, write_json
+    from table_io import artifact_path, write_table
     
     # Update API key if provided
     if api_key:
@@ -132,7 +133,10 @@ def run_with_live_data(tickers: list = None, input_file: str = None,
     print(f"Processing {len(ticker_list)} tickers...")
     
     # Fetch data
+    # fetch_universe_data always writes CSV; table_io converts it if needed
     df = fetch_universe_data(ticker_list, f'{output_dir}/universe_data.csv')
+    if fmt == 'parquet':
+        write_table(df, artifact_path(f'{output_dir}/universe_data.csv', fmt))
     
     complete_count = len(df[df['data_quality'] == 'complete'])
     if complete_count == 0:
@@ -141,47 +145,48 @@ def run_with_live_data(tickers: list = None, input_file: str = None,
     
     print(f"✅ Data retrieved for {complete_count}/{len(ticker_list)} tickers")
     
-    # Run pipeline
-    passed, failed = run_tier1_filter(
-        f'{output_dir}/universe_data.csv',
-        f'{output_dir}/universe_tier1_passed.csv',
-        f'{output_dir}/universe_tier1_failed.csv'
+    # Run pipeline (DataFrames are handed between tiers; CSVs are outputs only)
+    passed, failed = run_tier1_filter_df(
+        df,
+        artifact_path(f'{output_dir}/universe_tier1_passed.csv', fmt),
+        artifact_path(f'{output_dir}/universe_tier1_failed.csv', fmt)
     )
     
     if len(passed) == 0:
         print("\n⚠️ No companies passed Tier 1 filters!")
-        print("Check failed companies in:", f'{output_dir}/universe_tier1_failed.csv')
+        print("Check failed companies in:", artifact_path(f'{output_dir}/universe_tier1_failed.csv', fmt))
         return
     
-    scored = run_tier2_scoring(
-        f'{output_dir}/universe_tier1_passed.csv',
-        f'{output_dir}/universe_tier2_scored.csv'
+    scored = run_tier2_scoring_df(
+        passed,
+        artifact_path(f'{output_dir}/universe_tier2_scored.csv', fmt)
     )
     
-    elite_count = len(scored[scored['tier_label'].isin(['EXCEPTIONAL', 'ELITE'])])
+    tier_counts = scored['tier_label'].value_counts()
+    elite_count = int(tier_counts.get('EXCEPTIONAL', 0) + tier_counts.get('ELITE', 0))
     if elite_count == 0:
         print("\n⚠️ No ELITE+ companies found!")
         return
     
-    valued = run_tier3_valuation(
-        f'{output_dir}/universe_tier2_scored.csv',
+    valued = run_tier3_valuation_df(
+        scored,
         f'{output_dir}/top20_buylist.csv'
     )
     
     # Generate dashboard
+    signal_counts = valued['action_signal'].value_counts().to_dict() if 'action_signal' in valued.columns else {}
     summary = {
         'input_universe': len(ticker_list),
         'data_complete': complete_count,
         'tier1_passed': len(passed),
-        'tier2_exceptional': len(scored[scored['tier_label'] == 'EXCEPTIONAL']),
-        'tier2_elite': len(scored[scored['tier_label'] == 'ELITE']),
-        'buy_signals': len(valued[valued.get('action_signal', '') == 'BUY']) if 'action_signal' in valued.columns else 0,
-        'watch_signals': len(valued[valued.get('action_signal', '') == 'WATCH']) if 'action_signal' in valued.columns else 0,
+        'tier2_exceptional': int(tier_counts.get('EXCEPTIONAL', 0)),
+        'tier2_elite': int(tier_counts.get('ELITE', 0)),
+        'buy_signals': int(signal_counts.get('BUY', 0)),
+        'watch_signals': int(signal_counts.get('WATCH', 0)),
     }
     
     dashboard_data = create_dashboard_json(valued, summary)
-    with open(f'{output_dir}/watchlist_dashboard.json', 'w') as f:
-        json.dump(dashboard_data, f, indent=2)
+    write_json(f'{output_dir}/watchlist_dashboard.json', dashboard_data)
     
     generate_dashboard(f'{output_dir}/watchlist_dashboard.json', 
                        f'{output_dir}/capital_compounders_dashboard.html')
@@ -218,11 +223,13 @@ Examples:
                        help='Output directory (default: output)')
     parser.add_argument('--api-key', type=str,
                        help='FMP API key (overrides config.py)')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                       help='Format for intermediate tier files (parquet needs pyarrow)')
     
     args = parser.parse_args()
     
     if args.sample:
-        run_with_sample_data(args.output)
+        run_with_sample_data(args.output, fmt=args.format)
     elif args.live:
         if not args.input and not args.tickers:
             print("Error: --live mode requires either --input or --tickers")
@@ -231,7 +238,8 @@ Examples:
             tickers=args.tickers,
             input_file=args.input,
             output_dir=args.output,
-            api_key=args.api_key
+            api_key=args.api_key,
+            fmt=args.format
         )
 
 
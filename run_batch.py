@@ -17,14 +17,48 @@ USAGE:
     
     # Test with small batch
     python run_batch.py --input stage1_candidates_tickers.txt --limit 10
+    
+    # Also write columnar batch files + cache/manifest.json (needs pyarrow)
+    python run_batch.py --input stage1_candidates_tickers.txt --cache-format parquet
 """
 
 import argparse
 import json
+import os
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, List
+
+import pandas as pd
+
+from table_io import HAS_PYARROW, write_table
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+FSYNC_EVERY = 32
+PARQUET_BATCH_SIZE = 64
+CACHE_SCAN_WORKERS = 16
+# Shared by every worker thread; FMP's quota is 300/min
+CALLS_PER_MINUTE = 290
 
 # Import your existing modules
 try:
@@ -52,6 +86,14 @@ def load_tickers_from_file(filepath: str) -> List[str]:
         return []
     
     if path.suffix == '.json':
+        # Stage 1 output is an object with a big "candidates" list; stream just
+        # the ticker strings instead of building every candidate dict
+        if HAS_IJSON:
+            with open(path, 'rb') as f:
+                if f.read(1024).lstrip()[:1] == b'{':
+                    f.seek(0)
+                    return list(ijson.items(f, 'candidates.item.ticker'))
+        
         with open(path) as f:
             data = json.load(f)
         
@@ -65,27 +107,148 @@ def load_tickers_from_file(filepath: str) -> List[str]:
                 return [t.get("ticker", t.get("symbol", "")) for t in data]
             return data
     
-    # Text file - one ticker per line
-    with open(path) as f:
-        tickers = [line.strip().upper() for line in f if line.strip() and not line.startswith('#')]
+    # Text file - one ticker per line (read once, split in C, strip each line once)
+    tickers = [
+        ticker for line in path.read_text().splitlines()
+        if (ticker := line.strip().upper()) and not ticker.startswith('#')
+    ]
     
     return tickers
 
 
+# Built once per process and reused by every run_batch call
+_FETCHER = None
+_PROCESSOR = None
+
+
+def _get_fetcher() -> "CachedFMPFetcher":
+    global _FETCHER
+    if _FETCHER is None:
+        _FETCHER = CachedFMPFetcher(calls_per_minute=CALLS_PER_MINUTE)
+    return _FETCHER
+
+
+def _get_processor() -> "FinancialDataProcessor":
+    global _PROCESSOR
+    if _PROCESSOR is None:
+        _PROCESSOR = FinancialDataProcessor(calls_per_minute=CALLS_PER_MINUTE)
+    return _PROCESSOR
+
+
+def _load_json(path: Path):
+    """Parse a JSON file (orjson when installed)."""
+    if HAS_ORJSON:
+        return orjson.loads(path.read_bytes())
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dump_json(path: Path, data) -> None:
+    """Write indented JSON (orjson when installed) via a .tmp file + os.replace."""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    if HAS_ORJSON:
+        tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Flush directory entries (the renames) to disk; no-op where unsupported."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _read_quality(path: Path):
+    """data_quality of one cache file, or None if it can't be read."""
+    try:
+        data = _load_json(path)
+    except (ValueError, OSError):
+        return None
+    return data.get("data_quality") if isinstance(data, dict) else None
+
+
+def scan_cache_quality(cache_dir: Path, tickers: List[str] = None) -> Dict[str, str]:
+    """
+    Map ticker -> data_quality for readable files in the cache, in one pass.
+    
+    With tickers given, the directory listing is filtered against that set
+    first, so only files for the batch get opened and parsed. Files are read
+    on a small thread pool so large caches aren't bound by one open/read at
+    a time.
+    """
+    wanted = set(tickers) if tickers is not None else None
+    paths = []
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            if wanted is not None and entry.name[:-5] not in wanted:
+                continue
+            paths.append(Path(entry.path))
+    
+    if not paths:
+        return {}
+    
+    with ThreadPoolExecutor(max_workers=min(CACHE_SCAN_WORKERS, len(paths))) as executor:
+        qualities = executor.map(_read_quality, paths)
+        return {path.stem: quality for path, quality in zip(paths, qualities) if quality is not None}
+
+
+def _flush_parquet_batch(rows: List[dict], cache_dir: Path) -> None:
+    """
+    Write buffered ticker rows to the next cache/ticker_data/batch_{n}.parquet
+    and point cache/manifest.json (ticker -> [file, row]) at them.
+    """
+    n = sum(1 for _ in cache_dir.glob("batch_*.parquet"))
+    batch_path = cache_dir / f"batch_{n}.parquet"
+    try:
+        write_table(pd.DataFrame(rows), str(batch_path))
+    except Exception as e:
+        print(f"  ⚠️ Parquet batch not written: {e}")
+        return
+    
+    manifest_path = cache_dir.parent / "manifest.json"
+    try:
+        manifest = _load_json(manifest_path)
+    except (ValueError, OSError):
+        manifest = {}
+    for row_idx, row in enumerate(rows):
+        manifest[row.get("ticker")] = [batch_path.name, row_idx]
+    _dump_json(manifest_path, manifest)
+
+
 def run_batch(tickers: List[str], 
               use_cache: bool = True,
               force_refresh: bool = False,
               use_ttm: bool = False,
-              delay: float = 0.0) -> dict:
+              delay: float = 0.0,
+              max_workers: int = 8,
+              cache_format: str = "json") -> dict:
     """
     Run full analysis for a list of tickers.
     
+    Tickers are fetched concurrently on a thread pool; the work is network-bound,
+    so wall time drops roughly by the number of workers.
+    
     Args:
         tickers: List of ticker symbols
         use_cache: Whether to use cache manager
         force_refresh: Force re-fetch even if cached
         use_ttm: Use TTM data instead of annual
-        delay: Additional delay between tickers
+        delay: Additional delay after each fetch (per worker)
+        max_workers: Number of tickers fetched in parallel
+        cache_format: "json" (per-ticker files only) or "parquet" (also write
+            fetched tickers to columnar batch files + cache/manifest.json)
     
     Returns:
         Dict with batch statistics
@@ -93,6 +256,10 @@ def run_batch(tickers: List[str],
     if not HAS_FMP:
         return {"error": "fmp_data.py not available"}
     
+    if cache_format == "parquet" and not HAS_PYARROW:
+        print("⚠️  pyarrow not installed - writing JSON cache only")
+        cache_format = "json"
+    
     stats = {
         "start_time": datetime.now().isoformat(),
         "total": len(tickers),
@@ -105,83 +272,143 @@ def run_batch(tickers: List[str],
     }
     
     # Initialize processor
-    if use_cache and HAS_CACHE_MANAGER:
+    use_cached_fetcher = use_cache and HAS_CACHE_MANAGER
+    if use_cached_fetcher:
         print("📦 Using cached fetcher")
-        fetcher = CachedFMPFetcher()
+        fetcher = _get_fetcher()
     else:
         print("📡 Using direct FMP fetcher")
-        processor = FinancialDataProcessor()
+        processor = _get_processor()
     
     cache_dir = Path("cache/ticker_data")
     cache_dir.mkdir(parents=True, exist_ok=True)
     
-    print(f"\n🚀 Processing {len(tickers)} tickers...")
-    print("=" * 60)
+    # Read every cached file once up front instead of json.load per ticker
+    quality_map = {} if force_refresh else scan_cache_quality(cache_dir, tickers)
     
-    start_time = datetime.now()
-    
-    for i, ticker in enumerate(tickers, 1):
-        # Progress
-        elapsed = (datetime.now() - start_time).total_seconds() / 60
-        remaining = (elapsed / i * (len(tickers) - i)) if i > 0 else 0
-        print(f"\n[{i}/{len(tickers)}] {ticker} (elapsed: {elapsed:.1f}m, remaining: ~{remaining:.1f}m)")
+    def _fetch(ticker: str, cache_file: Path) -> tuple:
+        if use_cached_fetcher:
+            data = fetcher.get_ticker_data(ticker, force_refresh=force_refresh, use_ttm=use_ttm)
+        else:
+            data = processor.get_all_metrics(ticker, use_ttm=use_ttm)
         
+        if not data:
+            return "error", "No data returned", None
+        
+        quality = data.get("data_quality", "unknown")
+        if quality == "complete":
+            # Save to cache if using direct processor
+            if not use_cached_fetcher:
+                _dump_json(cache_file, data)
+                return "saved", None, data
+            return "success", None, data
+        if quality == "incomplete":
+            return "incomplete", None, None
+        return "error", quality, None
+    
+    def _process_one(ticker: str) -> tuple:
+        """Worker: returns (ticker, outcome, reason, data); printing stays on the main thread."""
         # Check cache
-        cache_file = cache_dir / f"{ticker}.json"
-        if cache_file.exists() and not force_refresh:
-            try:
-                with open(cache_file) as f:
-                    cached = json.load(f)
-                if cached.get("data_quality") == "complete":
-                    print(f"  ✓ Using cached data")
-                    stats["skipped_cached"] += 1
-                    stats["processed"].append(ticker)
-                    continue
-            except (json.JSONDecodeError, IOError):
-                pass
+        if quality_map.get(ticker) == "complete":
+            return ticker, "cached", None, None
         
-        # Fetch data
         try:
-            if use_cache and HAS_CACHE_MANAGER:
-                data = fetcher.get_ticker_data(ticker, force_refresh=force_refresh, use_ttm=use_ttm)
-            else:
-                data = processor.get_all_metrics(ticker, use_ttm=use_ttm)
+            return (ticker, *_fetch(ticker, cache_dir / f"{ticker}.json"))
+        except Exception as e:
+            return ticker, "exception", str(e), None
+        finally:
+            # Additional delay if specified
+            if delay > 0:
+                time.sleep(delay)
+    
+    print(f"\n🚀 Processing {len(tickers)} tickers ({max_workers} workers)...")
+    print("=" * 60)
+    
+    start_mono = time.monotonic()
+    # Cache hits return instantly; only report every Nth of them
+    progress_every = max(1, len(tickers) // 100)
+    # Renames are flushed with one directory fsync per FSYNC_EVERY saves
+    unsynced_saves = 0
+    
+    # Tally on locals in the hot loop; counters are folded into stats after
+    n_tickers = len(tickers)
+    outcomes = Counter()
+    add_processed = stats["processed"].append
+    add_error = stats["errors"].append
+    # Complete tickers fetched this run, buffered for the columnar export
+    export_rows = [] if cache_format == "parquet" else None
+    
+    # One self-throttling bar when tqdm is installed; per-ticker lines otherwise
+    pbar = tqdm(total=n_tickers, unit="tk") if HAS_TQDM else None
+    verbose = pbar is None
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_process_one, ticker) for ticker in tickers]
+        
+        for i, future in enumerate(as_completed(futures), 1):
+            ticker, outcome, reason, data = future.result()
+            outcomes[outcome] += 1
+            
+            # Progress
+            show = verbose and (outcome != "cached" or i % progress_every == 0 or i == n_tickers)
+            if show:
+                elapsed = (time.monotonic() - start_mono) / 60
+                remaining = elapsed / i * (n_tickers - i)
+                print(f"\n[{i}/{n_tickers}] {ticker} (elapsed: {elapsed:.1f}m, remaining: ~{remaining:.1f}m)")
             
-            if data:
-                quality = data.get("data_quality", "unknown")
-                
-                if quality == "complete":
-                    stats["success"] += 1
-                    stats["processed"].append(ticker)
-                    
-                    # Save to cache if using direct processor
-                    if not (use_cache and HAS_CACHE_MANAGER):
-                        with open(cache_file, 'w') as f:
-                            json.dump(data, f, indent=2)
+            if outcome == "cached":
+                if show:
+                    print(f"  ✓ Using cached data")
+                add_processed(ticker)
+            elif outcome in ("success", "saved"):
+                add_processed(ticker)
+                if export_rows is not None:
+                    export_rows.append(data)
+                    if len(export_rows) >= PARQUET_BATCH_SIZE:
+                        _flush_parquet_batch(export_rows, cache_dir)
+                        export_rows = []
+                if outcome == "saved":
+                    if verbose:
                         print(f"  💾 Saved to cache")
-                    
-                elif quality == "incomplete":
-                    stats["incomplete"] += 1
+                    unsynced_saves += 1
+                    if unsynced_saves >= FSYNC_EVERY:
+                        _fsync_dir(cache_dir)
+                        unsynced_saves = 0
+            elif outcome == "incomplete":
+                if verbose:
                     print(f"  ⚠️ Incomplete data")
                 else:
-                    stats["error"] += 1
-                    stats["errors"].append({"ticker": ticker, "reason": quality})
+                    pbar.write(f"  ⚠️ {ticker}: Incomplete data")
             else:
-                stats["error"] += 1
-                stats["errors"].append({"ticker": ticker, "reason": "No data returned"})
-        
-        except Exception as e:
-            stats["error"] += 1
-            stats["errors"].append({"ticker": ticker, "reason": str(e)})
-            print(f"  ❌ Error: {e}")
-        
-        # Additional delay if specified
-        if delay > 0:
-            time.sleep(delay)
+                add_error({"ticker": ticker, "reason": reason})
+                if outcome == "exception":
+                    if verbose:
+                        print(f"  ❌ Error: {reason}")
+                    else:
+                        pbar.write(f"  ❌ {ticker}: {reason}")
+            
+            if pbar is not None:
+                pbar.set_postfix_str(
+                    f"{ticker} ok={len(stats['processed'])} err={len(stats['errors'])}", refresh=False
+                )
+                pbar.update(1)
+    
+    if pbar is not None:
+        pbar.close()
+    
+    stats["success"] = outcomes["success"] + outcomes["saved"]
+    stats["incomplete"] = outcomes["incomplete"]
+    stats["error"] = outcomes["error"] + outcomes["exception"]
+    stats["skipped_cached"] = outcomes["cached"]
+    
+    if unsynced_saves:
+        _fsync_dir(cache_dir)
+    if export_rows:
+        _flush_parquet_batch(export_rows, cache_dir)
     
     # Final stats
     stats["end_time"] = datetime.now().isoformat()
-    total_time = (datetime.now() - start_time).total_seconds()
+    total_time = time.monotonic() - start_mono
     stats["elapsed_seconds"] = total_time
     stats["elapsed_minutes"] = total_time / 60
     
@@ -218,6 +445,9 @@ def main():
     parser.add_argument('--no-cache', action='store_true', help='Skip cache manager, use direct FMP')
     parser.add_argument('--ttm', action='store_true', help='Use TTM data instead of annual')
     parser.add_argument('--delay', type=float, default=0, help='Additional delay between tickers (seconds)')
+    parser.add_argument('--workers', type=int, default=8, help='Tickers fetched in parallel (default: 8)')
+    parser.add_argument('--cache-format', choices=['json', 'parquet'], default='json',
+                        help='parquet: also write fetched tickers to columnar batch files (needs pyarrow)')
     parser.add_argument('--output', type=str, help='Output file for batch stats')
     
     args = parser.parse_args()
@@ -261,12 +491,13 @@ def main():
         force_refresh=args.force,
         use_ttm=args.ttm,
         delay=args.delay,
+        max_workers=args.workers,
+        cache_format=args.cache_format,
     )
     
     # Save stats
     if args.output:
-        with open(args.output, 'w') as f:
-            json.dump(stats, f, indent=2)
+        _dump_json(Path(args.output), stats)
         print(f"\n💾 Stats saved to: {args.output}")
     
     # Next steps
@@ -6,6 +6,7 @@ Run this locally to test the model with live FMP data.
 
 Usage:
     python run_top13.py
+    python run_top13.py --debug-intermediate   # also write raw/scored CSVs
 
 Requirements:
     pip install pandas requests
@@ -13,10 +14,16 @@ Requirements:
 The 13 tickers are the BUY signals from our calibrated model.
 """
 
+import argparse
+import csv
 import os
 import sys
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 
 # Add current directory to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +35,12 @@ from tier2_scorer import Tier2Scorer
 from tier3_valuation import DCFValuation
 from dashboard_generator import generate_dashboard
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # The 13 BUY signals from our calibrated model
 TOP_13_TICKERS = [
     'ASML',  # Semiconductor equipment - 42.5% IRR
@@ -45,9 +58,101 @@ TOP_13_TICKERS = [
     'MA',    # Payments - 16.3% IRR
 ]
 
+# Analyst-divergence flag -> marker shown in the valuation table
+_FLAG_SYMBOL = {'ALIGNED': '✅', 'MODERATE': '🔶', 'HIGH': '🔶', 'MAJOR': '⚠️'}
+
+
+# Shared across runs in the same process so the HTTP session is reused
+_FETCHER = None
+_PROCESSOR = None
+
+
+def _get_fetcher() -> FMPDataFetcher:
+    global _FETCHER
+    if _FETCHER is None:
+        _FETCHER = FMPDataFetcher(FMP_API_KEY)
+    return _FETCHER
+
+
+def _get_processor() -> FinancialDataProcessor:
+    global _PROCESSOR
+    if _PROCESSOR is None:
+        _PROCESSOR = FinancialDataProcessor()
+    return _PROCESSOR
+
+
+class _FetchFailed(Exception):
+    """Raised inside the cached fetch so a failed (None) response is not memoized."""
+
+
+# Profile, ratios and key metrics barely move within a session; statements
+# and quotes are always fetched fresh
+@lru_cache(maxsize=384)
+def _cached_fetch(method, ticker):
+    data = getattr(_get_fetcher(), method)(ticker)
+    if data is None:
+        raise _FetchFailed(f"{method}({ticker})")
+    return data
+
+
+def _fetch_or_none(method, ticker):
+    """Cached fetcher call; None (uncached, retried next time) when the fetch failed."""
+    try:
+        return _cached_fetch(method, ticker)
+    except _FetchFailed:
+        return None
 
-def run_top13_analysis():
-    """Run full analysis on top 13 tickers with live data."""
+
+def _company_profile(ticker):
+    return _fetch_or_none('get_company_profile', ticker)
+
+
+def _financial_ratios(ticker):
+    return _fetch_or_none('get_financial_ratios', ticker)
+
+
+def _key_metrics(ticker):
+    return _fetch_or_none('get_key_metrics', ticker)
+
+
+def _write_csv(path, rows):
+    """Write a list of dicts as CSV (columns in first-seen order)."""
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _write_dashboard_json(path, summary, companies):
+    """
+    Stream the dashboard JSON one company at a time, so no second copy of
+    the full payload is built before it reaches the file.
+    """
+    if HAS_ORJSON:
+        def dumps(obj):
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        def dumps(obj):
+            return json.dumps(obj).encode()
+    
+    with open(path, 'wb') as f:
+        f.write(b'{"generated_at": ' + dumps(datetime.now().isoformat()))
+        f.write(b',\n "summary": ' + dumps(summary))
+        f.write(b',\n "companies": [')
+        for i, company in enumerate(companies):
+            f.write(b',\n  ' if i else b'\n  ')
+            f.write(dumps(company))
+        f.write(b'\n ]}\n')
+
+
+def run_top13_analysis(debug_intermediate: bool = False):
+    """
+    Run full analysis on top 13 tickers with live data.
+    
+    Only the final valuations CSV is written unless debug_intermediate is set,
+    since the raw and scored columns are all carried into it.
+    """
     
     print("="*70)
     print("CAPITAL COMPOUNDER - TOP 13 LIVE ANALYSIS")
@@ -61,43 +166,59 @@ def run_top13_analysis():
     print("\n📊 STEP 1: Fetching live data from FMP API...")
     print("-"*50)
     
-    fetcher = FMPDataFetcher(FMP_API_KEY)
-    processor = FinancialDataProcessor()
+    fetcher = _get_fetcher()
+    processor = _get_processor()
     
-    all_data = []
-    for i, ticker in enumerate(TOP_13_TICKERS):
-        print(f"  [{i+1}/{len(TOP_13_TICKERS)}] {ticker}...", end=" ")
+    def _fetch_one(ticker):
+        # The five endpoints are independent, so issue them together over
+        # the fetcher's pooled session
+        with ThreadPoolExecutor(max_workers=5) as ex:
+            f_profile = ex.submit(_company_profile, ticker)
+            f_financials = ex.submit(fetcher.get_financial_statements, ticker, limit=4)
+            f_ratios = ex.submit(_financial_ratios, ticker)
+            f_metrics = ex.submit(_key_metrics, ticker)
+            f_quote = ex.submit(fetcher.get_stock_quote, ticker)
+        profile = f_profile.result()
+        financials = f_financials.result()
         
-        try:
-            # Fetch all required data
-            profile = fetcher.get_company_profile(ticker)
-            financials = fetcher.get_financial_statements(ticker, limit=4)
-            ratios = fetcher.get_financial_ratios(ticker)
-            metrics = fetcher.get_key_metrics(ticker)
-            quote = fetcher.get_stock_quote(ticker)
+        if not (profile and financials):
+            return None
+        # Process into our format
+        return processor.process_company_data(
+            ticker, profile, financials, f_ratios.result(), f_metrics.result(), f_quote.result()
+        )
+    
+    # Tickers are fetched in parallel; results are reported as they land but
+    # kept in TOP_13_TICKERS order
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        futures = {ex.submit(_fetch_one, t): t for t in TOP_13_TICKERS}
+        for i, future in enumerate(as_completed(futures)):
+            ticker = futures[future]
+            print(f"  [{i+1}/{len(TOP_13_TICKERS)}] {ticker}...", end=" ")
             
-            if profile and financials:
-                # Process into our format
-                processed = processor.process_company_data(
-                    ticker, profile, financials, ratios, metrics, quote
-                )
-                all_data.append(processed)
-                print(f"✓ ${processed.get('price', 0):.2f}")
-            else:
-                print("⚠️ Missing data")
-                
-        except Exception as e:
-            print(f"❌ Error: {e}")
+            try:
+                processed = future.result()
+                if processed:
+                    fetched[ticker] = processed
+                    print(f"✓ ${processed.get('price', 0):.2f}")
+                else:
+                    print("⚠️ Missing data")
+                    
+            except Exception as e:
+                print(f"❌ Error: {e}")
+    
+    all_data = [fetched[t] for t in TOP_13_TICKERS if t in fetched]
     
     if not all_data:
         print("\n❌ No data fetched. Check your API key and connection.")
         return
     
-    # Convert to DataFrame
-    import pandas as pd
-    df = pd.DataFrame(all_data)
-    df.to_csv('output/top13_raw_data.csv', index=False)
-    print(f"\n✅ Fetched data for {len(df)} companies")
+    # 13 rows - plain dicts, no DataFrame needed
+    records = all_data
+    if debug_intermediate:
+        _write_csv('output/top13_raw_data.csv', records)
+    print(f"\n✅ Fetched data for {len(records)} companies")
     
     # Step 2: Run Tier 1 Filters (light filtering for this focused run)
     print("\n📋 STEP 2: Quality checks...")
@@ -105,7 +226,7 @@ def run_top13_analysis():
     
     # For this focused run, we skip Tier 1 since these are pre-selected
     # But we'll flag any data quality issues
-    for _, row in df.iterrows():
+    for row in records:
         issues = []
         if row.get('fcf_current', 0) <= 0:
             issues.append("negative FCF")
@@ -114,76 +235,71 @@ def run_top13_analysis():
         if issues:
             print(f"  ⚠️ {row['ticker']}: {', '.join(issues)}")
     
-    # Step 3: Run Tier 2 Scoring
+    # Steps 3 + 4: score and value each company in one pass over the records;
+    # the valuation table is buffered so it still prints under its own header
     print("\n🎯 STEP 3: Quality scoring...")
     print("-"*50)
     
     scorer = Tier2Scorer()
-    scored_data = []
-    
-    for _, row in df.iterrows():
-        score_result = scorer.score_company(row)
-        scored_row = {**row.to_dict(), **score_result}
-        scored_data.append(scored_row)
-        print(f"  {row['ticker']:<6} Score: {score_result['total_score']:>3} ({score_result['tier_label']})")
-    
-    scored_df = pd.DataFrame(scored_data)
-    scored_df.to_csv('output/top13_scored.csv', index=False)
-    
-    # Step 4: Run Tier 3 Valuations
-    print("\n💰 STEP 4: DCF Valuations...")
-    print("-"*50)
-    
     valuator = DCFValuation()
     valued_data = []
+    valuation_lines = []
     
-    print(f"\n{'Ticker':<6} {'Price':>8} {'IV':>8} {'IRR':>7} {'MOS':>7} {'Diverg':>8} {'Action':>8}")
-    print("-"*70)
-    
-    for _, row in scored_df.iterrows():
+    for row in records:
+        score_result = scorer.score_company(row)
+        row.update(score_result)
+        print(f"  {row['ticker']:<6} Score: {score_result['total_score']:>3} ({score_result['tier_label']})")
+        
         result = valuator.value_company(row)
         
         if result.get('valuation_status') == 'complete':
-            valued_row = {**row.to_dict(), **result}
+            valued_row = {**row, **result}
             valued_data.append(valued_row)
             
             # Get divergence flag
             div_flag = result.get('analyst_divergence_flag', 'N/A')
             div_pct = result.get('analyst_divergence_pct', 0) or 0
-            flag_symbol = {'ALIGNED': '✅', 'MODERATE': '🔶', 'HIGH': '🔶', 'MAJOR': '⚠️'}.get(div_flag, '—')
+            flag_symbol = _FLAG_SYMBOL.get(div_flag, '—')
             
-            print(f"{row['ticker']:<6} ${result['current_price']:>6.0f} ${result['intrinsic_value']:>6.0f} "
-                  f"{result['implied_irr']:>5.1f}% {result['margin_of_safety']:>5.1f}% "
-                  f"{div_pct:>+6.0f}%{flag_symbol} {result['action_signal']:>8}")
+            valuation_lines.append(
+                f"{row['ticker']:<6} ${result['current_price']:>6.0f} ${result['intrinsic_value']:>6.0f} "
+                f"{result['implied_irr']:>5.1f}% {result['margin_of_safety']:>5.1f}% "
+                f"{div_pct:>+6.0f}%{flag_symbol} {result['action_signal']:>8}"
+            )
         else:
-            print(f"{row['ticker']:<6} ❌ Error: {result.get('error', 'unknown')}")
+            valuation_lines.append(f"{row['ticker']:<6} ❌ Error: {result.get('error', 'unknown')}")
     
-    valued_df = pd.DataFrame(valued_data)
-    valued_df.to_csv('output/top13_valuations.csv', index=False)
+    if debug_intermediate:
+        _write_csv('output/top13_scored.csv', records)
+    
+    print("\n💰 STEP 4: DCF Valuations...")
+    print("-"*50)
+    
+    print(f"\n{'Ticker':<6} {'Price':>8} {'IV':>8} {'IRR':>7} {'MOS':>7} {'Diverg':>8} {'Action':>8}")
+    print("-"*70)
+    for line in valuation_lines:
+        print(line)
+    
+    _write_csv('output/top13_valuations.csv', valued_data)
     
     # Step 5: Generate Dashboard
     print("\n📈 STEP 5: Generating dashboard...")
     print("-"*50)
     
-    # Create summary
+    # Create summary - one counting pass per column
+    tier_counts = Counter(r['tier_label'] for r in records)
+    action_counts = Counter(r['action_signal'] for r in valued_data)
     summary = {
         'input_universe': len(TOP_13_TICKERS),
-        'tier1_passed': len(df),
-        'tier2_exceptional': len(scored_df[scored_df['tier_label'] == 'EXCEPTIONAL']),
-        'tier2_elite': len(scored_df[scored_df['tier_label'] == 'ELITE']),
-        'buy_signals': len(valued_df[valued_df['action_signal'] == 'BUY']),
-        'watch_signals': len(valued_df[valued_df['action_signal'] == 'WATCH']),
+        'tier1_passed': len(records),
+        'tier2_exceptional': tier_counts['EXCEPTIONAL'],
+        'tier2_elite': tier_counts['ELITE'],
+        'buy_signals': action_counts['BUY'],
+        'watch_signals': action_counts['WATCH'],
     }
     
     # Create dashboard JSON
-    dashboard_data = {
-        'generated_at': datetime.now().isoformat(),
-        'summary': summary,
-        'companies': valued_df.to_dict('records'),
-    }
-    
-    with open('output/top13_dashboard.json', 'w') as f:
-        json.dump(dashboard_data, f, indent=2)
+    _write_dashboard_json('output/top13_dashboard.json', summary, valued_data)
     
     generate_dashboard('output/top13_dashboard.json', 'output/top13_dashboard.html')
     
@@ -192,16 +308,17 @@ def run_top13_analysis():
     print("FINAL RESULTS")
     print("="*70)
     
-    buy_signals = valued_df[valued_df['action_signal'] == 'BUY'].sort_values('implied_irr', ascending=False)
-    watch_signals = valued_df[valued_df['action_signal'] == 'WATCH']
+    buy_signals = sorted((r for r in valued_data if r['action_signal'] == 'BUY'),
+                         key=itemgetter('implied_irr'), reverse=True)
+    watch_signals = [r for r in valued_data if r['action_signal'] == 'WATCH']
     
     print(f"\n🎯 BUY SIGNALS: {len(buy_signals)}")
-    for _, row in buy_signals.iterrows():
+    for row in buy_signals:
         print(f"   {row['ticker']:<6} IRR: {row['implied_irr']:>5.1f}%  MOS: {row['margin_of_safety']:>5.1f}%  "
               f"Buy@15%: ${row['buy_15_price']:.0f}")
     
     print(f"\n👀 WATCH SIGNALS: {len(watch_signals)}")
-    for _, row in watch_signals.iterrows():
+    for row in watch_signals:
         print(f"   {row['ticker']:<6} IRR: {row['implied_irr']:>5.1f}%  MOS: {row['margin_of_safety']:>5.1f}%")
     
     print(f"\n✅ Dashboard saved: output/top13_dashboard.html")
@@ -210,4 +327,9 @@ def run_top13_analysis():
 
 
 if __name__ == "__main__":
-    run_top13_analysis()
+    parser = argparse.ArgumentParser(description='Top 13 live analysis')
+    parser.add_argument('--debug-intermediate', action='store_true',
+                        help='Also write top13_raw_data.csv and top13_scored.csv')
+    args = parser.parse_args()
+    
+    run_top13_analysis(debug_intermediate=args.debug_intermediate)
@@ -7,6 +7,7 @@ Based on publicly available financial data from web sources.
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from table_io import HAS_PYARROW, PARQUET_COMPRESSION, write_table
 
 # Sample data based on real metrics from web research
 # This allows the system to run without live API access
@@ -335,15 +336,37 @@ SAMPLE_DATA = [
     },
 ]
 
+# Columnar copy built once at import; each call only copies it and stamps fetch_date
+_SAMPLE_DF = pd.DataFrame(
+    {key: [row[key] for row in SAMPLE_DATA] for key in SAMPLE_DATA[0]}
+).astype({"market_cap": "int64", "shares_outstanding": "int64", "is_net_cash": "bool"})
 
-def generate_sample_data(output_file: str = "sample_universe_data.csv") -> pd.DataFrame:
-    """Generate sample data for testing the screening system."""
-    df = pd.DataFrame(SAMPLE_DATA)
-    df["fetch_date"] = datetime.now().isoformat()
-    df.to_csv(output_file, index=False)
+
+def generate_sample_data(output_file: str = None, fetch_date: str = None,
+                         compression: str = PARQUET_COMPRESSION) -> pd.DataFrame:
+    """
+    Generate sample data for testing the screening system.
+    
+    Defaults to Parquet when pyarrow is installed, CSV otherwise; compression
+    only applies to Parquet output. fetch_date stamps every row; it defaults
+    to now, to the second.
+    """
+    if output_file is None:
+        output_file = "sample_universe_data.parquet" if HAS_PYARROW else "sample_universe_data.csv"
+    if fetch_date is None:
+        fetch_date = datetime.now().isoformat(timespec="seconds")
+    df = _SAMPLE_DF.copy()
+    df["fetch_date"] = fetch_date
+    write_table(df, output_file, compression=compression)
     print(f"✅ Sample data generated: {output_file} ({len(df)} companies)")
     return df
 
 
 if __name__ == "__main__":
-    generate_sample_data()
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate sample universe data")
+    parser.add_argument("--csv", action="store_true", help="Write sample_universe_data.csv instead of Parquet")
+    args = parser.parse_args()
+    
+    # The standalone sample file is kept around, so favour size over decode speed
+    generate_sample_data("sample_universe_data.csv" if args.csv else None, compression="zstd")
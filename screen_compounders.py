@@ -3,24 +3,95 @@ Capital Compounder Screening Script
 Run: python3 screen_compounders.py
 """
 
+import argparse
 import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
 from config import FILTERS
+from table_io import HAS_PYARROW, read_table
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Filter thresholds bound once at import so the predicates skip the dict lookups
+_ROIC_MIN = FILTERS["roic_min"]
+_CAPEX_MAX = FILTERS["capex_to_revenue_max"]
+_INC_ROIC_OVERRIDE = FILTERS["incremental_roic_override"]
+_FCF_CONV_MIN = FILTERS["fcf_conversion_min"]
+_FCF_CONV_OVERRIDE_MIN = FILTERS["fcf_conversion_override_min"]
+_INC_ROIC_MIN = FILTERS["incremental_roic_min"]
+_GM_MIN = FILTERS["gross_margin_min"]
+_GROWTH_MIN = FILTERS["revenue_growth_min"]
+_LEVERAGE_MAX = FILTERS["net_debt_ebitda_max"]
+
+def _load(path):
+    if HAS_ORJSON:
+        with open(path, "rb") as file:
+            return orjson.loads(file.read())
+    with open(path) as file:
+        return json.load(file)
 
 def load_cached_data():
     cache_dir = Path("cache/ticker_data")
-    tickers = []
-    for f in cache_dir.glob("*.json"):
-        with open(f) as file:
-            data = json.load(file)
-            if data.get("data_quality") == "complete":
-                tickers.append(data)
-    return tickers
+    if not cache_dir.is_dir():
+        return []
+    # File reads overlap on a pool; map keeps directory order
+    with os.scandir(cache_dir) as it:
+        files = [e.path for e in it if e.name.endswith(".json")]
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        loaded = list(ex.map(_load, files))
+    return [data for data in loaded if data.get("data_quality") == "complete"]
+
+def load_cached_frame(cache_format="json"):
+    """
+    Complete cached tickers as one DataFrame. With cache_format="parquet" the
+    rows come from run_batch's Parquet batches (latest row per ticker per
+    cache/manifest.json) instead of one JSON file per ticker.
+    """
+    manifest_path = Path("cache/manifest.json")
+    if cache_format == "parquet" and not HAS_PYARROW:
+        print("⚠️  pyarrow not installed - reading JSON cache")
+        cache_format = "json"
+    elif cache_format == "parquet" and not manifest_path.exists():
+        print("⚠️  No Parquet manifest (run_batch.py --cache-format parquet) - reading JSON cache")
+        cache_format = "json"
+    if cache_format != "parquet":
+        return pd.DataFrame(load_cached_data())
+    
+    cache_dir = Path("cache/ticker_data")
+    rows_by_file = {}
+    for name, row in _load(manifest_path).values():
+        rows_by_file.setdefault(name, []).append(row)
+    frames = [read_table(str(cache_dir / name)).iloc[sorted(rows)]
+              for name, rows in sorted(rows_by_file.items())]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if "data_quality" in df.columns:
+        df = df[df["data_quality"] == "complete"].reset_index(drop=True)
+    return df
+
+def _coalesce(t, primary, fallback):
+    """t[primary] unless it is missing/None, else t[fallback], else 0."""
+    value = t.get(primary)
+    if value is None:
+        value = t.get(fallback)
+    return value if value is not None else 0
 
 def passes_filters(t):
     """Apply Tier 1 filter logic."""
-    roic = t.get("roic_3y_avg") or t.get("roic_current") or 0
-    roic_ex_gw = t.get("roic_ex_goodwill_3y_avg") or t.get("roic_ex_goodwill") or 0
+    # Fall back only when the 3y average is missing; a real 0.0 average stands
+    roic = _coalesce(t, "roic_3y_avg", "roic_current")
+    roic_ex_gw = _coalesce(t, "roic_ex_goodwill_3y_avg", "roic_ex_goodwill")
     inc_roic = t.get("incremental_roic", 0)
     gm = t.get("gross_margin", 0)
     fcf = t.get("fcf_conversion", 0)
@@ -29,54 +100,121 @@ def passes_filters(t):
     leverage = t.get("net_debt_ebitda", 0)
     
     # Filter checks with overrides
-    roic_pass = (roic >= FILTERS["roic_min"]) or (roic_ex_gw >= FILTERS["roic_min"])
+    roic_pass = (roic >= _ROIC_MIN) or (roic_ex_gw >= _ROIC_MIN)
     
-    capex_pass = (capex <= FILTERS["capex_to_revenue_max"]) or \
-                 (inc_roic >= FILTERS["incremental_roic_override"])
+    capex_pass = (capex <= _CAPEX_MAX) or \
+                 (inc_roic >= _INC_ROIC_OVERRIDE)
     
-    fcf_pass = (fcf >= FILTERS["fcf_conversion_min"]) or \
-               (fcf >= FILTERS["fcf_conversion_override_min"] and 
-                inc_roic >= FILTERS["incremental_roic_override"])
+    fcf_pass = (fcf >= _FCF_CONV_MIN) or \
+               (fcf >= _FCF_CONV_OVERRIDE_MIN and 
+                inc_roic >= _INC_ROIC_OVERRIDE)
     
-    inc_roic_pass = inc_roic >= FILTERS["incremental_roic_min"]
+    inc_roic_pass = inc_roic >= _INC_ROIC_MIN
     
     return (roic_pass and 
-            gm >= FILTERS["gross_margin_min"] and 
+            gm >= _GM_MIN and 
             fcf_pass and 
-            growth >= FILTERS["revenue_growth_min"] and 
+            growth >= _GROWTH_MIN and 
             capex_pass and 
-            leverage <= FILTERS["net_debt_ebitda_max"] and 
+            leverage <= _LEVERAGE_MAX and 
+            inc_roic_pass)
+
+def _raw(df, col):
+    """Column as float64 with missing values (or a missing column) as NaN."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _num(df, col):
+    """Column as float64 with missing values (or a missing column) as 0."""
+    return np.nan_to_num(_raw(df, col), nan=0.0)
+
+
+def _coalesce_cols(df, primary, fallback):
+    """Vector coalesce: primary where present, else fallback, else 0."""
+    a = _raw(df, primary)
+    return np.where(np.isnan(a), _num(df, fallback), a)
+
+
+def filter_mask(df):
+    """passes_filters over a whole universe DataFrame at once; returns a boolean array."""
+    roic = _coalesce_cols(df, "roic_3y_avg", "roic_current")
+    roic_ex_gw = _coalesce_cols(df, "roic_ex_goodwill_3y_avg", "roic_ex_goodwill")
+    inc_roic = _num(df, "incremental_roic")
+    gm = _num(df, "gross_margin")
+    fcf = _num(df, "fcf_conversion")
+    growth = _num(df, "revenue_growth_3y")
+    capex = _num(df, "capex_to_revenue")
+    leverage = _num(df, "net_debt_ebitda")
+    
+    # Filter checks with overrides
+    roic_pass = (roic >= _ROIC_MIN) | (roic_ex_gw >= _ROIC_MIN)
+    
+    capex_pass = (capex <= _CAPEX_MAX) | \
+                 (inc_roic >= _INC_ROIC_OVERRIDE)
+    
+    fcf_pass = (fcf >= _FCF_CONV_MIN) | \
+               ((fcf >= _FCF_CONV_OVERRIDE_MIN) &
+                (inc_roic >= _INC_ROIC_OVERRIDE))
+    
+    inc_roic_pass = inc_roic >= _INC_ROIC_MIN
+    
+    return (roic_pass &
+            (gm >= _GM_MIN) &
+            fcf_pass &
+            (growth >= _GROWTH_MIN) &
+            capex_pass &
+            (leverage <= _LEVERAGE_MAX) &
             inc_roic_pass)
 
-def main():
-    tickers = load_cached_data()
-    passed = [t for t in tickers if passes_filters(t)]
+# Fields shown in the report, cleaned like the old per-row `.get(...) or 0`
+REPORT_COLS = ["roic_3y_avg", "incremental_roic", "gross_margin", "fcf_conversion",
+               "revenue_growth_3y", "fcf_yield", "market_cap", "capex_to_revenue"]
+ROW_FMT = ("{r.flag:2} {r.ticker:6} | {r.roic:5.1f}% | {r.inc_roic:6.1f}% | {r.gm:4.0f}% | "
+           "{r.fcf_conv:4.0f}% | {r.growth:4.0f}% | {r.fcf_yield:6.1f}% | ${r.mcap:6.0f}B")
+
+def main(cache_format="json"):
+    df = load_cached_frame(cache_format)
+    mask = filter_mask(df)
+    
+    report = pd.DataFrame({col: _num(df, col) for col in REPORT_COLS}, index=df.index)
+    report.insert(0, "ticker", df["ticker"] if "ticker" in df.columns else "")
+    # Stable descending sort keeps cache order among equal yields, as sorted() did
+    passed_df = report[mask].sort_values("fcf_yield", ascending=False, kind="stable")
     
-    print(f"\nCAPITAL COMPOUNDERS SCREEN: {len(passed)} PASSED / {len(tickers)} TOTAL")
+    print(f"\nCAPITAL COMPOUNDERS SCREEN: {len(passed_df)} PASSED / {len(df)} TOTAL")
     print("=" * 110)
     print(f"{'':2} {'Ticker':<6} | {'ROIC':>6} | {'IncROIC':>7} | {'GM':>5} | {'FCF%':>5} | {'Grth':>5} | {'FCF Yld':>7} | {'MCap':>8}")
     print("-" * 110)
     
-    for t in sorted(passed, key=lambda x: x.get("fcf_yield") or 0, reverse=True):
-        ticker = t.get("ticker")
-        roic = (t.get("roic_3y_avg") or 0) * 100
-        inc_roic = t.get("incremental_roic", 0) * 100
-        gm = t.get("gross_margin", 0) * 100
-        fcf_conv = t.get("fcf_conversion", 0) * 100
-        growth = t.get("revenue_growth_3y", 0) * 100
-        fcf_yield = (t.get("fcf_yield") or 0) * 100
-        mcap = t.get("market_cap", 0) / 1e9
-        capex = t.get("capex_to_revenue", 0) * 100
-        
-        flags = ""
-        if capex > 7: flags += "^"
-        if fcf_conv < 80 and inc_roic >= 15: flags += "+"
-        if inc_roic == 0: flags += "○"
-        flags = flags.ljust(2)
-        
-        print(f"{flags} {ticker:6} | {roic:5.1f}% | {inc_roic:6.1f}% | {gm:4.0f}% | {fcf_conv:4.0f}% | {growth:4.0f}% | {fcf_yield:6.1f}% | ${mcap:6.0f}B")
+    # Scale whole columns once; the row loop only formats
+    pct = {col: passed_df[col].to_numpy() * 100.0 for col in REPORT_COLS if col != "market_cap"}
+    mcap_b = passed_df["market_cap"].to_numpy() / 1e9
+    
+    inc = pct["incremental_roic"]
+    flag_cols = np.char.add(
+        np.char.add(np.where(pct["capex_to_revenue"] > 7, "^", ""),
+                    np.where((pct["fcf_conversion"] < 80) & (inc >= 15), "+", "")),
+        np.where(inc == 0, "○", ""))
+    
+    # One structured record per passed row; the loop reads fields off the buffer
+    rec = np.rec.fromarrays(
+        [flag_cols, passed_df["ticker"].to_numpy(), pct["roic_3y_avg"], inc,
+         pct["gross_margin"], pct["fcf_conversion"], pct["revenue_growth_3y"],
+         pct["fcf_yield"], mcap_b],
+        names="flag,ticker,roic,inc_roic,gm,fcf_conv,growth,fcf_yield,mcap")
+    
+    # Format every row, then hand stdout the whole block in one write
+    lines = [ROW_FMT.format(r=r) for r in rec]
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
     
     print("\n^ = High CapEx override  + = Low FCF override  ○ = Mature compounder")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Capital compounder screen over cached ticker data")
+    parser.add_argument("--cache-format", choices=["json", "parquet"], default="json",
+                        help="Read the per-ticker JSON cache or run_batch's Parquet batches")
+    args = parser.parse_args()
+    main(args.cache_format)
@@ -1,10 +1,27 @@
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from pathlib import Path
 
+try:
+    import requests_cache
+    HAS_REQUESTS_CACHE = True
+except ImportError:
+    HAS_REQUESTS_CACHE = False
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
 ROOT = Path(__file__).resolve().parents[1]
 load_dotenv(ROOT / "private" / ".env")
 API = os.getenv("FMP_API_KEY")
@@ -12,16 +29,49 @@ API = os.getenv("FMP_API_KEY")
 if not API:
     raise SystemExit("Add FMP_API_KEY to private/.env")
 
+# One keep-alive session shared by every call (and thread). With requests-cache
+# installed, statements are served from disk for 12h; the key is not part of
+# the cache key, so rotating it keeps the cache. Otherwise httpx (if present)
+# multiplexes the concurrent calls over HTTP/2 connections.
+if HAS_REQUESTS_CACHE:
+    (ROOT / "cache").mkdir(exist_ok=True)
+    SESSION = requests_cache.CachedSession(
+        str(ROOT / "cache" / "fmp_http_cache"),
+        backend="sqlite",
+        expire_after=timedelta(hours=12),
+        ignored_parameters=["apikey"],
+    )
+    SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+elif HAS_HTTPX:
+    SESSION = httpx.Client(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+    )
+else:
+    SESSION = requests.Session()
+    SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
 def fmp(url):
-    r = requests.get(url + f"&apikey={API}")
+    r = SESSION.get(url + f"&apikey={API}")
     r.raise_for_status()
     return r.json()
 
-def get_metrics(ticker):
-    bs = fmp(f"https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?limit=2")
-    is_ = fmp(f"https://financialmodelingprep.com/api/v3/income-statement/{ticker}?limit=2")
-    cf = fmp(f"https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?limit=2")
-    prof = fmp(f"https://financialmodelingprep.com/api/v3/profile/{ticker}")
+def get_profiles(tickers):
+    """One batch profile call for every ticker, keyed by symbol."""
+    rows = fmp(f"https://financialmodelingprep.com/api/v3/profile/{','.join(tickers)}?")
+    return {row["symbol"]: row for row in rows}
+
+def get_metrics(ticker, profile=None):
+    if profile is None:
+        # Not in the batch response (delisted/renamed) - ask once on its own
+        profile = get_profiles([ticker]).get(ticker)
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        bs, is_, cf = ex.map(fmp, [
+            f"https://financialmodelingprep.com/api/v3/balance-sheet-statement/{ticker}?limit=2",
+            f"https://financialmodelingprep.com/api/v3/income-statement/{ticker}?limit=2",
+            f"https://financialmodelingprep.com/api/v3/cash-flow-statement/{ticker}?limit=2",
+        ])
 
     bs0 = bs[0]
     is0 = is_[0]
@@ -44,24 +94,31 @@ def get_metrics(ticker):
 
     reinvest = capex / max(nopat, 1)
 
-    beta = prof[0]["beta"]
+    # No profile means no beta: WACC is reported as NaN, the ROIC columns still stand
+    beta = profile.get("beta") if profile else None
     rf = 0.045
     erp = 0.055
-    cost_equity = rf + beta * erp
+    cost_equity = rf + beta * erp if beta is not None else np.nan
     wacc = cost_equity   # simple no-debt assumption
 
-    return {
-        "Ticker": ticker,
-        "ROIC": round(roic, 3),
-        "ROIC ex-cash": round(roic_x, 3),
-        "Reinvestment Rate": round(reinvest, 3),
-        "WACC": round(wacc, 3)
-    }
+    return ticker, round(roic, 3), round(roic_x, 3), round(reinvest, 3), round(wacc, 3)
 
 def main():
-    tickers = sys.argv[1:]
-    rows = [get_metrics(t) for t in tickers]
-    df = pd.DataFrame(rows)
+    tickers = [t.upper() for t in sys.argv[1:]]
+    if not tickers:
+        raise SystemExit("Usage: python scripts/quick_metrics.py TICKER [TICKER ...]")
+    profiles = get_profiles(tickers)
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        rows = list(ex.map(lambda t: get_metrics(t, profiles.get(t)), tickers))
+    # Columns go in as finished 1-D arrays instead of per-row dicts
+    names, roic, roic_x, reinvest, wacc = (np.array(col) for col in zip(*rows))
+    df = pd.DataFrame({
+        "Ticker": names,
+        "ROIC": roic,
+        "ROIC ex-cash": roic_x,
+        "Reinvestment Rate": reinvest,
+        "WACC": wacc,
+    }, copy=False)
     print(df.to_string(index=False))
 
 if __name__ == "__main__":
@@ -16,13 +16,26 @@ USAGE:
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import os
+import sys
 import time
+import threading
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # You'll need to create config.py with: FMP_API_KEY = "your_key_here"
 try:
     from config import FMP_API_KEY
@@ -31,6 +44,52 @@ except ImportError:
     print("⚠️  No config.py found. Set FMP_API_KEY environment variable or create config.py")
 
 
+# Statement fields feeding ROIC ex-cash, in _roic_ex_cash_vec argument order
+STATEMENT_FIELDS = (
+    ("income", "operatingIncome"),
+    ("income", "revenue"),
+    ("income", "incomeTaxExpense"),
+    ("income", "incomeBeforeTax"),
+    ("balance", "totalAssets"),
+    ("balance", "totalCurrentLiabilities"),
+    ("balance", "cashAndCashEquivalents"),
+    ("balance", "shortTermInvestments"),
+)
+# Fields a screener row must carry for ROIC to be computed without statement calls
+# (all of them: a missing tax or short-term-investments field is not a 0)
+SCREENER_ROIC_FIELDS = tuple(key for _, key in STATEMENT_FIELDS)
+
+
+def _roic_ex_cash_vec(oi, rev, tax, pretax, ta, cl, cash, sti) -> Dict[str, np.ndarray]:
+    """
+    ROIC ex-cash arithmetic over arrays of tickers (see calculate_roic_ex_cash).
+    roic_ex_cash is NaN where invested capital ex-cash is not positive.
+    """
+    # Effective tax rate, capped at 35%; 21% when pretax income isn't positive
+    tax_rate = np.where(pretax > 0, np.minimum(tax / np.where(pretax > 0, pretax, 1), 0.35), 0.21)
+    nopat = oi * (1 - tax_rate)
+    invested_capital = ta - cl
+    
+    # Operating expenses ≈ Revenue - Operating Income (rough proxy); keep 6 months
+    opex = np.where(rev > oi, rev - oi, rev * 0.7)
+    total_cash = cash + sti
+    excess_cash = np.maximum(0, total_cash - opex / 2)
+    
+    adjusted_ic = invested_capital - excess_cash
+    roic = np.where(adjusted_ic > 0, nopat / np.where(adjusted_ic > 0, adjusted_ic, 1), np.nan)
+    
+    return {
+        "nopat": nopat,
+        "operating_income": oi,
+        "tax_rate": tax_rate,
+        "invested_capital": invested_capital,
+        "cash_and_st_investments": total_cash,
+        "excess_cash": excess_cash,
+        "invested_capital_ex_cash": adjusted_ic,
+        "roic_ex_cash": roic,
+    }
+
+
 class Stage1Screener:
     """
     Stage 1: Universe Filter
@@ -45,6 +104,21 @@ class Stage1Screener:
         self.base_url = "https://financialmodelingprep.com/stable"
         self.stable_url = "https://financialmodelingprep.com/stable"
         self.request_delay = 0.2  # 300 calls/min = 5/sec, use 0.2s to be safe
+        self.max_workers = 8      # tickers in flight; request_delay still caps the call rate
+        
+        # Keep-alive connections shared by the worker threads
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=self.max_workers,
+                                                   pool_maxsize=self.max_workers))
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+        
+        # Annual statements only change quarterly; keep them on disk between runs
+        self.statement_cache_dir = Path(__file__).parent / "cache" / "stage1"
+        self.statement_cache_days = 30
+        self.refresh_cache = False
+        self.quiet = False          # skip the per-candidate lines
+        self.log_flush_every = 200  # candidate lines buffered per stdout write
         
         # Stage 1 thresholds
         self.MIN_MARKET_CAP = 1_000_000_000  # $1B
@@ -55,22 +129,61 @@ class Stage1Screener:
         self.api_calls = 0
         self.start_time = None
         
+    def _wait_for_slot(self):
+        """
+        Space call starts request_delay apart across all threads. Unlike a sleep
+        after each call, requests already in flight overlap their latency.
+        """
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.request_delay
+        if slot > now:
+            time.sleep(slot - now)
+    
     def _make_request(self, url: str, params: Dict = None) -> Optional[Dict]:
         """Make API request with rate limiting."""
-        if params is None:
-            params = {}
-        params["apikey"] = self.api_key
+        params = dict(params or {}, apikey=self.api_key)
         
         try:
-            response = requests.get(url, params=params, timeout=30)
+            self._wait_for_slot()
+            response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
-            self.api_calls += 1
-            time.sleep(self.request_delay)
+            with self._rate_lock:
+                self.api_calls += 1
             return response.json()
         except Exception as e:
             print(f"  ⚠️ API error: {e}")
             return None
     
+    def _get_statement(self, endpoint: str, ticker: str) -> Optional[List[Dict]]:
+        """
+        Latest annual statement for ticker, served from cache/stage1/<endpoint>/
+        when younger than statement_cache_days. Only non-empty responses are stored.
+        """
+        path = self.statement_cache_dir / endpoint / f"{ticker}_annual_1.json"
+        if not self.refresh_cache:
+            try:
+                with open(path) as f:
+                    cached = json.load(f)
+                if time.time() - cached["ts"] < self.statement_cache_days * 86400:
+                    return cached["data"]
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        data = self._make_request(f"{self.stable_url}/{endpoint}",
+                                  {"symbol": ticker, "period": "annual", "limit": 1})
+        if data:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({"ts": time.time(), "data": data}, f)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"  ⚠️ Statement cache not written for {ticker}: {e}")
+        return data
+    
     def get_screener_results(self, min_mcap: int = None, min_gm: float = None) -> List[Dict]:
         """
         Use FMP stock screener to get initial universe.
@@ -102,7 +215,27 @@ class Stage1Screener:
         print(f"   ✓ Found {len(results)} companies passing market cap + gross margin filters")
         return results
     
-    def calculate_roic_ex_cash(self, ticker: str) -> Tuple[Optional[float], Dict]:
+    def get_statement_fields(self, ticker: str, stock_row: Dict = None) -> Optional[Tuple[float, ...]]:
+        """
+        Latest annual STATEMENT_FIELDS values for ticker (missing -> 0), or None.
+        Taken straight from stock_row (a screener result) when it already carries
+        every STATEMENT_FIELDS key, skipping both statement calls.
+        """
+        if stock_row and all(key in stock_row for key in SCREENER_ROIC_FIELDS):
+            return tuple(stock_row.get(key, 0) or 0 for _, key in STATEMENT_FIELDS)
+        
+        income = self._get_statement("income-statement", ticker)
+        if not income or len(income) == 0:
+            return None
+        
+        balance = self._get_statement("balance-sheet-statement", ticker)
+        if not balance or len(balance) == 0:
+            return None
+        
+        statements = {"income": income[0], "balance": balance[0]}
+        return tuple(statements[src].get(key, 0) or 0 for src, key in STATEMENT_FIELDS)
+    
+    def calculate_roic_ex_cash(self, ticker: str, stock_row: Dict = None) -> Tuple[Optional[float], Dict]:
         """
         Calculate ROIC excluding excess cash for a single ticker.
         
@@ -112,78 +245,22 @@ class Stage1Screener:
         - NOPAT = Operating Income × (1 - Tax Rate)
         - Invested Capital = Total Assets - Current Liabilities (non-interest bearing)
         - Excess Cash = Cash - (6 months operating expenses)
+        
+        stock_row, if given, is the ticker's screener result; see get_statement_fields.
         """
         details = {"ticker": ticker}
         
-        # Get income statement
-        income_url = f"{self.stable_url}/income-statement"
-        income = self._make_request(income_url, {"symbol": ticker, "period": "annual", "limit": 1})
-        
-        if not income or len(income) == 0:
-            return None, details
-        
-        inc = income[0]
-        
-        # Get balance sheet
-        balance_url = f"{self.stable_url}/balance-sheet-statement"
-        balance = self._make_request(balance_url, {"symbol": ticker, "period": "annual", "limit": 1})
-        
-        if not balance or len(balance) == 0:
+        fields = self.get_statement_fields(ticker, stock_row)
+        if fields is None:
             return None, details
         
-        bal = balance[0]
+        metrics = _roic_ex_cash_vec(*np.array(fields, dtype=np.float64).reshape(-1, 1))
+        details.update((key, float(values[0])) for key, values in metrics.items())
         
-        # Calculate NOPAT
-        operating_income = inc.get("operatingIncome", 0) or 0
-        revenue = inc.get("revenue", 0) or 0
-        
-        # Estimate effective tax rate (use 21% if not calculable)
-        income_tax = inc.get("incomeTaxExpense", 0) or 0
-        pretax_income = inc.get("incomeBeforeTax", 0) or 0
-        
-        if pretax_income > 0:
-            tax_rate = min(income_tax / pretax_income, 0.35)  # Cap at 35%
-        else:
-            tax_rate = 0.21
-        
-        nopat = operating_income * (1 - tax_rate)
-        details["nopat"] = nopat
-        details["operating_income"] = operating_income
-        details["tax_rate"] = tax_rate
-        
-        # Calculate Invested Capital
-        total_assets = bal.get("totalAssets", 0) or 0
-        current_liabilities = bal.get("totalCurrentLiabilities", 0) or 0
-        cash = bal.get("cashAndCashEquivalents", 0) or 0
-        short_term_investments = bal.get("shortTermInvestments", 0) or 0
-        
-        # Invested Capital = Total Assets - Non-Debt Current Liabilities
-        # Simplified: Total Assets - Current Liabilities (assumes most CL is non-debt)
-        invested_capital = total_assets - current_liabilities
-        details["invested_capital"] = invested_capital
-        
-        # Calculate Excess Cash
-        # Excess Cash = Cash + ST Investments - (6 months of operating expenses)
-        # Operating expenses ≈ Revenue - Operating Income (rough proxy)
-        operating_expenses = revenue - operating_income if revenue > operating_income else revenue * 0.7
-        six_months_opex = operating_expenses / 2
-        
-        total_cash = cash + short_term_investments
-        excess_cash = max(0, total_cash - six_months_opex)
-        details["cash_and_st_investments"] = total_cash
-        details["excess_cash"] = excess_cash
-        
-        # Calculate ROIC ex-cash
-        adjusted_ic = invested_capital - excess_cash
-        details["invested_capital_ex_cash"] = adjusted_ic
-        
-        if adjusted_ic <= 0:
+        if np.isnan(details["roic_ex_cash"]):
+            del details["roic_ex_cash"]
             return None, details
-        
-        roic_ex_cash = nopat / adjusted_ic
-        details["roic_ex_cash"] = roic_ex_cash
-        
-        return roic_ex_cash, details
+        return details["roic_ex_cash"], details
     
     def run_stage1_screen(self, 
                           min_mcap: int = None,
@@ -251,26 +328,45 @@ class Stage1Screener:
             tickers_to_process = initial_universe[:max_tickers]
             print(f"   (Limited to {max_tickers} tickers for testing)")
         
+        # Statement fetches run on a thread pool; results come back in universe order
+        fields = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+            fetched = ex.map(lambda stock: self.get_statement_fields(stock.get("symbol", ""), stock),
+                             tickers_to_process)
+            for i, row in enumerate(fetched):
+                # Progress indicator
+                if (i + 1) % 50 == 0 or i == 0:
+                    elapsed = (datetime.now() - self.start_time).total_seconds() / 60
+                    print(f"   Processing {i+1}/{len(tickers_to_process)} ({elapsed:.1f} min elapsed)...")
+                fields.append(row)
+        
+        # One vectorized ROIC pass over the whole batch; tickers without statements stay NaN
+        has_data = np.array([row is not None for row in fields], dtype=bool)
+        matrix = np.array([row or (0.0,) * len(STATEMENT_FIELDS) for row in fields],
+                          dtype=np.float64).reshape(-1, len(STATEMENT_FIELDS))
+        metrics = _roic_ex_cash_vec(*matrix.T)
+        roic = np.where(has_data, metrics["roic_ex_cash"], np.nan)
+        passed = roic >= min_roic
+        
+        roic_list = roic.tolist()
+        nopat_list = metrics["nopat"].tolist()
+        ic_ex_list = metrics["invested_capital_ex_cash"].tolist()
+        excess_list = metrics["excess_cash"].tolist()
+        
+        log_lines = []
         for i, stock in enumerate(tickers_to_process):
             ticker = stock.get("symbol", "")
             name = stock.get("companyName", "")[:30]
             mcap = stock.get("marketCap", 0) or 0
             gm = stock.get("grossProfitMargin", 0) or 0
+            roic_ex_cash = roic_list[i]
             
-            # Progress indicator
-            if (i + 1) % 50 == 0 or i == 0:
-                elapsed = (datetime.now() - self.start_time).total_seconds() / 60
-                print(f"   Processing {i+1}/{len(tickers_to_process)} ({elapsed:.1f} min elapsed)...")
-            
-            # Calculate ROIC ex-cash
-            roic_ex_cash, details = self.calculate_roic_ex_cash(ticker)
-            
-            if roic_ex_cash is None:
+            if np.isnan(roic_ex_cash):
                 errors.append({"ticker": ticker, "name": name, "reason": "Could not calculate ROIC"})
                 continue
             
             # Check ROIC threshold
-            if roic_ex_cash >= min_roic:
+            if passed[i]:
                 candidates.append({
                     "ticker": ticker,
                     "company_name": name,
@@ -278,15 +374,19 @@ class Stage1Screener:
                     "market_cap_b": mcap / 1e9,
                     "gross_margin": gm,
                     "roic_ex_cash": roic_ex_cash,
-                    "nopat": details.get("nopat"),
-                    "invested_capital_ex_cash": details.get("invested_capital_ex_cash"),
-                    "excess_cash": details.get("excess_cash"),
+                    "nopat": nopat_list[i],
+                    "invested_capital_ex_cash": ic_ex_list[i],
+                    "excess_cash": excess_list[i],
                     "sector": stock.get("sector", ""),
                     "industry": stock.get("industry", ""),
                     "exchange": stock.get("exchangeShortName", ""),
                     "country": stock.get("country", ""),
                 })
-                print(f"   ✓ {ticker:8} ROIC: {roic_ex_cash*100:5.1f}% | GM: {gm*100:4.0f}% | MCap: ${mcap/1e9:6.1f}B | {name}")
+                if not self.quiet:
+                    log_lines.append(f"   ✓ {ticker:8} ROIC: {roic_ex_cash*100:5.1f}% | GM: {gm*100:4.0f}% | MCap: ${mcap/1e9:6.1f}B | {name}")
+                    if len(log_lines) >= self.log_flush_every:
+                        sys.stdout.write("\n".join(log_lines) + "\n")
+                        log_lines.clear()
             else:
                 rejected.append({
                     "ticker": ticker,
@@ -294,6 +394,8 @@ class Stage1Screener:
                     "roic_ex_cash": roic_ex_cash,
                     "reason": f"ROIC {roic_ex_cash*100:.1f}% < {min_roic*100:.0f}%"
                 })
+        if log_lines:
+            sys.stdout.write("\n".join(log_lines) + "\n")
         
         # Calculate statistics
         elapsed = (datetime.now() - self.start_time).total_seconds()
@@ -343,15 +445,17 @@ class Stage1Screener:
     
     def export_ticker_list(self, results: Dict, output_path: str = "stage1_candidates.json"):
         """Export results to JSON for downstream processing."""
-        with open(output_path, 'w') as f:
-            json.dump(results, f, indent=2)
+        if HAS_ORJSON:
+            Path(output_path).write_bytes(
+                orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(output_path, 'w') as f:
+                json.dump(results, f, indent=2)
         print(f"\n💾 Results saved to: {output_path}")
         
         # Also export simple ticker list for easy feeding to fmp_data.py
         ticker_list_path = output_path.replace('.json', '_tickers.txt')
-        with open(ticker_list_path, 'w') as f:
-            for c in results.get("candidates", []):
-                f.write(c["ticker"] + "\n")
+        Path(ticker_list_path).write_text("".join(c["ticker"] + "\n" for c in results.get("candidates", [])))
         print(f"💾 Ticker list saved to: {ticker_list_path}")
         
         return output_path
@@ -366,6 +470,8 @@ def main():
     parser.add_argument('--max-tickers', type=int, help='Max tickers to process (for testing)')
     parser.add_argument('--output', type=str, default='stage1_candidates.json', help='Output file path')
     parser.add_argument('--api-key', type=str, help='FMP API key (or set in config.py)')
+    parser.add_argument('--quiet', action='store_true', help="Don't list each passing ticker")
+    parser.add_argument('--refresh-cache', action='store_true', help='Refetch statements instead of using cache/stage1 (30-day TTL)')
     
     args = parser.parse_args()
     
@@ -383,6 +489,8 @@ def main():
         return
     
     screener = Stage1Screener(api_key=api_key)
+    screener.refresh_cache = args.refresh_cache
+    screener.quiet = args.quiet
     
     # Run screen
     results = screener.run_stage1_screen(
@@ -1,11 +1,22 @@
 """Stage 2 Quality Filter - Full Criteria"""
 import json
+import os
+import re
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
 
-# Industries to EXCLUDE
-EXCLUDED_INDUSTRIES = [
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Industries to EXCLUDE (sets: passes_stage2 does membership tests per ticker)
+EXCLUDED_INDUSTRIES = frozenset([
     "Banks - Regional",
     "Banks - Diversified", 
     "Insurance - Property & Casualty",
@@ -25,69 +36,108 @@ EXCLUDED_INDUSTRIES = [
     "Uranium",
     "Marine Shipping",
     "Tobacco",
-]
+])
 
 # Specific tickers to WHITELIST (override industry exclusion)
-WHITELIST_TICKERS = [
+WHITELIST_TICKERS = frozenset([
     "BRK-A", "BRK-B",  # Berkshire - conglomerate
     "BBSEY",           # BB Seguridade - insurance distributor
     "DFS",             # Discover - credit card
     "MA", "V",         # Card networks
     "AXP",             # Amex
-]
+])
 
 # Industries with ROIC cap (data often unreliable)
-ROIC_CAPPED_INDUSTRIES = [
+ROIC_CAPPED_INDUSTRIES = frozenset([
     "Asset Management",
     "Financial - Capital Markets",
-]
+])
+
+# Trailing legal-form suffix on a lowercased company name ("apple inc.", "nestle s.a.")
+_SUFFIX_RE = re.compile(
+    r"[ ,.](inc|ltd|plc|corporation|corp|s\.?a\.?|a\.?g\.?|s\.?e\.?|n\.?v\.?|ab|asa|"
+    r"limited|group|holding|co)\.?\s*$", re.I)
+
+def company_key(name):
+    """Company name with trailing legal suffixes stripped, for grouping dual listings."""
+    name = name.lower().strip()
+    while True:
+        stripped = _SUFFIX_RE.sub("", name).strip(" ,.")
+        if stripped == name:
+            return name
+        name = stripped
+
+# Metrics reported for a ticker that fails before the quality gates
+_ZERO_METRICS = MappingProxyType({
+    "roic_ex": 0, "vcr_ex": 0, "spread_ex": 0, "wacc": 0,
+    "pass_roic": False, "pass_vcr": False, "pass_spread": False,
+})
+
+def _load(path):
+    if HAS_ORJSON:
+        with open(path, "rb") as file:
+            return orjson.loads(file.read())
+    with open(path) as file:
+        return json.load(file)
 
 def get_fcf_yield(t):
     return t.get("fcf_yield", 0) or 0
 
-def passes_stage2(t, ticker):
-    industry = t.get("industry", "")
+@dataclass(slots=True)
+class TickerRow:
+    """The cache fields passes_stage2 reads, cleaned once (missing/None -> 0)."""
+    industry: str
+    mcap: float  # $B
+    gm: float
+    roic_current: float
+    roic_3y_avg: float
+    roic_ex_goodwill: float
+    roic_ex_goodwill_3y_avg: float
+    wacc: float
+    fcf_yield: float
+    
+    @classmethod
+    def from_cache(cls, t):
+        return cls(
+            industry=t.get("industry", ""),
+            mcap=(t.get("market_cap", 0) or 0) / 1e9,
+            gm=t.get("gross_margin", 0) or 0,
+            roic_current=t.get("roic_current", 0) or 0,
+            roic_3y_avg=t.get("roic_3y_avg", 0) or 0,
+            roic_ex_goodwill=t.get("roic_ex_goodwill", 0) or 0,
+            roic_ex_goodwill_3y_avg=t.get("roic_ex_goodwill_3y_avg", 0) or 0,
+            wacc=t.get("wacc", 0.10) or 0.10,
+            fcf_yield=get_fcf_yield(t),
+        )
+
+def passes_stage2(row, ticker):
+    industry = row.industry
     
     # ============================================
     # HARD STOPS (Stage 1)
     # ============================================
-    mcap = (t.get("market_cap", 0) or 0) / 1e9
-    gm = t.get("gross_margin", 0) or 0
+    mcap = row.mcap
+    gm = row.gm
     
     # Market Cap >= $1B
     if mcap < 1.0:
-        return False, [f"HARD STOP: MCap ${mcap:.2f}B < $1B"], {
-            "roic_ex": 0, "vcr_ex": 0, "spread_ex": 0, "wacc": 0,
-            "pass_roic": False, "pass_vcr": False, "pass_spread": False
-        }
+        return False, [f"HARD STOP: MCap ${mcap:.2f}B < $1B"], dict(_ZERO_METRICS)
     
     # Gross Margin >= 20%
     if gm < 0.20:
-        return False, [f"HARD STOP: GM {gm*100:.0f}% < 20%"], {
-            "roic_ex": 0, "vcr_ex": 0, "spread_ex": 0, "wacc": 0,
-            "pass_roic": False, "pass_vcr": False, "pass_spread": False
-        }
+        return False, [f"HARD STOP: GM {gm*100:.0f}% < 20%"], dict(_ZERO_METRICS)
     
     # Check whitelist first for industry exclusion
     if ticker not in WHITELIST_TICKERS:
         if industry in EXCLUDED_INDUSTRIES:
-            return False, [f"EXCLUDED: {industry}"], {
-                "roic_ex": 0, "vcr_ex": 0, "spread_ex": 0, "wacc": 0,
-                "pass_roic": False, "pass_vcr": False, "pass_spread": False
-            }
+            return False, [f"EXCLUDED: {industry}"], dict(_ZERO_METRICS)
     
     # ============================================
     # ROIC CALCULATIONS
     # ============================================
-    roic = max(
-        t.get("roic_current", 0) or 0,
-        t.get("roic_3y_avg", 0) or 0
-    )
+    roic = max(row.roic_current, row.roic_3y_avg)
     
-    roic_ex_gw = max(
-        t.get("roic_ex_goodwill", 0) or 0,
-        t.get("roic_ex_goodwill_3y_avg", 0) or 0
-    )
+    roic_ex_gw = max(row.roic_ex_goodwill, row.roic_ex_goodwill_3y_avg)
     
     if roic_ex_gw > 0 and roic_ex_gw <= roic * 2 and roic_ex_gw <= 1.0:
         roic_ex = roic_ex_gw
@@ -96,25 +146,17 @@ def passes_stage2(t, ticker):
     else:
         roic_ex = roic
     
-    wacc = t.get("wacc", 0.10) or 0.10
+    wacc = row.wacc
     vcr_ex = roic_ex / wacc if wacc > 0 else 0
     spread_ex = roic_ex - wacc
     
-    fcf_yield = get_fcf_yield(t)
-    
-    # Data error check
-    data_error = False
-    if industry in ROIC_CAPPED_INDUSTRIES:
-        if roic_ex > 0.60:
-            data_error = True
-    else:
-        if roic_ex > 1.50:
-            data_error = True
+    fcf_yield = row.fcf_yield
     
-    if data_error:
+    # Data error check: most tickers clear the 60% cap, skipping the industry lookup
+    if roic_ex > 0.60 and (roic_ex > 1.50 or industry in ROIC_CAPPED_INDUSTRIES):
         return False, [f"ROICex {roic_ex*100:.0f}% DATA ERROR"], {
+            **_ZERO_METRICS,
             "roic_ex": roic_ex, "vcr_ex": vcr_ex, "spread_ex": spread_ex, "wacc": wacc,
-            "pass_roic": False, "pass_vcr": False, "pass_spread": False, 
             "fcf_yield": fcf_yield
         }
     
@@ -123,8 +165,8 @@ def passes_stage2(t, ticker):
     # ============================================
     if fcf_yield <= 0.01:
         return False, [f"FCF Yield {fcf_yield*100:.1f}% ≤ 1%"], {
+            **_ZERO_METRICS,
             "roic_ex": roic_ex, "vcr_ex": vcr_ex, "spread_ex": spread_ex, "wacc": wacc,
-            "pass_roic": False, "pass_vcr": False, "pass_spread": False, 
             "fcf_yield": fcf_yield
         }
     
@@ -152,6 +194,13 @@ def passes_stage2(t, ticker):
         "fcf_yield": fcf_yield,
     }
 
+# Fields whose presence earns a duplicate listing +10 in data_quality_score
+_SCORE_FIELDS = (
+    "roic_current", "roic_3y_avg", "roic_ex_goodwill", "gross_margin",
+    "revenue_growth_3y", "fcf_conversion", "fcf_yield", "value_creation_ratio",
+    "market_cap", "price", "wacc", "net_debt_ebitda",
+)
+
 def data_quality_score(t, raw_data):
     score = 0
     ticker = t["ticker"]
@@ -163,15 +212,7 @@ def data_quality_score(t, raw_data):
     
     score -= len(ticker) * 5
     
-    key_fields = [
-        "roic_current", "roic_3y_avg", "roic_ex_goodwill", "gross_margin",
-        "revenue_growth_3y", "fcf_conversion", "fcf_yield", "value_creation_ratio",
-        "market_cap", "price", "wacc", "net_debt_ebitda"
-    ]
-    for field in key_fields:
-        val = raw_data.get(field)
-        if val is not None and val != 0:
-            score += 10
+    score += 10 * sum(1 for field in _SCORE_FIELDS if raw_data.get(field) not in (None, 0))
     
     mcap = raw_data.get("market_cap", 0) or 0
     score += mcap / 1e11
@@ -185,12 +226,7 @@ def deduplicate(passed_list, raw_data_map):
     by_company = defaultdict(list)
     
     for t in passed_list:
-        name = t["name"].lower().strip()
-        for suffix in [" inc", " ltd", " plc", " corp", " sa", " ag", " se", " nv", 
-                       " ab", " asa", " limited", " group", " holding", " co"]:
-            name = name.replace(suffix, "")
-        name = name.strip()
-        by_company[name].append(t)
+        by_company[company_key(t["name"])].append(t)
     
     deduped = []
     removed = []
@@ -221,16 +257,24 @@ def run_filter():
     low_fcf = []
     raw_data_map = {}
     
-    for f in sorted(cache_dir.glob("*.json")):
-        with open(f) as file:
-            t = json.load(file)
+    # Reads and parses overlap on a pool; map keeps sorted order and the
+    # per-ticker work below stays on this thread
+    entries = []
+    if cache_dir.is_dir():
+        with os.scandir(cache_dir) as it:
+            entries = sorted((e for e in it if e.name.endswith(".json")), key=lambda e: e.name)
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        loaded = list(ex.map(_load, [e.path for e in entries]))
+    
+    for e, t in zip(entries, loaded):
         if t.get("data_quality") != "complete":
             continue
         
-        ticker = t.get("ticker", f.stem)
+        ticker = t.get("ticker", e.name[:-5])
         raw_data_map[ticker] = t
         
-        passes, failures, metrics = passes_stage2(t, ticker)
+        row = TickerRow.from_cache(t)
+        passes, failures, metrics = passes_stage2(row, ticker)
         
         criteria_met = sum([metrics.get("pass_roic", False), 
                            metrics.get("pass_vcr", False), 
@@ -240,12 +284,12 @@ def run_filter():
             "ticker": ticker,
             "name": t.get("company_name", "")[:22],
             "industry": t.get("industry", "")[:25],
-            "mcap_b": (t.get("market_cap", 0) or 0) / 1e9,
+            "mcap_b": row.mcap,
             "roic_ex": metrics["roic_ex"],
             "vcr_ex": metrics["vcr_ex"],
             "spread_ex": metrics["spread_ex"],
             "wacc": metrics["wacc"],
-            "gm": t.get("gross_margin", 0) or 0,
+            "gm": row.gm,
             "growth": t.get("revenue_growth_3y", 0) or 0,
             "fcf_yield": metrics.get("fcf_yield", 0),
             "pass_roic": metrics.get("pass_roic", False),
@@ -323,8 +367,8 @@ def run_filter():
     output = {
         "filter_date": datetime.now().isoformat(),
         "criteria": "MCap≥$1B + GM≥20% + FCF Yield>1% + (ROIC>15% OR VCR>1.5 OR Spread>5%)",
-        "excluded_industries": EXCLUDED_INDUSTRIES,
-        "whitelisted_tickers": WHITELIST_TICKERS,
+        "excluded_industries": sorted(EXCLUDED_INDUSTRIES),
+        "whitelisted_tickers": sorted(WHITELIST_TICKERS),
         "passed": len(passed),
         "all_three": all_three,
         "two_of_three": two_of_three,
@@ -335,8 +379,11 @@ def run_filter():
         "excluded_low_fcf": len(low_fcf),
         "watchlist": passed
     }
-    with open("stage2_master_watchlist.json", "w") as f:
-        json.dump(output, f, indent=2)
+    if HAS_ORJSON:
+        Path("stage2_master_watchlist.json").write_bytes(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    else:
+        with open("stage2_master_watchlist.json", "w") as f:
+            json.dump(output, f, indent=2)
     
     print(f"\n💾 stage2_master_watchlist.json ({len(passed)} tickers)")
 
@@ -7,32 +7,272 @@ Usage:
     python3 stage3_quality_screen.py              # Run/resume
     python3 stage3_quality_screen.py --status     # Check progress
     python3 stage3_quality_screen.py --reset      # Start over
+    python3 stage3_quality_screen.py --no-cache   # Run/resume, bypassing the HTTP cache
 """
 
+import atexit
+import csv
 import json
+import os
+import pickle
+import re
+import shelve
+import sys
+import threading
 import time
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 from config import FMP_API_KEY
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
+try:
+    import requests_cache
+    HAS_REQUESTS_CACHE = True
+except ImportError:
+    HAS_REQUESTS_CACHE = False
+
 # Configuration
 MIN_ROIC = 0.15          # 15%
 MIN_GROSS_MARGIN = 0.50  # 50%
 CALLS_PER_MINUTE = 145   # 2 calls per ticker, stay under 300/min
 DELAY = 60 / CALLS_PER_MINUTE
+MAX_WORKERS = 8          # batches in flight; RATE_LIMITER caps calls/min
+BATCH_SIZE = 50          # symbols per comma-separated key-metrics/ratios call
+
+BASE_URL = 'https://financialmodelingprep.com/stable'
 
 # Files
 STAGE2_RESULTS = 'screening_results.json'
 EXISTING_UNIVERSE = 'capital_compounders_master.csv'
 PROGRESS_FILE = 'stage3_progress.json'
+LOG_FILE = 'stage3_progress.jsonl'   # one line per finished ticker, append-only
+RUN_MARKERS = ('started', 'done')     # LOG_FILE records bracketing each run, for Stage 4 --follow
 RESULTS_FILE = 'stage3_quality_passed.json'
+CANDIDATES_CACHE = 'stage3_candidates.pkl'   # derived from the two input files above
+HTTP_CACHE = 'fmp_http_cache'   # requests-cache sqlite file, shared with Stage 4
+HTTP_CACHE_HOURS = 24
+ETAG_STORE = 'fmp_etags'        # shelve of url -> (ETag, body) used without requests-cache
+
+_APIKEY_RE = re.compile(r'&?apikey=[^&]*')
+
+class ETagSession(requests.Session):
+    """
+    Session that revalidates GETs with If-None-Match against the last ETag
+    seen for the URL (apikey stripped) and replays the stored body on a 304.
+    """
+    def __init__(self, path):
+        super().__init__()
+        self._path = path
+        self._store = None  # opened on first GET so --status/--reset touch nothing
+        self._store_lock = threading.Lock()
+    
+    def request(self, method, url, **kwargs):
+        if method.upper() != 'GET':
+            return super().request(method, url, **kwargs)
+        key = _APIKEY_RE.sub('', url)
+        with self._store_lock:
+            if self._store is None:
+                self._store = shelve.open(self._path)
+                atexit.register(self._store.close)
+            entry = self._store.get(key)
+        if entry:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'If-None-Match': entry[0]}
+        r = super().request(method, url, **kwargs)
+        if r.status_code == 304 and entry:
+            r.status_code = 200
+            r._content = entry[1]
+        elif r.status_code == 200 and r.headers.get('ETag'):
+            with self._store_lock:
+                self._store[key] = (r.headers['ETag'], r.content)
+        return r
+
+def make_session(use_cache=True):
+    """
+    Pooled keep-alive session shared by every worker thread. With
+    requests-cache installed, responses are served from HTTP_CACHE for
+    HTTP_CACHE_HOURS; apikey is left out of the cache key so rotating it
+    keeps the cache, and expired entries carrying an ETag are revalidated
+    rather than re-downloaded. Without it, ETagSession does the revalidation.
+    """
+    if use_cache and HAS_REQUESTS_CACHE:
+        session = requests_cache.CachedSession(
+            HTTP_CACHE,
+            backend='sqlite',
+            expire_after=timedelta(hours=HTTP_CACHE_HOURS),
+            allowable_methods=['GET'],
+            ignored_parameters=['apikey'],
+        )
+    elif use_cache:
+        session = ETagSession(ETAG_STORE)
+    else:
+        session = requests.Session()
+    session.mount('https://', HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=20,
+        # 429s back off exponentially (honouring Retry-After) instead of being
+        # read as "no data"; once retries run out the ticker lands in errors
+        max_retries=Retry(total=5, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504],
+                          respect_retry_after_header=True),
+    ))
+    return session
+
+SESSION = None  # built in run_screening so --status/--reset open no cache
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all fetch workers. Refills at
+    calls_per_minute/60 tokens per second, so time spent waiting on slow
+    responses is banked instead of followed by a fixed sleep.
+    """
+    def __init__(self, calls_per_minute, capacity=None):
+        self.rate = calls_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping only while the bucket is empty."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def refund(self):
+        """Give back a token taken for a call that never reached the API."""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+RATE_LIMITER = TokenBucket(CALLS_PER_MINUTE)
+
+def _get(url, timeout):
+    """
+    GET through SESSION under RATE_LIMITER. The token is taken before the
+    call, so bursts never exceed the bucket, and refunded when the response
+    came from the requests-cache store instead of FMP.
+    """
+    RATE_LIMITER.acquire()
+    r = SESSION.get(url, timeout=timeout)
+    if getattr(r, 'from_cache', False):
+        RATE_LIMITER.refund()
+    return r
+
+_batch_supported = True  # cleared the first time FMP rejects a multi-symbol call
+
+def _load(path):
+    if HAS_ORJSON:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path) as f:
+        return json.load(f)
+
+def _dump(obj, path, indent=False):
+    if HAS_ORJSON:
+        Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2 if indent else None)
+
+def _json_line(obj):
+    """One LOG_FILE record as bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj) + '\n').encode()
+
+def load_existing_universe():
+    """Tickers (second column) already in EXISTING_UNIVERSE, interned for lookups."""
+    if not Path(EXISTING_UNIVERSE).exists():
+        return frozenset()
+    with open(EXISTING_UNIVERSE, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        return frozenset(sys.intern(row[1].strip()) for row in reader if len(row) > 1)
+
+def load_candidates():
+    """
+    (symbols, stage2_lookup): Stage 2 names not already in the universe, plus
+    Stage 2 rows by symbol. Pickled to CANDIDATES_CACHE and reused while
+    neither input file has changed.
+    """
+    key = (
+        os.stat(STAGE2_RESULTS).st_mtime_ns,
+        os.stat(EXISTING_UNIVERSE).st_mtime_ns if Path(EXISTING_UNIVERSE).exists() else None,
+    )
+    try:
+        with open(CANDIDATES_CACHE, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['key'] == key:
+            return cached['symbols'], cached['stage2_lookup']
+    except (OSError, EOFError, KeyError, pickle.UnpicklingError):
+        pass
+    
+    # Load Stage 2 results
+    stage2 = _load(STAGE2_RESULTS)
+    
+    # Load existing universe to exclude
+    existing = load_existing_universe()
+    
+    # One pass: Stage 2 lookup for every row, symbols for new candidates only
+    stage2_lookup = {}
+    symbols = []
+    for s in stage2:
+        symbol = sys.intern(s['symbol'])
+        stage2_lookup[symbol] = s
+        if symbol not in existing:
+            symbols.append(symbol)
+    
+    tmp = CANDIDATES_CACHE + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump({'key': key, 'symbols': symbols, 'stage2_lookup': stage2_lookup}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, CANDIDATES_CACHE)
+    return symbols, stage2_lookup
+
+def _migrate_legacy_progress(old):
+    """
+    Rewrite a pre-JSONL progress file (whole lists) as LOG_FILE records.
+    The log is built in a temp file and renamed into place, and skipped if
+    it already exists, so a crash before PROGRESS_FILE is rewritten can't
+    migrate the lists twice.
+    """
+    if not Path(LOG_FILE).exists():
+        rows = {r['symbol']: ('passed', r) for r in old['passed']}
+        rows.update({r['symbol']: ('failed', r) for r in old['failed']})
+        tmp = LOG_FILE + '.tmp'
+        with open(tmp, 'wb') as log:
+            for symbol in old['completed']:
+                status, row = rows.get(symbol, ('errors', {'symbol': symbol}))
+                log.write(_json_line({'status': status, **row}))
+        os.replace(tmp, LOG_FILE)
+    _dump({'started': old.get('started'), 'last_update': old.get('last_update')}, PROGRESS_FILE)
 
 def load_progress():
-    if Path(PROGRESS_FILE).exists():
-        with open(PROGRESS_FILE) as f:
-            return json.load(f)
-    return {
+    """
+    Progress dict rebuilt from PROGRESS_FILE (start/update times only) and
+    LOG_FILE, which holds one JSON line per finished ticker.
+    """
+    progress = {
         'completed': [],
         'passed': [],
         'failed': [],
@@ -40,61 +280,128 @@ def load_progress():
         'started': datetime.now().isoformat(),
         'last_update': None
     }
+    if Path(PROGRESS_FILE).exists():
+        meta = _load(PROGRESS_FILE)
+        if 'completed' in meta:
+            _migrate_legacy_progress(meta)
+        progress['started'] = meta.get('started', progress['started'])
+        progress['last_update'] = meta.get('last_update')
+    if Path(LOG_FILE).exists():
+        loads = orjson.loads if HAS_ORJSON else json.loads
+        with open(LOG_FILE, 'rb') as f:
+            for line in f:
+                try:
+                    rec = loads(line)
+                except ValueError:
+                    continue  # line cut short by an interrupted write
+                status = rec.pop('status')
+                if status in RUN_MARKERS:
+                    continue  # run start/end record for Stage 4 --follow
+                progress['completed'].append(rec['symbol'])
+                progress[status].append(rec['symbol'] if status == 'errors' else rec)
+    return progress
 
 def save_progress(progress):
     progress['last_update'] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f)
+    _dump({'started': progress['started'], 'last_update': progress['last_update']}, PROGRESS_FILE)
+
+def log_marker(status):
+    """Append a run start/end record (no symbol) to LOG_FILE."""
+    with open(LOG_FILE, 'ab') as log:
+        log.write(_json_line({'status': status, 'time': datetime.now().isoformat()}))
+
+def log_result(log, progress, status, row):
+    """Record a finished ticker in progress and append it to LOG_FILE."""
+    progress[status].append(row['symbol'] if status == 'errors' else row)
+    progress['completed'].append(row['symbol'])
+    log.write(_json_line({'status': status, **row}))
+    log.flush()
+
+def _key_metric_fields(km):
+    return {
+        'roic': km.get('roic') or km.get('returnOnCapitalEmployed') or 0,
+        'roe': km.get('returnOnEquity') or 0,
+        'marketCap': km.get('marketCap') or 0,
+    }
+
+def _ratio_fields(ratios):
+    return {
+        'grossMargin': ratios.get('grossProfitMargin') or 0,
+        'operatingMargin': ratios.get('operatingProfitMargin') or 0,
+        'netMargin': ratios.get('netProfitMargin') or 0,
+    }
 
 def fetch_metrics(symbol):
     """Fetch key-metrics and ratios for quality screening."""
-    base = 'https://financialmodelingprep.com/stable'
     metrics = {}
     
     try:
         # Key metrics (has ROIC, ROE)
-        r1 = requests.get(f'{base}/key-metrics?symbol={symbol}&limit=1&apikey={FMP_API_KEY}', timeout=10)
+        r1 = _get(f'{BASE_URL}/key-metrics?symbol={symbol}&limit=1&apikey={FMP_API_KEY}', timeout=10)
         if r1.status_code == 200 and r1.json():
-            km = r1.json()[0]
-            metrics['roic'] = km.get('roic') or km.get('returnOnCapitalEmployed') or 0
-            metrics['roe'] = km.get('returnOnEquity') or 0
-            metrics['marketCap'] = km.get('marketCap') or 0
-        
-        time.sleep(DELAY)
+            metrics.update(_key_metric_fields(r1.json()[0]))
         
         # Ratios (has gross margin)
-        r2 = requests.get(f'{base}/ratios?symbol={symbol}&limit=1&apikey={FMP_API_KEY}', timeout=10)
+        r2 = _get(f'{BASE_URL}/ratios?symbol={symbol}&limit=1&apikey={FMP_API_KEY}', timeout=10)
         if r2.status_code == 200 and r2.json():
-            ratios = r2.json()[0]
-            metrics['grossMargin'] = ratios.get('grossProfitMargin') or 0
-            metrics['operatingMargin'] = ratios.get('operatingProfitMargin') or 0
-            metrics['netMargin'] = ratios.get('netProfitMargin') or 0
+            metrics.update(_ratio_fields(r2.json()[0]))
         
         return metrics
     except Exception as e:
         return {'error': str(e)}
 
-def run_screening():
-    # Load Stage 2 results
-    with open(STAGE2_RESULTS) as f:
-        stage2 = json.load(f)
-    
-    # Load existing universe to exclude
-    existing = set()
-    if Path(EXISTING_UNIVERSE).exists():
-        with open(EXISTING_UNIVERSE) as f:
-            existing = set(line.split(',')[1].strip() for line in f.readlines()[1:])
-    
-    # Get new candidates only
-    candidates = [s for s in stage2 if s['symbol'] not in existing]
-    symbols = [c['symbol'] for c in candidates]
+def _get_batch(endpoint, symbols):
+    """
+    Latest row per symbol from one comma-separated request, or None when
+    FMP does not honour the batch (400 or a non-list body). Symbols missing
+    from a short list are left out of the dict.
+    """
+    r = _get(f'{BASE_URL}/{endpoint}?symbol={",".join(symbols)}&limit=1&apikey={FMP_API_KEY}', timeout=30)
+    if r.status_code == 400:
+        return None
+    r.raise_for_status()
+    rows = r.json()
+    if not isinstance(rows, list) or any('symbol' not in row for row in rows):
+        return None
+    by_symbol = {}
+    for row in rows:
+        by_symbol.setdefault(row['symbol'], row)
+    return by_symbol
+
+def fetch_metrics_batch(symbols):
+    """
+    Metrics for a chunk of symbols via two multi-symbol calls. Falls back to
+    fetch_metrics per symbol if the batch fails, for symbols a batch left
+    out, and for the rest of the run once FMP has rejected a batch.
+    """
+    global _batch_supported
+    if _batch_supported and len(symbols) > 1:
+        try:
+            km = _get_batch('key-metrics', symbols)
+            ratios = _get_batch('ratios', symbols) if km is not None else None
+            if km is None or ratios is None:
+                _batch_supported = False
+            else:
+                results = {}
+                for symbol in symbols:
+                    if symbol in km and symbol in ratios:
+                        results[symbol] = {**_key_metric_fields(km[symbol]), **_ratio_fields(ratios[symbol])}
+                    else:
+                        results[symbol] = fetch_metrics(symbol)
+                return results
+        except Exception:
+            pass  # transient failure - redo this chunk one symbol at a time
+    return {symbol: fetch_metrics(symbol) for symbol in symbols}
+
+def run_screening(use_cache=True):
+    global SESSION
+    SESSION = make_session(use_cache=use_cache)
     
-    # Create lookup for Stage 2 data
-    stage2_lookup = {s['symbol']: s for s in stage2}
+    symbols, stage2_lookup = load_candidates()
     
     # Load progress
     progress = load_progress()
-    completed = set(progress['completed'])
+    completed = frozenset(progress['completed'])
     remaining = [s for s in symbols if s not in completed]
     
     print("="*60)
@@ -105,10 +412,11 @@ def run_screening():
     print(f"Remaining: {len(remaining)}")
     print(f"Passed so far: {len(progress['passed'])}")
     print(f"Rate: ~{CALLS_PER_MINUTE/2:.0f} tickers/min (2 calls each)")
-    print(f"ETA: {len(remaining) * 2 * DELAY / 60:.1f} minutes")
+    print(f"ETA: {len(remaining) * 2 * DELAY / 60:.1f} minutes (worst case, unbatched)")
     print("="*60)
     
     if not remaining:
+        log_marker('done')
         print("\n✓ Stage 3 complete!")
         return
     
@@ -116,54 +424,71 @@ def run_screening():
     time.sleep(3)
     
     start_time = time.time()
+    save_progress(progress)
+    log_marker('started')
     
-    for i, symbol in enumerate(remaining):
-        total_done = len(completed) + i + 1
-        pct = total_done / len(symbols) * 100
-        passed_cnt = len(progress['passed'])
-        
-        print(f"\r[{total_done}/{len(symbols)}] {pct:.1f}% | Passed: {passed_cnt} | {symbol:<6}", end='', flush=True)
-        
-        metrics = fetch_metrics(symbol)
-        
-        if 'error' not in metrics:
-            roic = metrics.get('roic', 0) or 0
-            gm = metrics.get('grossMargin', 0) or 0
-            
-            if roic >= MIN_ROIC and gm >= MIN_GROSS_MARGIN:
-                # Get Stage 2 data
-                s2 = stage2_lookup.get(symbol, {})
-                progress['passed'].append({
-                    'symbol': symbol,
-                    'name': s2.get('name', ''),
-                    'marketCap': s2.get('marketCap', 0),
-                    'price': s2.get('price', 0),
-                    'roic': roic,
-                    'grossMargin': gm,
-                    'roe': metrics.get('roe', 0),
-                    'operatingMargin': metrics.get('operatingMargin', 0),
-                })
-            else:
-                progress['failed'].append({
-                    'symbol': symbol,
-                    'roic': roic,
-                    'grossMargin': gm
-                })
-        else:
-            progress['errors'].append(symbol)
-        
-        progress['completed'].append(symbol)
-        
-        if (i + 1) % 50 == 0:
+    # Fetch BATCH_SIZE-symbol chunks on a thread pool; map() yields in
+    # submission order so progress bookkeeping stays on this thread and
+    # resumes exactly as before
+    chunks = [remaining[j:j + BATCH_SIZE] for j in range(0, len(remaining), BATCH_SIZE)]
+    # tqdm throttles its own redraws; the plain \r line is the fallback
+    pbar = tqdm(total=len(symbols), initial=len(completed), desc='Stage 3', unit='tkr') if HAS_TQDM else None
+    with open(LOG_FILE, 'ab') as log, ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        try:
+            batches = ex.map(fetch_metrics_batch, chunks)
+            fetched = ((symbol, batch[symbol]) for chunk, batch in zip(chunks, batches) for symbol in chunk)
+            for i, (symbol, metrics) in enumerate(fetched):
+                if pbar is not None:
+                    pbar.set_postfix(passed=len(progress['passed']), refresh=False)
+                    pbar.update(1)
+                else:
+                    total_done = len(completed) + i + 1
+                    pct = total_done / len(symbols) * 100
+                    passed_cnt = len(progress['passed'])
+                    print(f"\r[{total_done}/{len(symbols)}] {pct:.1f}% | Passed: {passed_cnt} | {symbol:<6}", end='', flush=True)
+                
+                if 'error' not in metrics:
+                    roic = metrics.get('roic', 0) or 0
+                    gm = metrics.get('grossMargin', 0) or 0
+                
+                    if roic >= MIN_ROIC and gm >= MIN_GROSS_MARGIN:
+                        # Get Stage 2 data
+                        s2 = stage2_lookup.get(symbol, {})
+                        log_result(log, progress, 'passed', {
+                            'symbol': symbol,
+                            'name': s2.get('name', ''),
+                            'marketCap': s2.get('marketCap', 0),
+                            'price': s2.get('price', 0),
+                            'roic': roic,
+                            'grossMargin': gm,
+                            'roe': metrics.get('roe', 0),
+                            'operatingMargin': metrics.get('operatingMargin', 0),
+                        })
+                    else:
+                        log_result(log, progress, 'failed', {
+                            'symbol': symbol,
+                            'roic': roic,
+                            'grossMargin': gm
+                        })
+                else:
+                    log_result(log, progress, 'errors', {'symbol': symbol})
+                
+                if (i + 1) % 50 == 0:
+                    save_progress(progress)
+                
+        except KeyboardInterrupt:
+            ex.shutdown(wait=False, cancel_futures=True)
             save_progress(progress)
-        
-        time.sleep(DELAY)
+            raise
+        finally:
+            if pbar is not None:
+                pbar.close()
     
     save_progress(progress)
     
-    # Save final results
-    with open(RESULTS_FILE, 'w') as f:
-        json.dump(progress['passed'], f, indent=2)
+    # Save final results, then tell a following Stage 4 the run is over
+    _dump(progress['passed'], RESULTS_FILE, indent=True)
+    log_marker('done')
     
     elapsed = time.time() - start_time
     print(f"\n\n{'='*60}")
@@ -203,21 +528,19 @@ def show_status():
             print(f"  {s['symbol']:<6} ROIC:{roic:>5.0f}% GM:{gm:>5.0f}% ${mcap:>6.1f}B")
 
 def reset_screening():
-    for f in [PROGRESS_FILE, RESULTS_FILE]:
+    for f in [PROGRESS_FILE, LOG_FILE, RESULTS_FILE, CANDIDATES_CACHE]:
         if Path(f).exists():
             Path(f).unlink()
             print(f"Deleted: {f}")
     print("Stage 3 reset.")
 
 if __name__ == '__main__':
-    import sys
-    
     if '--status' in sys.argv:
         show_status()
     elif '--reset' in sys.argv:
         reset_screening()
     else:
         try:
-            run_screening()
+            run_screening(use_cache='--no-cache' not in sys.argv)
         except KeyboardInterrupt:
             print("\n\nPaused. Run again to resume.")
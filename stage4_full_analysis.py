@@ -7,31 +7,112 @@ Usage:
     python3 stage4_full_analysis.py              # Run/resume
     python3 stage4_full_analysis.py --status     # Check progress
     python3 stage4_full_analysis.py --reset      # Start over
+    python3 stage4_full_analysis.py --no-cache   # Run/resume, bypassing the HTTP cache
+    python3 stage4_full_analysis.py --follow     # Run alongside Stage 3, analyzing passes as they land
 """
 
+import csv
 import json
+import os
+import sys
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
+import numpy as np
+import pandas as pd
 from fmp_data import FinancialDataProcessor
 from config import FMP_API_KEY
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    from tqdm import tqdm
+    HAS_TQDM = True
+except ImportError:
+    HAS_TQDM = False
+
 # Files
 STAGE3_RESULTS = 'stage3_quality_passed.json'
+STAGE3_LOG = 'stage3_progress.jsonl'   # Stage 3's append-only log, tailed by --follow
 EXISTING_UNIVERSE = 'capital_compounders_master.csv'
 PROGRESS_FILE = 'stage4_progress.json'
+LOG_FILE = 'stage4_progress.jsonl'   # one line per finished ticker, append-only
 RESULTS_FILE = 'stage4_new_opportunities.json'
+HTTP_CACHE = 'fmp_http_cache'   # requests-cache sqlite file, shared with Stage 3
 
 # Rate limiting (6 calls per ticker)
 CALLS_PER_MINUTE = 290
 CALLS_PER_TICKER = 6
 DELAY = 60 / (CALLS_PER_MINUTE / CALLS_PER_TICKER)  # ~1.2 sec per ticker
+CHECKPOINT_EVERY = 20    # tickers fetched per filter pass / progress save
+MAX_WORKERS = 8          # tickers in flight; the fetcher's rate gate caps calls/min
+FOLLOW_CALLS_PER_MINUTE = 140   # --follow: Stage 3 runs alongside at 145/min of the 300/min quota
+FOLLOW_POLL_SECONDS = 5         # --follow: how often to check the Stage 3 log for new passes
+FOLLOW_IDLE_SECONDS = 600       # --follow: give up if the Stage 3 log hasn't grown for this long
+
+MODELS = ["Mature", "DCF-Fade", "Platform", "Ex-Goodwill", "Compounder"]
+
+def _load(path):
+    if HAS_ORJSON:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path) as f:
+        return json.load(f)
+
+def _dump(obj, path, indent=False):
+    if HAS_ORJSON:
+        Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2 if indent else None)
+
+def _json_line(obj):
+    """One LOG_FILE record as bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj) + '\n').encode()
+
+def load_existing_universe():
+    """Tickers (second column) already in EXISTING_UNIVERSE, interned for lookups."""
+    if not Path(EXISTING_UNIVERSE).exists():
+        return frozenset()
+    with open(EXISTING_UNIVERSE, newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        return frozenset(sys.intern(row[1].strip()) for row in reader if len(row) > 1)
+
+def _migrate_legacy_progress(old):
+    """
+    Rewrite a pre-JSONL progress file (whole lists) as LOG_FILE records.
+    The log is built in a temp file and renamed into place, and skipped if
+    it already exists, so a crash before PROGRESS_FILE is rewritten can't
+    migrate the lists twice.
+    """
+    if not Path(LOG_FILE).exists():
+        rows = {r['symbol']: ('buy', r) for r in old['buy']}
+        rows.update({r['symbol']: ('hold', r) for r in old['hold']})
+        rows.update({r['symbol']: ('filtered', r) for r in old['filtered']})
+        tmp = LOG_FILE + '.tmp'
+        with open(tmp, 'wb') as log:
+            for symbol in old['completed']:
+                status, row = rows.get(symbol, ('errors', {'symbol': symbol}))
+                log.write(_json_line({'status': status, **row}))
+        os.replace(tmp, LOG_FILE)
+    _dump({'started': old.get('started'), 'last_update': old.get('last_update')}, PROGRESS_FILE)
 
 def load_progress():
-    if Path(PROGRESS_FILE).exists():
-        with open(PROGRESS_FILE) as f:
-            return json.load(f)
-    return {
+    """
+    Progress dict rebuilt from PROGRESS_FILE (start/update times only) and
+    LOG_FILE, which holds one JSON line per finished ticker.
+    """
+    progress = {
         'completed': [],
         'buy': [],
         'hold': [],
@@ -40,205 +121,342 @@ def load_progress():
         'started': datetime.now().isoformat(),
         'last_update': None
     }
+    if Path(PROGRESS_FILE).exists():
+        meta = _load(PROGRESS_FILE)
+        if 'completed' in meta:
+            _migrate_legacy_progress(meta)
+        progress['started'] = meta.get('started', progress['started'])
+        progress['last_update'] = meta.get('last_update')
+    if Path(LOG_FILE).exists():
+        loads = orjson.loads if HAS_ORJSON else json.loads
+        with open(LOG_FILE, 'rb') as f:
+            for line in f:
+                try:
+                    rec = loads(line)
+                except ValueError:
+                    continue  # line cut short by an interrupted write
+                status = rec.pop('status')
+                progress['completed'].append(rec['symbol'])
+                progress[status].append(rec['symbol'] if status == 'errors' else rec)
+    return progress
 
 def save_progress(progress):
     progress['last_update'] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f)
+    _dump({'started': progress['started'], 'last_update': progress['last_update']}, PROGRESS_FILE)
+
+def log_result(log, progress, status, row):
+    """Record a finished ticker in progress and append it to LOG_FILE."""
+    progress[status].append(row['symbol'] if status == 'errors' else row)
+    progress['completed'].append(row['symbol'])
+    log.write(_json_line({'status': status, **row}))
+    log.flush()
 
-def passes_filters(t):
-    """Apply all quality filters."""
-    roic = t.get("roic_3y_avg") or t.get("roic_current") or 0
-    roic_ex_gw = t.get("roic_ex_goodwill_3y_avg") or t.get("roic_ex_goodwill") or 0
-    inc_roic = t.get("incremental_roic", 0)
-    gm = t.get("gross_margin", 0)
-    fcf = t.get("fcf_conversion", 0)
-    growth = t.get("revenue_growth_3y", 0)
-    capex = t.get("capex_to_revenue", 0)
-    leverage = t.get("net_debt_ebitda", 0)
-    vcr = t.get("value_creation_ratio", 0)
+def _or_col(df, *names):
+    """Column-wise `t.get(a) or t.get(b) or 0`: first non-missing, non-zero value."""
+    out = np.zeros(len(df))
+    for name in reversed(names):
+        if name in df:
+            v = df[name].to_numpy(dtype=float)
+            out = np.where(np.isnan(v) | (v == 0), out, v)
+    return out
+
+def evaluate_records(records):
+    """
+    Apply all quality filters and pick the valuation model for a batch of
+    get_all_metrics() dicts in one vectorized pass.
+    Returns (passes, failures, models, irrs) lists aligned with records.
+    """
+    if not records:
+        return [], [], [], []
+    df = pd.DataFrame.from_records(records)
     
-    roic_pass = (roic >= 0.20) or (roic_ex_gw >= 0.20)
-    capex_pass = (capex <= 0.07) or (inc_roic >= 0.15)
-    fcf_pass = (fcf >= 0.80) or (fcf >= 0.60 and inc_roic >= 0.15)
-    inc_roic_pass = inc_roic >= -0.05
-    vcr_pass = vcr >= 1.0
+    roic = _or_col(df, "roic_3y_avg", "roic_current")
+    roic_ex_gw = _or_col(df, "roic_ex_goodwill_3y_avg", "roic_ex_goodwill")
+    inc_roic = _or_col(df, "incremental_roic")
+    gm = _or_col(df, "gross_margin")
+    fcf = _or_col(df, "fcf_conversion")
+    growth = _or_col(df, "revenue_growth_3y")
+    capex = _or_col(df, "capex_to_revenue")
+    leverage = _or_col(df, "net_debt_ebitda")
+    vcr = _or_col(df, "value_creation_ratio")
+    goodwill_pct = _or_col(df, "goodwill_pct")
+    base_yield = np.maximum(_or_col(df, "fcf_yield"), _or_col(df, "enterprise_yield"))
     
-    return roic_pass and gm >= 0.60 and fcf_pass and growth >= 0.09 and capex_pass and leverage <= 3.0 and inc_roic_pass and vcr_pass
-
-def get_filter_failures(t):
-    """Get list of failed filters."""
-    failures = []
-    roic = t.get("roic_3y_avg") or t.get("roic_current") or 0
-    roic_ex_gw = t.get("roic_ex_goodwill_3y_avg") or t.get("roic_ex_goodwill") or 0
-    inc_roic = t.get("incremental_roic", 0)
-    gm = t.get("gross_margin", 0)
-    fcf = t.get("fcf_conversion", 0)
-    growth = t.get("revenue_growth_3y", 0)
-    capex = t.get("capex_to_revenue", 0)
-    leverage = t.get("net_debt_ebitda", 0)
-    vcr = t.get("value_creation_ratio", 0)
+    roic_pass = (roic >= 0.20) | (roic_ex_gw >= 0.20)
+    capex_pass = (capex <= 0.07) | (inc_roic >= 0.15)
+    fcf_pass = (fcf >= 0.80) | ((fcf >= 0.60) & (inc_roic >= 0.15))
+    
+    # (pass mask, value shown on failure, failure message)
+    checks = [
+        (roic_pass, np.maximum(roic, roic_ex_gw) * 100, "ROIC {:.0f}%<20%"),
+        (gm >= 0.60, gm * 100, "GM {:.0f}%<60%"),
+        (fcf_pass, fcf * 100, "FCF {:.0f}%<80%"),
+        (growth >= 0.09, growth * 100, "Growth {:.1f}%<9%"),
+        (capex_pass, capex * 100, "CapEx {:.1f}%>7%"),
+        (leverage <= 3.0, leverage, "Debt {:.1f}x>3x"),
+        (inc_roic >= -0.05, inc_roic * 100, "IncROIC {:.0f}%<-5%"),
+        (vcr >= 1.0, vcr, "VCR {:.1f}x<1.0"),
+    ]
+    passes = np.logical_and.reduce([ok for ok, _, _ in checks])
+    failures = [[] for _ in range(len(df))]
+    for ok, values, msg in checks:
+        for i, v in zip(np.flatnonzero(~ok).tolist(), values[~ok].tolist()):
+            failures[i].append(msg.format(v))
     
-    if not ((roic >= 0.20) or (roic_ex_gw >= 0.20)):
-        failures.append(f"ROIC {max(roic, roic_ex_gw)*100:.0f}%<20%")
-    if gm < 0.60:
-        failures.append(f"GM {gm*100:.0f}%<60%")
-    if not ((fcf >= 0.80) or (fcf >= 0.60 and inc_roic >= 0.15)):
-        failures.append(f"FCF {fcf*100:.0f}%<80%")
-    if growth < 0.09:
-        failures.append(f"Growth {growth*100:.1f}%<9%")
-    if not ((capex <= 0.07) or (inc_roic >= 0.15)):
-        failures.append(f"CapEx {capex*100:.1f}%>7%")
-    if leverage > 3.0:
-        failures.append(f"Debt {leverage:.1f}x>3x")
-    if inc_roic < -0.05:
-        failures.append(f"IncROIC {inc_roic*100:.0f}%<-5%")
-    if vcr < 1.0:
-        failures.append(f"VCR {vcr:.1f}x<1.0")
+    # Valuation model: first matching rule wins, else Standard
+    blended_roic = (roic + np.minimum(roic_ex_gw, 0.30)) / 2
+    conditions = [
+        inc_roic < 0.05,
+        (growth > 0.25) & (roic < 0.15),
+        (gm > 0.80) & (capex < 0.03),
+        (goodwill_pct > 0.30) & (roic_ex_gw > roic * 1.5),
+        (roic > 0.25) & (growth > 0.10),
+    ]
+    irrs = np.select(conditions, [
+        base_yield + np.minimum(growth, 0.10),
+        base_yield + np.minimum(growth, 0.15) * 0.70,
+        base_yield + np.minimum(growth, 0.20),
+        base_yield + np.minimum(growth, blended_roic * 0.8),
+        base_yield + np.minimum(growth, roic * 0.6),
+    ], default=base_yield + np.minimum(growth, 0.15))
+    models = np.select(conditions, MODELS, default="Standard")
     
-    return failures
+    return passes.tolist(), failures, models.tolist(), irrs.tolist()
+
+def evaluate(t):
+    """Apply all quality filters to one ticker: (passes, list of failed filters)."""
+    passes, failures, _, _ = evaluate_records([t])
+    return passes[0], failures[0]
 
 def select_best_model(t):
     """Select valuation model and calculate IRR."""
-    fcf_yield = t.get("fcf_yield") or 0
-    ent_yield = t.get("enterprise_yield") or 0
-    base_yield = max(fcf_yield, ent_yield)
-    
-    roic = t.get("roic_3y_avg") or t.get("roic_current") or 0
-    roic_ex_gw = t.get("roic_ex_goodwill_3y_avg") or t.get("roic_ex_goodwill") or 0
-    growth = t.get("revenue_growth_3y", 0)
-    inc_roic = t.get("incremental_roic", 0)
-    gm = t.get("gross_margin", 0)
-    capex = t.get("capex_to_revenue", 0)
-    goodwill_pct = t.get("goodwill_pct", 0)
-    
-    if inc_roic == 0 or inc_roic < 0.05:
-        model = "Mature"
-        irr = base_yield + min(growth, 0.10)
-    elif growth > 0.25 and roic < 0.15:
-        model = "DCF-Fade"
-        irr = base_yield + min(growth, 0.15) * 0.70
-    elif gm > 0.80 and capex < 0.03:
-        model = "Platform"
-        irr = base_yield + min(growth, 0.20)
-    elif goodwill_pct > 0.30 and roic_ex_gw > roic * 1.5:
-        model = "Ex-Goodwill"
-        capped_roic_ex_gw = min(roic_ex_gw, 0.30)
-        blended_roic = (roic + capped_roic_ex_gw) / 2
-        sustainable_g = min(growth, blended_roic * 0.8)
-        irr = base_yield + sustainable_g
-    elif roic > 0.25 and growth > 0.10:
-        model = "Compounder"
-        sustainable_g = min(growth, roic * 0.6)
-        irr = base_yield + sustainable_g
-    else:
-        model = "Standard"
-        irr = base_yield + min(growth, 0.15)
-    
-    return model, irr
+    _, _, models, irrs = evaluate_records([t])
+    return models[0], irrs[0]
 
-def run_analysis():
-    # Load Stage 3 results
-    with open(STAGE3_RESULTS) as f:
-        stage3 = json.load(f)
+def log_verdicts(log, progress, fetched):
+    """Filter a chunk of (symbol, metrics) pairs in one pass and log each outcome."""
+    try:
+        verdicts = list(zip(*evaluate_records([data for _, data in fetched])))
+    except Exception:
+        # Malformed record somewhere: re-evaluate one at a time so only it lands in errors
+        verdicts = []
+        for _, data in fetched:
+            try:
+                verdicts.append(next(zip(*evaluate_records([data]))))
+            except Exception:
+                verdicts.append(None)
     
+    for (symbol, data), verdict in zip(fetched, verdicts):
+        if verdict is None:
+            log_result(log, progress, 'errors', {'symbol': symbol})
+            continue
+        passed, failures, model, irr = verdict
+        if not passed:
+            log_result(log, progress, 'filtered', {'symbol': symbol, 'reason': ', '.join(failures)})
+            continue
+        
+        result = {
+            'symbol': symbol,
+            'name': data.get('company_name', ''),
+            'model': model,
+            'irr': irr,
+            'roic': data.get('roic_current', 0),
+            'roic_3y': data.get('roic_3y_avg', 0),
+            'vcr': data.get('value_creation_ratio', 0),
+            'grossMargin': data.get('gross_margin', 0),
+            'growth': data.get('revenue_growth_3y', 0),
+            'fcfConversion': data.get('fcf_conversion', 0),
+            'marketCap': data.get('market_cap', 0),
+            'price': data.get('price', 0),
+        }
+        
+        if irr >= 0.20:
+            log_result(log, progress, 'buy', result)
+        elif irr >= 0.12:
+            log_result(log, progress, 'hold', result)
+        else:
+            log_result(log, progress, 'filtered', {'symbol': symbol, 'reason': f'IRR {irr*100:.0f}%<12%'})
+
+def follow_stage3_passes():
+    """
+    Yield symbols as Stage 3 logs them as passed, polling its append-only log.
+    Stops once the last run marker in the log is Stage 3's 'done' record, or
+    after FOLLOW_IDLE_SECONDS without the log growing (Stage 3 not running).
+    Yields None before each poll sleep so the consumer can flush meanwhile.
+    """
+    loads = orjson.loads if HAS_ORJSON else json.loads
+    offset = 0
+    finished = False
+    last_growth = time.monotonic()
+    while True:
+        log = Path(STAGE3_LOG)
+        passed = []
+        if log.exists():
+            with open(log, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # Stage 3 is mid-write; pick it up on the next poll
+                    offset += len(line)
+                    last_growth = time.monotonic()
+                    try:
+                        rec = loads(line)
+                    except ValueError:
+                        continue
+                    status = rec.get('status')
+                    if status == 'passed':
+                        passed.append(rec['symbol'])
+                    elif status in ('started', 'done'):
+                        # A later 'started' means Stage 3 was re-run after an earlier finish
+                        finished = status == 'done'
+        yield from passed
+        if finished:
+            return
+        if time.monotonic() - last_growth >= FOLLOW_IDLE_SECONDS:
+            print(f"\nStage 3 log idle for {FOLLOW_IDLE_SECONDS // 60} minutes - stopping --follow.")
+            return
+        yield None
+        time.sleep(FOLLOW_POLL_SECONDS)
+
+def _ordered_map(ex, fn, items, window):
+    """
+    Like ex.map, but pulls items lazily and keeps at most `window` calls in
+    flight, so a slow or blocking iterable doesn't stall on submission.
+    Results are yielded as soon as they and everything before them are done.
+    A None item submits nothing and is passed through as (None, None) after
+    the finished results, so the consumer can checkpoint while input waits.
+    """
+    pending = deque()
+    for item in items:
+        if item is not None:
+            pending.append((item, ex.submit(fn, item)))
+        while pending and (len(pending) >= window or pending[0][1].done()):
+            head, fut = pending.popleft()
+            yield head, fut.result()
+        if item is None:
+            yield None, None
+    while pending:
+        item, fut = pending.popleft()
+        yield item, fut.result()
+
+def run_analysis(use_cache=True, follow=False):
     # Load existing universe to exclude
-    existing = set()
-    if Path(EXISTING_UNIVERSE).exists():
-        with open(EXISTING_UNIVERSE) as f:
-            existing = set(line.split(',')[1].strip() for line in f.readlines()[1:])
-    
-    # Get new candidates only
-    candidates = [s for s in stage3 if s['symbol'] not in existing]
-    symbols = [c['symbol'] for c in candidates]
+    existing = load_existing_universe()
     
     # Load progress
     progress = load_progress()
-    completed = set(progress['completed'])
-    remaining = [s for s in symbols if s not in completed]
+    completed = frozenset(progress['completed'])
+    
+    if follow:
+        # Stage 3 is still running: consume its passes as they're logged,
+        # leaving it its share of the FMP quota
+        calls_per_minute = FOLLOW_CALLS_PER_MINUTE
+        symbols = None
+        remaining = (s if s is None else sys.intern(s) for s in follow_stage3_passes()
+                     if s is None or (s not in existing and s not in completed))
+    else:
+        # Load Stage 3 results, new candidates only
+        calls_per_minute = CALLS_PER_MINUTE
+        stage3 = _load(STAGE3_RESULTS)
+        symbols = [sys.intern(s['symbol']) for s in stage3 if s['symbol'] not in existing]
+        remaining = [s for s in symbols if s not in completed]
     
     print("="*60)
     print("STAGE 4: Full Analysis (All Quality Filters + IRR)")
     print("="*60)
-    print(f"Stage 3 winners (new): {len(symbols)}")
+    if follow:
+        print(f"Following Stage 3 log: {STAGE3_LOG}")
+    else:
+        print(f"Stage 3 winners (new): {len(symbols)}")
     print(f"Already completed: {len(completed)}")
-    print(f"Remaining: {len(remaining)}")
+    if not follow:
+        print(f"Remaining: {len(remaining)}")
     print(f"BUY found so far: {len(progress['buy'])}")
     print(f"HOLD found so far: {len(progress['hold'])}")
-    print(f"Rate: ~{CALLS_PER_MINUTE/CALLS_PER_TICKER:.0f} tickers/min")
-    print(f"ETA: {len(remaining) * DELAY / 60:.1f} minutes")
+    print(f"Rate: ~{calls_per_minute/CALLS_PER_TICKER:.0f} tickers/min")
+    if not follow:
+        print(f"ETA: {len(remaining) * DELAY / 60:.1f} minutes")
     print("="*60)
     
-    if not remaining:
+    if not follow and not remaining:
         print("\n✓ Stage 4 complete!")
         return
     
     print(f"\nStarting in 3 seconds... (Ctrl+C to pause)")
     time.sleep(3)
     
-    processor = FinancialDataProcessor()
+    processor = FinancialDataProcessor(http_cache=HTTP_CACHE if use_cache else None,
+                                       calls_per_minute=calls_per_minute)
     start_time = time.time()
     
-    for i, symbol in enumerate(remaining):
-        total_done = len(completed) + i + 1
-        pct = total_done / len(symbols) * 100
-        buy_cnt = len(progress['buy'])
-        hold_cnt = len(progress['hold'])
-        
-        print(f"\r[{total_done}/{len(symbols)}] {pct:.1f}% | BUY:{buy_cnt} HOLD:{hold_cnt} | {symbol:<6}", end='', flush=True)
-        
+    save_progress(progress)
+    
+    def fetch(symbol):
         try:
-            # Fetch full metrics
-            data = processor.get_all_metrics(symbol)
-            
-            if data and data.get('data_quality') == 'complete':
-                # Check filters
-                if passes_filters(data):
-                    model, irr = select_best_model(data)
-                    
-                    result = {
-                        'symbol': symbol,
-                        'name': data.get('company_name', ''),
-                        'model': model,
-                        'irr': irr,
-                        'roic': data.get('roic_current', 0),
-                        'roic_3y': data.get('roic_3y_avg', 0),
-                        'vcr': data.get('value_creation_ratio', 0),
-                        'grossMargin': data.get('gross_margin', 0),
-                        'growth': data.get('revenue_growth_3y', 0),
-                        'fcfConversion': data.get('fcf_conversion', 0),
-                        'marketCap': data.get('market_cap', 0),
-                        'price': data.get('price', 0),
-                    }
-                    
-                    if irr >= 0.20:
-                        progress['buy'].append(result)
-                    elif irr >= 0.12:
-                        progress['hold'].append(result)
+            return processor.get_all_metrics(symbol, verbose=False)
+        except Exception:
+            return None
+    
+    # Fetch on a thread pool; results come back in submission order so
+    # progress bookkeeping and checkpoints stay on this thread. tqdm throttles
+    # its own redraws; the plain \r line is the fallback
+    total = len(symbols) if symbols is not None else None
+    pbar = tqdm(total=total, initial=len(completed), desc='Stage 4', unit='tkr') if HAS_TQDM else None
+    with open(LOG_FILE, 'ab') as log, ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        fetched = []
+        i = -1
+        try:
+            for symbol, data in _ordered_map(ex, fetch, remaining, 2 * MAX_WORKERS):
+                if symbol is None:
+                    # --follow is waiting on Stage 3: log what has arrived so far
+                    if fetched:
+                        log_verdicts(log, progress, fetched)
+                        fetched = []
+                        save_progress(progress)
+                    continue
+                i += 1
+                if pbar is not None:
+                    pbar.set_postfix(buy=len(progress['buy']), hold=len(progress['hold']), refresh=False)
+                    pbar.update(1)
+                else:
+                    total_done = len(completed) + i + 1
+                    buy_cnt = len(progress['buy'])
+                    hold_cnt = len(progress['hold'])
+                    if total is None:
+                        print(f"\r[{total_done}] BUY:{buy_cnt} HOLD:{hold_cnt} | {symbol:<6}", end='', flush=True)
                     else:
-                        progress['filtered'].append({'symbol': symbol, 'reason': f'IRR {irr*100:.0f}%<12%'})
+                        pct = total_done / total * 100
+                        print(f"\r[{total_done}/{total}] {pct:.1f}% | BUY:{buy_cnt} HOLD:{hold_cnt} | {symbol:<6}", end='', flush=True)
+                
+                if data and data.get('data_quality') == 'complete':
+                    fetched.append((symbol, data))
                 else:
-                    failures = get_filter_failures(data)
-                    progress['filtered'].append({'symbol': symbol, 'reason': ', '.join(failures)})
-            else:
-                progress['errors'].append(symbol)
+                    log_result(log, progress, 'errors', {'symbol': symbol})
                 
-        except Exception as e:
-            progress['errors'].append(symbol)
-        
-        progress['completed'].append(symbol)
-        
-        if (i + 1) % 20 == 0:
+                if (i + 1) % CHECKPOINT_EVERY == 0:
+                    log_verdicts(log, progress, fetched)
+                    fetched = []
+                    save_progress(progress)
+            
+            log_verdicts(log, progress, fetched)
+        except KeyboardInterrupt:
+            ex.shutdown(wait=False, cancel_futures=True)
+            log_verdicts(log, progress, fetched)
             save_progress(progress)
-        
-        time.sleep(DELAY)
+            raise
+        finally:
+            if pbar is not None:
+                pbar.close()
     
     save_progress(progress)
     
-    # Save final results
+    # Save final results. Every BUY outranks every HOLD on IRR, so one sort
+    # of both lists splits back into the two ranked buckets by position
+    n_buy = len(progress['buy'])
+    ranked = sorted(progress['buy'] + progress['hold'], key=itemgetter('irr'), reverse=True)
     results = {
-        'buy': sorted(progress['buy'], key=lambda x: x['irr'], reverse=True),
-        'hold': sorted(progress['hold'], key=lambda x: x['irr'], reverse=True),
+        'buy': ranked[:n_buy],
+        'hold': ranked[n_buy:],
         'summary': {
             'total_screened': len(progress['completed']),
             'buy_count': len(progress['buy']),
@@ -248,8 +466,7 @@ def run_analysis():
         }
     }
     
-    with open(RESULTS_FILE, 'w') as f:
-        json.dump(results, f, indent=2)
+    _dump(results, RESULTS_FILE, indent=True)
     
     elapsed = time.time() - start_time
     print(f"\n\n{'='*60}")
@@ -267,7 +484,7 @@ def run_analysis():
         print(f"\n🟢 NEW BUY OPPORTUNITIES:")
         print(f"{'Symbol':<8} {'Model':<12} {'IRR':>6} {'VCR':>6} {'ROIC':>6} {'Name':<25}")
         print("-"*70)
-        for s in sorted(progress['buy'], key=lambda x: x['irr'], reverse=True)[:15]:
+        for s in results['buy'][:15]:
             print(f"{s['symbol']:<8} {s['model']:<12} {s['irr']*100:>5.0f}% {s['vcr']:>5.1f}x {s['roic']*100:>5.0f}% {s['name'][:25]}")
 
 def show_status():
@@ -294,21 +511,19 @@ def show_status():
             print(f"  {s['symbol']:<8} IRR:{s['irr']*100:>5.0f}% VCR:{s['vcr']:>4.1f}x {s['name'][:25]}")
 
 def reset_analysis():
-    for f in [PROGRESS_FILE, RESULTS_FILE]:
+    for f in [PROGRESS_FILE, LOG_FILE, RESULTS_FILE]:
         if Path(f).exists():
             Path(f).unlink()
             print(f"Deleted: {f}")
     print("Stage 4 reset.")
 
 if __name__ == '__main__':
-    import sys
-    
     if '--status' in sys.argv:
         show_status()
     elif '--reset' in sys.argv:
         reset_analysis()
     else:
         try:
-            run_analysis()
+            run_analysis(use_cache='--no-cache' not in sys.argv, follow='--follow' in sys.argv)
         except KeyboardInterrupt:
             print("\n\nPaused. Progress saved. Run again to resume.")
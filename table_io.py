@@ -0,0 +1,57 @@
+"""
+Capital Compounder Investment System - Table I/O
+Reads and writes universe/tier artifacts as CSV or Parquet, chosen by file suffix.
+
+Parquet (Snappy-compressed) keeps column types and skips float<->text
+round-trips; it needs pyarrow. CSV stays the default for human-facing files.
+"""
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# pandas' pyarrow CSV engine is multithreaded; fall back to the C parser without it
+CSV_ENGINE = "pyarrow" if HAS_PYARROW else "c"
+# Below this size the pyarrow engine's thread-pool setup costs more than it saves
+PYARROW_CSV_MIN_BYTES = 10 * 1024 * 1024
+
+FORMATS = ("csv", "parquet")
+# Parquet codec for pipeline artifacts: Snappy decodes fastest when read back
+PARQUET_COMPRESSION = "snappy"
+
+
+def artifact_path(path: str, fmt: str = "csv") -> str:
+    """Swap a .csv artifact path to .parquet when fmt is 'parquet'."""
+    if fmt == "parquet":
+        root, ext = os.path.splitext(str(path))
+        if ext == ".csv":
+            return root + ".parquet"
+    return str(path)
+
+
+def csv_engine(path: str) -> str:
+    """Pick the read_csv engine for a file: pyarrow for large files when installed."""
+    if HAS_PYARROW and os.path.getsize(path) >= PYARROW_CSV_MIN_BYTES:
+        return "pyarrow"
+    return "c"
+
+
+def read_table(path: str) -> pd.DataFrame:
+    """Load a CSV or Parquet artifact."""
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, engine=csv_engine(path))
+
+
+def write_table(df: pd.DataFrame, path: str, compression: str = PARQUET_COMPRESSION) -> None:
+    """Save a DataFrame as CSV or Parquet (Snappy unless told otherwise) by path suffix."""
+    if str(path).endswith(".parquet"):
+        df.to_parquet(path, index=False, compression=compression)
+    else:
+        df.to_csv(path, index=False)
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 """Test universe builder — just count candidates, check first 100 for market cap."""
-import json, time
+import json, re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.request import urlopen, Request
 
 API_KEY = "TtvF1nFuyMJk23iOeTklWpU0XEYcCvQU"
 BASE_URL = "https://financialmodelingprep.com/stable"
 
+# Tight filter as one pattern: 1-5 letters, never ending in Q/W; 4-letter
+# symbols not ending in X; 5-letter symbols only with an L/K/A/B suffix
+SYMBOL_RE = re.compile(r"[A-Z]{0,2}[A-PR-VX-Z]|[A-Z]{3}[A-PR-VYZ]|[A-Z]{4}[ABKL]")
+
 # Step 1: Get all symbols
 print("Pulling stock list...")
 req = Request(f"{BASE_URL}/stock-list?apikey={API_KEY}", headers={"User-Agent": "test/1.0"})
@@ -15,42 +20,38 @@ with urlopen(req, timeout=30) as resp:
 print(f"Total symbols: {len(stock_list)}")
 
 # Apply tight filter
-candidates = []
-for s in stock_list:
-    sym = s.get("symbol", "")
-    if not sym: continue
-    if not sym.isalpha(): continue
-    if len(sym) > 5: continue
-    if len(sym) == 5 and sym[-1] in ('F', 'Y'): continue
-    if len(sym) >= 4 and sym[-1] == 'X': continue
-    if sym[-1] in ('Q', 'W'): continue
-    if len(sym) == 5 and sym[-1] not in ('L','K','A','B'): continue
-    candidates.append(sym)
+candidates = [sym for sym in (s.get("symbol") for s in stock_list) if sym and SYMBOL_RE.fullmatch(sym)]
 
 print(f"After filter: {len(candidates)} candidates")
 print(f"Estimated market-cap check time: {len(candidates) * 0.1 / 60:.1f} min")
 
-# Spot check first 200 to see hit rate
-print(f"\nSpot checking first 200 for $10B+ market cap...")
-hits = 0
-for i, sym in enumerate(candidates[:200]):
-    time.sleep(0.1)
+def market_cap(sym):
+    """Market cap for sym, or None if the lookup fails or returns nothing."""
     try:
         url = f"{BASE_URL}/market-capitalization?symbol={sym}&apikey={API_KEY}"
         req = Request(url, headers={"User-Agent": "test/1.0"})
         with urlopen(req, timeout=10) as resp:
             data = json.loads(resp.read().decode())
         if isinstance(data, list) and data:
-            mc = data[0].get("marketCap", 0) or 0
-        else:
-            continue
-        if mc >= 10_000_000_000:
-            hits += 1
-            if hits <= 10:
-                mc_str = f"${mc/1e12:.1f}T" if mc >= 1e12 else f"${mc/1e9:.0f}B"
-                print(f"  {sym:<6} {mc_str}")
-    except:
-        continue
+            return data[0].get("marketCap", 0) or 0
+    except Exception:
+        pass
+    return None
+
+# Spot check first 200 to see hit rate
+print(f"\nSpot checking first 200 for $10B+ market cap...")
+# Lookups are independent; 200 calls in parallel stay inside the 300/min quota
+sample = candidates[:200]
+with ThreadPoolExecutor(max_workers=10) as ex:
+    caps = list(ex.map(market_cap, sample))
+
+hits = 0
+for sym, mc in zip(sample, caps):
+    if mc is not None and mc >= 10_000_000_000:
+        hits += 1
+        if hits <= 10:
+            mc_str = f"${mc/1e12:.1f}T" if mc >= 1e12 else f"${mc/1e9:.0f}B"
+            print(f"  {sym:<6} {mc_str}")
 
 print(f"\nHit rate: {hits}/200 = {hits/200*100:.0f}%")
 print(f"Estimated total $10B+ stocks: {int(hits/200 * len(candidates))}")
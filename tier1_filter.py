@@ -14,11 +14,27 @@ Based on Investment Charter v1.0 requirements:
 - Reinvestment Rate ≥ 30% of FCF
 """
 
+import re
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 from config import TIER1_FILTERS, EXCLUDED_SECTORS, EXCLUDED_TICKERS, EXEMPT_TICKERS, FILTER_EXEMPTIONS, is_exempt
+from table_io import read_table, write_table
+
+# Hard filters in apply_filters order; keys of Tier1Filter.filter_stats
+FILTER_NAMES = [
+    "data_quality", "sectors", "incremental_roic", "historical_roic", "roic_wacc_spread",
+    "revenue_growth", "fcf_conversion", "gross_margin", "leverage", "market_cap",
+]
+
+# Exclusion lists as sets, built once at import
+_EXCLUDED_TICKERS = frozenset(EXCLUDED_TICKERS)
+_EXEMPT_TICKERS = frozenset(EXEMPT_TICKERS)
+_EXCLUDED_SECTORS = frozenset(EXCLUDED_SECTORS)
+# (sector, lowercased sector) in list order, plus one pattern matching any of them
+_EXCLUDED_SECTOR_NEEDLES = [(s, s.lower()) for s in EXCLUDED_SECTORS]
+_EXCLUDED_SECTOR_RE = re.compile("|".join(re.escape(n) for _, n in _EXCLUDED_SECTOR_NEEDLES))
 
 
 class Tier1Filter:
@@ -27,6 +43,7 @@ class Tier1Filter:
     def __init__(self, filters: Dict = None):
         self.filters = filters or TIER1_FILTERS
         self.filter_stats = {}
+        self.fail_reasons = {}   # reason string -> mask of companies it applies to
     
     def apply_filters(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """
@@ -40,47 +57,60 @@ class Tier1Filter:
         
         initial_count = len(df)
         
-        # Track filter results
-        df = df.copy()
+        # Track filter results on a shallow copy; the caller's frame is untouched
+        df = df.copy(deep=False)
+        # Placeholders keep the result columns in their usual order; both are
+        # filled once filtering is done
         df["tier1_pass"] = True
         df["tier1_fail_reasons"] = ""
+        self.fail_reasons = {}
         
-        # 1. Data Quality Filter
-        df = self._filter_data_quality(df)
-        
-        # 2. Sector Exclusions (with exemptions)
-        df = self._filter_sectors(df)
-        
-        # 3. Incremental ROIC Filter (THE KEY METRIC)
-        df = self._filter_incremental_roic(df)
-        
-        # 4. Historical ROIC Filter
-        df = self._filter_historical_roic(df)
-        
-        # 5. ROIC-WACC Spread Filter
-        df = self._filter_roic_wacc_spread(df)
-        
-        # 6. Revenue Growth Filter
-        df = self._filter_revenue_growth(df)
+        # Each hard filter returns its fail mask; they're reduced in one pass below
+        fails = [
+            # 1. Data Quality Filter
+            self._filter_data_quality(df),
+            
+            # 2. Sector Exclusions (with exemptions)
+            self._filter_sectors(df),
+            
+            # 3. Incremental ROIC Filter (THE KEY METRIC)
+            self._filter_incremental_roic(df),
+            
+            # 4. Historical ROIC Filter
+            self._filter_historical_roic(df),
+            
+            # 5. ROIC-WACC Spread Filter
+            self._filter_roic_wacc_spread(df),
+            
+            # 6. Revenue Growth Filter
+            self._filter_revenue_growth(df),
+            
+            # 7. FCF Conversion Filter
+            self._filter_fcf_conversion(df),
+            
+            # 8. Gross Margin Filter
+            self._filter_gross_margin(df),
+        ]
         
-        # 7. FCF Conversion Filter
-        df = self._filter_fcf_conversion(df)
+        # 9. Leverage Filter (only charged to companies still passing)
+        fails.append(self._filter_leverage(df, ~np.any(fails, axis=0)))
         
-        # 8. Gross Margin Filter
-        df = self._filter_gross_margin(df)
+        # 10. Market Cap Filter
+        fails.append(self._filter_market_cap(df))
         
-        # 9. Leverage Filter
-        df = self._filter_leverage(df)
+        # 11. Reinvestment Rate Filter (informational, never fails)
+        self._filter_reinvestment_rate(df)
         
-        # 10. Market Cap Filter
-        df = self._filter_market_cap(df)
+        fail_matrix = np.column_stack(fails)
+        passing = ~fail_matrix.any(axis=1)
+        self.filter_stats = dict(zip(FILTER_NAMES, fail_matrix.sum(axis=0).tolist()))
         
-        # 11. Reinvestment Rate Filter
-        df = self._filter_reinvestment_rate(df)
+        df["tier1_pass"] = passing
+        df["tier1_fail_reasons"] = self._join_fail_reasons(len(df))
         
         # Split into passed and failed
-        passed_df = df[df["tier1_pass"]].copy()
-        failed_df = df[~df["tier1_pass"]].copy()
+        passed_df = df[passing].copy()
+        failed_df = df[~passing].copy()
         
         # Summary
         print(f"\n{'='*60}")
@@ -100,51 +130,60 @@ class Tier1Filter:
         
         return passed_df, failed_df
     
-    def _filter_data_quality(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _join_fail_reasons(self, n: int) -> np.ndarray:
+        """Build the ';'-terminated reasons column, touching only flagged rows."""
+        names = np.array(list(self.fail_reasons), dtype=object)
+        reasons = np.full(n, "", dtype=object)
+        if not len(names):
+            return reasons
+        reason_matrix = np.column_stack(list(self.fail_reasons.values()))
+        for i in np.flatnonzero(reason_matrix.any(axis=1)):
+            reasons[i] = "".join(names[reason_matrix[i]])
+        return reasons
+    
+    def _filter_data_quality(self, df: pd.DataFrame) -> np.ndarray:
         """Remove companies with incomplete data."""
         mask = df["data_quality"] != "complete"
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += "incomplete_data;"
+        self.fail_reasons["incomplete_data;"] = mask.to_numpy()
         
         print(f"1. Data Quality:      {failed_count} removed (incomplete data)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_sectors(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_sectors(self, df: pd.DataFrame) -> np.ndarray:
         """
         Exclude certain sectors per charter.
         Exempts payment networks, exchanges, rating agencies.
         """
-        failed_count = 0
-        
-        for idx, row in df.iterrows():
-            ticker = row.get("ticker", "")
-            sector = str(row.get("sector", "")).lower()
-            
-            # Skip exempt tickers
-            if ticker in EXEMPT_TICKERS:
-                continue
-            
-            # Skip explicitly excluded tickers
-            if ticker in EXCLUDED_TICKERS:
-                df.at[idx, "tier1_pass"] = False
-                df.at[idx, "tier1_fail_reasons"] += "excluded_ticker;"
-                failed_count += 1
-                continue
-            
-            # Check sector exclusions
-            for excluded in EXCLUDED_SECTORS:
-                if excluded.lower() in sector:
-                    df.at[idx, "tier1_pass"] = False
-                    df.at[idx, "tier1_fail_reasons"] += f"excluded_sector:{excluded};"
-                    failed_count += 1
-                    break
+        tickers = df["ticker"] if "ticker" in df else pd.Series("", index=df.index)
+        exempt = tickers.isin(_EXEMPT_TICKERS).to_numpy()
+        
+        # Explicitly excluded tickers
+        excluded = tickers.isin(_EXCLUDED_TICKERS).to_numpy() & ~exempt
+        self.fail_reasons["excluded_ticker;"] = excluded
+        
+        # Sector exclusions: one regex pass finds the hits, then only those rows
+        # are checked per sector so the first listed match is the reason
+        if "sector" in df and _EXCLUDED_SECTOR_NEEDLES:
+            sectors = df["sector"].astype(str).str.lower()
+            hits = sectors.str.contains(_EXCLUDED_SECTOR_RE).to_numpy() & ~exempt & ~excluded
+            hit_sectors = sectors[hits]
+            unmatched = np.ones(len(hit_sectors), dtype=bool)
+            for sector, needle in _EXCLUDED_SECTOR_NEEDLES:
+                matched = hit_sectors.str.contains(needle, regex=False).to_numpy() & unmatched
+                unmatched &= ~matched
+                mask = np.zeros(len(df), dtype=bool)
+                mask[hits] = matched
+                self.fail_reasons[f"excluded_sector:{sector};"] = mask
+            excluded = excluded | hits
+        
+        failed_count = excluded.sum()
         
         print(f"2. Sector Exclusions: {failed_count} removed")
-        return df
+        return excluded
     
-    def _filter_incremental_roic(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_incremental_roic(self, df: pd.DataFrame) -> np.ndarray:
         """
         THE KEY FILTER: Incremental ROIC ≥ 25%
         Each new dollar invested must earn at least 25%.
@@ -155,17 +194,16 @@ class Tier1Filter:
         mask = pd.notna(df["incremental_roic"]) & (df["incremental_roic"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"low_incremental_roic(<{threshold*100:.0f}%);"
+        self.fail_reasons[f"low_incremental_roic(<{threshold*100:.0f}%);"] = mask.to_numpy()
         
         # Also fail if missing and we can't calculate
         missing_mask = pd.isna(df["incremental_roic"])
         missing_count = missing_mask.sum()
         
         print(f"3. Incremental ROIC:  {failed_count} removed (<{threshold*100:.0f}%), {missing_count} missing data")
-        return df
+        return mask.to_numpy()
     
-    def _filter_historical_roic(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_historical_roic(self, df: pd.DataFrame) -> np.ndarray:
         """Historical ROIC ≥ 20% (3Y avg)."""
         threshold = self.filters["min_historical_roic"]
         
@@ -175,100 +213,89 @@ class Tier1Filter:
         mask = pd.notna(df["roic_check"]) & (df["roic_check"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"low_historical_roic(<{threshold*100:.0f}%);"
+        self.fail_reasons[f"low_historical_roic(<{threshold*100:.0f}%);"] = mask.to_numpy()
         
         print(f"4. Historical ROIC:   {failed_count} removed (<{threshold*100:.0f}%)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_roic_wacc_spread(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_roic_wacc_spread(self, df: pd.DataFrame) -> np.ndarray:
         """ROIC - WACC spread ≥ 15 percentage points."""
         threshold = self.filters["min_roic_wacc_spread"]
         
         mask = pd.notna(df["roic_wacc_spread"]) & (df["roic_wacc_spread"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"low_spread(<{threshold*100:.0f}ppts);"
+        self.fail_reasons[f"low_spread(<{threshold*100:.0f}ppts);"] = mask.to_numpy()
         
         print(f"5. ROIC-WACC Spread:  {failed_count} removed (<{threshold*100:.0f}ppts)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_revenue_growth(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_revenue_growth(self, df: pd.DataFrame) -> np.ndarray:
         """Revenue Growth ≥ 15% (3Y CAGR)."""
         threshold = self.filters["min_revenue_growth"]
         
         mask = pd.notna(df["revenue_growth_3y"]) & (df["revenue_growth_3y"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"low_growth(<{threshold*100:.0f}%);"
+        self.fail_reasons[f"low_growth(<{threshold*100:.0f}%);"] = mask.to_numpy()
         
         print(f"6. Revenue Growth:    {failed_count} removed (<{threshold*100:.0f}% 3Y CAGR)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_fcf_conversion(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_fcf_conversion(self, df: pd.DataFrame) -> np.ndarray:
         """FCF Conversion ≥ 90% of net income."""
         threshold = self.filters["min_fcf_conversion"]
         
         mask = pd.notna(df["fcf_conversion"]) & (df["fcf_conversion"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"low_fcf_conv(<{threshold*100:.0f}%);"
+        self.fail_reasons[f"low_fcf_conv(<{threshold*100:.0f}%);"] = mask.to_numpy()
         
         print(f"7. FCF Conversion:    {failed_count} removed (<{threshold*100:.0f}%)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_gross_margin(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_gross_margin(self, df: pd.DataFrame) -> np.ndarray:
         """Gross Margin ≥ 60% (expanding preferred)."""
         threshold = self.filters["min_gross_margin"]
         
         mask = pd.notna(df["gross_margin"]) & (df["gross_margin"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"low_gross_margin(<{threshold*100:.0f}%);"
+        self.fail_reasons[f"low_gross_margin(<{threshold*100:.0f}%);"] = mask.to_numpy()
         
         print(f"8. Gross Margin:      {failed_count} removed (<{threshold*100:.0f}%)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_leverage(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_leverage(self, df: pd.DataFrame, passing: np.ndarray) -> np.ndarray:
         """Net Debt/EBITDA ≤ 2.0× OR Net Cash position."""
         threshold = self.filters["max_net_debt_ebitda"]
         
-        # Pass if net cash (negative net debt) OR low leverage
-        net_cash_mask = df["is_net_cash"] == True
-        low_leverage_mask = pd.notna(df["net_debt_ebitda"]) & (df["net_debt_ebitda"] <= threshold)
-        
-        pass_mask = net_cash_mask | low_leverage_mask
-        fail_mask = ~pass_mask & df["tier1_pass"]  # Only fail those still passing
-        
-        # Handle missing data - assume failure if can't calculate
-        missing_mask = pd.isna(df["net_debt_ebitda"]) & (df["is_net_cash"] != True)
+        # Pass if net cash (negative net debt) OR low leverage. Missing
+        # leverage reads as +inf, i.e. a failure unless the company is net cash
+        is_net_cash = (df["is_net_cash"] == True).to_numpy()
+        net_debt_ebitda = df["net_debt_ebitda"].to_numpy(dtype=np.float64, na_value=np.inf)
+        fail_mask = ~(is_net_cash | (net_debt_ebitda <= threshold)) & passing  # Only fail those still passing
         
         failed_count = fail_mask.sum()
         
-        df.loc[fail_mask, "tier1_pass"] = False
-        df.loc[fail_mask, "tier1_fail_reasons"] += f"high_leverage(>{threshold}x);"
+        self.fail_reasons[f"high_leverage(>{threshold}x);"] = fail_mask
         
         print(f"9. Leverage:          {failed_count} removed (>{threshold}x Net Debt/EBITDA)")
-        return df
+        return fail_mask
     
-    def _filter_market_cap(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_market_cap(self, df: pd.DataFrame) -> np.ndarray:
         """Market Cap ≥ $10B."""
         threshold = self.filters["min_market_cap"]
         
         mask = pd.notna(df["market_cap"]) & (df["market_cap"] < threshold)
         failed_count = mask.sum()
         
-        df.loc[mask, "tier1_pass"] = False
-        df.loc[mask, "tier1_fail_reasons"] += f"small_cap(<${threshold/1e9:.0f}B);"
+        self.fail_reasons[f"small_cap(<${threshold/1e9:.0f}B);"] = mask.to_numpy()
         
         print(f"10. Market Cap:       {failed_count} removed (<${threshold/1e9:.0f}B)")
-        return df
+        return mask.to_numpy()
     
-    def _filter_reinvestment_rate(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _filter_reinvestment_rate(self, df: pd.DataFrame) -> None:
         """Reinvestment Rate ≥ 30% of FCF."""
         threshold = self.filters["min_reinvestment_rate"]
         
@@ -281,10 +308,9 @@ class Tier1Filter:
         flagged_count = mask.sum()
         
         # Add flag but don't fail
-        df.loc[mask, "tier1_fail_reasons"] += f"low_reinvestment({threshold*100:.0f}%);"
+        self.fail_reasons[f"low_reinvestment({threshold*100:.0f}%);"] = mask.to_numpy()
         
         print(f"11. Reinvestment:     {flagged_count} flagged (informational, not hard filter)")
-        return df
 
 
 def run_tier1_filter(input_file: str, output_file: str = "universe_tier1_passed.csv",
@@ -301,14 +327,30 @@ def run_tier1_filter(input_file: str, output_file: str = "universe_tier1_passed.
         Tuple of (passed_df, failed_df)
     """
     print(f"\nLoading data from {input_file}...")
-    df = pd.read_csv(input_file)
+    df = read_table(input_file)
     
+    return run_tier1_filter_df(df, output_file, failed_file)
+
+
+def run_tier1_filter_df(df: pd.DataFrame, output_file: str = "universe_tier1_passed.csv",
+                        failed_file: str = "universe_tier1_failed.csv") -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Run Tier 1 filtering on an in-memory universe DataFrame.
+    
+    Args:
+        df: Raw financial data (one row per ticker)
+        output_file: Where to save passed companies
+        failed_file: Where to save failed companies
+    
+    Returns:
+        Tuple of (passed_df, failed_df)
+    """
     filter_engine = Tier1Filter()
-    passed_df, failed_df = filter_engine.apply_filters(df)
+    passed_df, failed_df = filter_engine.apply_filters(df.reset_index(drop=True))
     
     # Save results
-    passed_df.to_csv(output_file, index=False)
-    failed_df.to_csv(failed_file, index=False)
+    write_table(passed_df, output_file)
+    write_table(failed_df, failed_file)
     
     print(f"\n✅ Tier 1 passed: {output_file}")
     print(f"📋 Tier 1 failed: {failed_file}")
@@ -319,6 +361,7 @@ def run_tier1_filter(input_file: str, output_file: str = "universe_tier1_passed.
 def apply_tier1_filters(data: Dict) -> Tuple[bool, List[str]]:
     """
     Apply Tier 1 filters to a single ticker's data dict.
+    For more than one ticker use apply_tier1_filters_batch.
     
     Args:
         data: Dict with ticker metrics
@@ -334,11 +377,11 @@ def apply_tier1_filters(data: Dict) -> Tuple[bool, List[str]]:
     
     # Check excluded sectors
     sector = data.get('sector', '')
-    if sector in EXCLUDED_SECTORS:
+    if sector in _EXCLUDED_SECTORS:
         return False, [f"Excluded sector: {sector}"]
     
     # Check excluded tickers
-    if ticker in EXCLUDED_TICKERS:
+    if ticker in _EXCLUDED_TICKERS:
         return False, [f"Excluded ticker: {ticker}"]
     
     # Incremental ROIC
@@ -401,6 +444,108 @@ def apply_tier1_filters(data: Dict) -> Tuple[bool, List[str]]:
     return passed, failures
 
 
+def _batch_column(df: pd.DataFrame, column: str) -> np.ndarray:
+    """Column as a float array; all-NaN if the column is absent."""
+    if column not in df:
+        return np.full(len(df), np.nan)
+    return df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def apply_tier1_filters_batch(df: pd.DataFrame) -> Tuple[np.ndarray, List[List[str]]]:
+    """
+    Apply Tier 1 filters to many tickers at once (one row per ticker).
+    Same checks and messages as apply_tier1_filters; NaN counts as missing.
+    
+    Args:
+        df: DataFrame with ticker metrics
+        
+    Returns:
+        Tuple of (passed: bool array, failures: List[str] per row)
+    """
+    n = len(df)
+    filters = TIER1_FILTERS
+    tickers = df['ticker'].fillna('').to_numpy(dtype=object) if 'ticker' in df else np.full(n, '', dtype=object)
+    sectors = df['sector'].to_numpy(dtype=object) if 'sector' in df else np.full(n, '', dtype=object)
+    failures = [[] for _ in range(n)]
+    
+    # Excluded sectors / tickers fail outright, skipping the metric checks
+    excluded_sector = np.fromiter((s in _EXCLUDED_SECTORS for s in sectors), dtype=bool, count=n)
+    excluded_ticker = ~excluded_sector & np.fromiter((t in _EXCLUDED_TICKERS for t in tickers), dtype=bool, count=n)
+    for i in np.flatnonzero(excluded_sector):
+        failures[i].append(f"Excluded sector: {sectors[i]}")
+    for i in np.flatnonzero(excluded_ticker):
+        failures[i].append(f"Excluded ticker: {tickers[i]}")
+    screened = ~(excluded_sector | excluded_ticker)
+    
+    def check(fail, name, message):
+        # is_exempt is only consulted for the rows that would fail
+        for i in np.flatnonzero(screened & fail):
+            if not is_exempt(tickers[i], name):
+                failures[i].append(message(i))
+    
+    # Incremental ROIC
+    inc_roic = _batch_column(df, 'incremental_roic')
+    min_inc_roic = filters.get('min_incremental_roic', 0.15)
+    for i in np.flatnonzero(screened & np.isnan(inc_roic)):
+        failures[i].append("Missing incremental ROIC data")
+    check(inc_roic < min_inc_roic, 'min_incremental_roic',
+          lambda i: f"Inc ROIC {inc_roic[i]*100:.1f}% < {min_inc_roic*100}% min")
+    
+    # Historical ROIC (3Y average, else current)
+    roic_3y = _batch_column(df, 'roic_3y_avg')
+    hist_roic = np.where(np.isnan(roic_3y) | (roic_3y == 0), _batch_column(df, 'roic'), roic_3y)
+    min_hist_roic = filters.get('min_historical_roic', 0.15)
+    check(hist_roic < min_hist_roic, 'min_historical_roic',
+          lambda i: f"ROIC {hist_roic[i]*100:.1f}% < {min_hist_roic*100}% min")
+    
+    # ROIC-WACC spread
+    spread = _batch_column(df, 'roic_wacc_spread')
+    min_spread = filters.get('min_roic_wacc_spread', 0.08)
+    check(spread < min_spread, 'min_roic_wacc_spread',
+          lambda i: f"ROIC-WACC spread {spread[i]*100:.1f}% < {min_spread*100}% min")
+    
+    # Revenue growth
+    growth = _batch_column(df, 'revenue_growth_3y')
+    min_growth = filters.get('min_revenue_growth', 0.08)
+    check(growth < min_growth, 'min_revenue_growth',
+          lambda i: f"Revenue growth {growth[i]*100:.1f}% < {min_growth*100}% min")
+    
+    # FCF conversion
+    fcf_conv = _batch_column(df, 'fcf_conversion')
+    min_fcf = filters.get('min_fcf_conversion', 0.70)
+    check(fcf_conv < min_fcf, 'min_fcf_conversion',
+          lambda i: f"FCF conversion {fcf_conv[i]*100:.1f}% < {min_fcf*100}% min")
+    
+    # Gross margin
+    gm = _batch_column(df, 'gross_margin')
+    min_gm = filters.get('min_gross_margin', 0.40)
+    check(gm < min_gm, 'min_gross_margin',
+          lambda i: f"Gross margin {gm[i]*100:.1f}% < {min_gm*100}% min")
+    
+    # CapEx/Revenue (capital light requirement)
+    capex = _batch_column(df, 'capex_to_revenue')
+    capex_rev = np.where(np.isnan(capex) | (capex == 0), _batch_column(df, 'capex_revenue'), capex)
+    max_capex = filters.get('max_capex_revenue')
+    if max_capex:
+        check(capex_rev > max_capex, 'max_capex_revenue',
+              lambda i: f"CapEx/Revenue {capex_rev[i]*100:.1f}% > {max_capex*100}% max")
+    
+    # Leverage
+    leverage = _batch_column(df, 'net_debt_ebitda')
+    max_leverage = filters.get('max_net_debt_ebitda', 3.0)
+    check(leverage > max_leverage, 'max_net_debt_ebitda',
+          lambda i: f"Leverage {leverage[i]:.1f}x > {max_leverage}x max")
+    
+    # Market cap (missing counts as 0)
+    market_cap = np.nan_to_num(_batch_column(df, 'market_cap'), nan=0.0)
+    min_cap = filters.get('min_market_cap', 10e9)
+    check(market_cap < min_cap, 'min_market_cap',
+          lambda i: f"Market cap ${market_cap[i]/1e9:.1f}B < ${min_cap/1e9}B min")
+    
+    passed = np.fromiter((not f for f in failures), dtype=bool, count=n)
+    return passed, failures
+
+
 if __name__ == "__main__":
     import sys
     
@@ -17,11 +17,19 @@ Tier Labels:
 - REVIEW: <60 pts → Ignore
 """
 
+import os
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 from config import TIER2_WEIGHTS, TIER2_SCORING, TIER_LABELS
+from table_io import read_table, write_table
+
+# Rows score_universe fully ranks at minimum (see Tier2Scorer._rank)
+RANK_TOP_K = 50
+
+# Gross margin trend -> points; anything else (declining, unknown) scores 0
+GROSS_MARGIN_TREND_POINTS = {"expanding": 10, "stable": 5}
 
 
 class Tier2Scorer:
@@ -43,15 +51,16 @@ class Tier2Scorer:
             print(f"{'='*60}")
             print(f"Scoring {len(df)} companies...\n")
         
-        df = df.copy()
+        # Score columns go on a shallow copy, sharing the input's column data
+        df = df.copy(deep=False)
         
-        # Calculate individual component scores
-        df["score_incremental_roic"] = df.apply(self._score_incremental_roic, axis=1)
-        df["score_reinvestment_runway"] = df.apply(self._score_reinvestment_runway, axis=1)
-        df["score_revenue_growth"] = df.apply(self._score_revenue_growth, axis=1)
-        df["score_fcf_conversion"] = df.apply(self._score_fcf_conversion, axis=1)
-        df["score_gross_margin_trend"] = df.apply(self._score_gross_margin_trend, axis=1)
-        df["score_capex_efficiency"] = df.apply(self._score_capex_efficiency, axis=1)
+        # Calculate individual component scores, one column-wise pass each
+        df["score_incremental_roic"] = self._score_incremental_roic(df)
+        df["score_reinvestment_runway"] = self._score_reinvestment_runway(df)
+        df["score_revenue_growth"] = self._score_revenue_growth(df)
+        df["score_fcf_conversion"] = self._score_fcf_conversion(df)
+        df["score_gross_margin_trend"] = self._score_gross_margin_trend(df)
+        df["score_capex_efficiency"] = self._score_capex_efficiency(df)
         
         # Calculate total score
         score_columns = [
@@ -62,13 +71,14 @@ class Tier2Scorer:
             "score_gross_margin_trend",
             "score_capex_efficiency"
         ]
-        df["total_score"] = df[score_columns].sum(axis=1)
+        # Components fit in int8 (max 30); the 100-point total needs int16
+        df["total_score"] = df[score_columns].to_numpy().sum(axis=1, dtype=np.int16)
         
         # Assign tier labels
-        df["tier_label"] = df["total_score"].apply(self._assign_tier_label)
+        df["tier_label"] = self._assign_tier_label(df["total_score"].to_numpy())
         
-        # Sort by total score descending
-        df = df.sort_values("total_score", ascending=False)
+        # Rank by total score descending; ties keep their input order
+        df = self._rank(df)
         
         # Print summary (unless verbose=False)
         if verbose:
@@ -76,25 +86,23 @@ class Tier2Scorer:
         
         return df
     
-    def _score_incremental_roic(self, row) -> int:
+    @staticmethod
+    def _values(df: pd.DataFrame, column: str, default: float = np.nan) -> np.ndarray:
+        """Column as a float array (NaN for missing); `default` if the column is absent."""
+        if column not in df:
+            return np.full(len(df), default)
+        return df[column].astype(float).to_numpy()
+    
+    def _score_incremental_roic(self, df: pd.DataFrame) -> np.ndarray:
         """
         Score Incremental ROIC (30 pts max).
         >40% = 30, 30-40% = 20, 25-30% = 10, <25% = 0
         """
-        val = row.get("incremental_roic")
-        if pd.isna(val):
-            return 0
-        
-        if val > 0.40:
-            return 30
-        elif val > 0.30:
-            return 20
-        elif val >= 0.25:
-            return 10
-        else:
-            return 0
+        val = self._values(df, "incremental_roic")
+        # NaN fails every comparison, so missing data scores 0
+        return np.select([val > 0.40, val > 0.30, val >= 0.25], [30, 20, 10], default=0).astype(np.int8)
     
-    def _score_reinvestment_runway(self, row) -> int:
+    def _score_reinvestment_runway(self, df: pd.DataFrame) -> np.ndarray:
         """
         Score Reinvestment Runway (20 pts max).
         Based on market cap as proxy for addressable opportunity.
@@ -103,111 +111,79 @@ class Tier2Scorer:
         $10-50B = 10
         <$10B = 5
         """
-        market_cap = row.get("market_cap", 0)
-        growth_rate = row.get("revenue_growth_3y", 0) or 0
+        market_cap = self._values(df, "market_cap", default=0)
+        growth_rate = self._values(df, "revenue_growth_3y", default=0)
         
         # Estimate runway based on market cap and growth trajectory
         # Companies with large caps AND high growth have proven runways
-        if pd.isna(market_cap):
-            return 0
-        
         # Adjust for growth rate - high growth suggests runway exists
-        growth_mult = 1.0
-        if growth_rate > 0.25:
-            growth_mult = 1.3
-        elif growth_rate > 0.20:
-            growth_mult = 1.2
-        elif growth_rate > 0.15:
-            growth_mult = 1.1
+        growth_mult = np.select([growth_rate > 0.25, growth_rate > 0.20, growth_rate > 0.15],
+                                [1.3, 1.2, 1.1], default=1.0)
         
         effective_cap = market_cap * growth_mult
         
-        if effective_cap > 100_000_000_000:  # $100B+
-            return 20
-        elif effective_cap > 50_000_000_000:  # $50-100B
-            return 15
-        elif effective_cap > 10_000_000_000:  # $10-50B
-            return 10
-        else:
-            return 5
+        score = np.select([effective_cap > 100_000_000_000,   # $100B+
+                           effective_cap > 50_000_000_000,    # $50-100B
+                           effective_cap > 10_000_000_000],   # $10-50B
+                          [20, 15, 10], default=5)
+        return np.where(np.isnan(market_cap), 0, score).astype(np.int8)
     
-    def _score_revenue_growth(self, row) -> int:
+    def _score_revenue_growth(self, df: pd.DataFrame) -> np.ndarray:
         """
         Score Revenue Growth (20 pts max).
         >20% = 20, 15-20% = 15, 10-15% = 10, <10% = 0
         """
-        val = row.get("revenue_growth_3y")
-        if pd.isna(val):
-            return 0
-        
-        if val > 0.20:
-            return 20
-        elif val > 0.15:
-            return 15
-        elif val > 0.10:
-            return 10
-        else:
-            return 0
+        val = self._values(df, "revenue_growth_3y")
+        return np.select([val > 0.20, val > 0.15, val > 0.10], [20, 15, 10], default=0).astype(np.int8)
     
-    def _score_fcf_conversion(self, row) -> int:
+    def _score_fcf_conversion(self, df: pd.DataFrame) -> np.ndarray:
         """
         Score FCF Conversion (15 pts max).
         >100% = 15, 95-100% = 10, 90-95% = 5, <90% = 0
         """
-        val = row.get("fcf_conversion")
-        if pd.isna(val):
-            return 0
-        
-        if val > 1.00:
-            return 15
-        elif val > 0.95:
-            return 10
-        elif val >= 0.90:
-            return 5
-        else:
-            return 0
+        val = self._values(df, "fcf_conversion")
+        return np.select([val > 1.00, val > 0.95, val >= 0.90], [15, 10, 5], default=0).astype(np.int8)
     
-    def _score_gross_margin_trend(self, row) -> int:
+    def _score_gross_margin_trend(self, df: pd.DataFrame) -> np.ndarray:
         """
         Score Gross Margin Trend (10 pts max).
         Expanding 100bps+ = 10, Stable = 5, Declining = 0
         """
-        trend = row.get("gross_margin_trend", "unknown")
-        
-        if trend == "expanding":
-            return 10
-        elif trend == "stable":
-            return 5
-        else:  # declining or unknown
-            return 0
+        if "gross_margin_trend" not in df:
+            return np.zeros(len(df), dtype=np.int8)
+        points = df["gross_margin_trend"].map(GROSS_MARGIN_TREND_POINTS).fillna(0)
+        return points.to_numpy(dtype=np.int8)
     
-    def _score_capex_efficiency(self, row) -> int:
+    def _score_capex_efficiency(self, df: pd.DataFrame) -> np.ndarray:
         """
         Score CapEx Efficiency (5 pts max).
         <3% of revenue = 5, 3-5% = 3, >5% = 0
         Note: Context-dependent - some industries require higher CapEx
         """
-        val = row.get("capex_to_revenue")
-        if pd.isna(val):
-            return 3  # Neutral if missing
-        
-        if val < 0.03:
-            return 5
-        elif val < 0.05:
-            return 3
-        else:
-            return 0
+        val = self._values(df, "capex_to_revenue")
+        # Neutral 3 if missing
+        return np.select([np.isnan(val), val < 0.03, val < 0.05], [3, 5, 3], default=0).astype(np.int8)
     
-    def _assign_tier_label(self, score: float) -> str:
-        """Assign tier label based on total score."""
-        if score >= self.tier_labels["exceptional"]:
-            return "EXCEPTIONAL"
-        elif score >= self.tier_labels["elite"]:
-            return "ELITE"
-        elif score >= self.tier_labels["quality"]:
-            return "QUALITY"
-        else:
-            return "REVIEW"
+    def _assign_tier_label(self, score: np.ndarray) -> np.ndarray:
+        """Assign tier labels based on total scores."""
+        return np.select([score >= self.tier_labels["exceptional"],
+                          score >= self.tier_labels["elite"],
+                          score >= self.tier_labels["quality"]],
+                         ["EXCEPTIONAL", "ELITE", "QUALITY"], default="REVIEW")
+    
+    def _rank(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Sort the head of the universe by total score: at least the top
+        max(RANK_TOP_K, N/4) rows plus everything rated QUALITY or better.
+        The REVIEW tail below that keeps its input order after the head.
+        """
+        k = max(RANK_TOP_K, len(df) // 4)
+        if len(df) <= k:
+            return df.sort_values("total_score", ascending=False, kind="stable")
+        scores = df["total_score"].to_numpy()
+        kth = np.partition(scores, len(df) - k)[len(df) - k]  # k-th highest, O(N)
+        head = scores >= min(kth, self.tier_labels["quality"])
+        return pd.concat([df[head].sort_values("total_score", ascending=False, kind="stable"), df[~head]])
     
     def _print_summary(self, df: pd.DataFrame):
         """Print scoring summary."""
@@ -225,11 +201,10 @@ class Tier2Scorer:
         # Top 10 preview
         print(f"\nTOP 10 BY SCORE:")
         print("-" * 60)
-        for i, row in df.head(10).iterrows():
-            ticker = row.get("ticker", "N/A")
-            score = row.get("total_score", 0)
-            tier = row.get("tier_label", "N/A")
-            inc_roic = row.get("incremental_roic", 0)
+        top = df.head(10)
+        tickers = top["ticker"] if "ticker" in top else ["N/A"] * len(top)
+        inc_roics = top["incremental_roic"] if "incremental_roic" in top else [0] * len(top)
+        for ticker, score, tier, inc_roic in zip(tickers, top["total_score"], top["tier_label"], inc_roics):
             inc_roic_str = f"{inc_roic*100:.1f}%" if pd.notna(inc_roic) else "N/A"
             print(f"  {ticker:8} Score: {score:3.0f} ({tier:12}) Inc.ROIC: {inc_roic_str}")
         
@@ -257,19 +232,36 @@ def run_tier2_scoring(input_file: str, output_file: str = "universe_tier2_scored
         DataFrame with all scored companies
     """
     print(f"\nLoading data from {input_file}...")
-    df = pd.read_csv(input_file)
+    df = read_table(input_file)
+    
+    return run_tier2_scoring_df(df, output_file, min_score)
+
+
+def run_tier2_scoring_df(df: pd.DataFrame, output_file: str = "universe_tier2_scored.csv",
+                         min_score: int = 70) -> pd.DataFrame:
+    """
+    Run Tier 2 scoring on an in-memory DataFrame of Tier 1 passed companies.
     
+    Args:
+        df: Tier 1 passed companies
+        output_file: Where to save scored companies
+        min_score: Minimum score to include in output (default: 70 = ELITE)
+    
+    Returns:
+        DataFrame with all scored companies
+    """
     scorer = Tier2Scorer()
-    scored_df = scorer.score_universe(df)
+    scored_df = scorer.score_universe(df.reset_index(drop=True))
     
     # Save all scored companies
-    scored_df.to_csv(output_file, index=False)
+    write_table(scored_df, output_file)
     print(f"\n✅ Scored universe saved: {output_file}")
     
     # Also save ELITE+ for Tier 3
     elite_df = scored_df[scored_df["total_score"] >= min_score]
-    elite_file = output_file.replace(".csv", "_elite.csv")
-    elite_df.to_csv(elite_file, index=False)
+    root, ext = os.path.splitext(output_file)
+    elite_file = f"{root}_elite{ext}"
+    write_table(elite_df, elite_file)
     print(f"✅ ELITE+ companies ({len(elite_df)}): {elite_file}")
     
     return scored_df
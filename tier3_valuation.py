@@ -20,7 +20,8 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
-from config import DCF_PARAMS, IRR_TARGETS, MOS_REQUIREMENTS
+from config import DCF_PARAMS, IRR_TARGETS, MOS_REQUIREMENTS, calculate_analyst_divergence
+from table_io import HAS_PYARROW, artifact_path, read_table, write_table
 
 
 class DCFValuation:
@@ -29,9 +30,10 @@ class DCFValuation:
     def __init__(self, params: Dict = None):
         self.params = params or DCF_PARAMS
     
-    def value_company(self, row: pd.Series) -> Dict:
+    def value_company(self, row: Dict) -> Dict:
         """
         Calculate intrinsic value and IRR-based entry prices for a company.
+        `row` can be a plain dict or a pd.Series; only row.get() is used.
         
         Returns dict with:
         - intrinsic_value: Per-share fair value
@@ -83,19 +85,14 @@ class DCFValuation:
             intrinsic_value_per_share = intrinsic_equity_value / shares
             
             # Calculate IRR-based entry prices
-            buy_15_price = self._calculate_entry_price(
-                fcf, g_val, wacc, net_debt, shares, target_irr=0.15
-            )
-            buy_12_price = self._calculate_entry_price(
-                fcf, g_val, wacc, net_debt, shares, target_irr=0.12
-            )
-            buy_10_price = self._calculate_entry_price(
-                fcf, g_val, wacc, net_debt, shares, target_irr=0.10
+            buy_15_price, buy_12_price, buy_10_price = self._calculate_entry_prices(
+                fcf, g_val, net_debt, shares
             )
             
             # Calculate implied IRR at current price
             implied_irr = self._calculate_implied_irr(
-                price, intrinsic_value_per_share, g_val
+                price, intrinsic_value_per_share, shares, net_debt,
+                dcf_components["projected_fcfs"], dcf_components["terminal_value"]
             )
             
             # Calculate margins
@@ -116,7 +113,6 @@ class DCFValuation:
             is_capital_returner = reinvestment_rate < self.params.get("capital_returner_reinv_threshold", 0.35)
             
             # Calculate analyst divergence (if consensus data available)
-            from config import calculate_analyst_divergence
             ticker_symbol = row.get("ticker", "")
             divergence_data = calculate_analyst_divergence(ticker_symbol, intrinsic_value_per_share)
             
@@ -151,6 +147,112 @@ class DCFValuation:
         
         return result
     
+    def value_companies(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Batch version of value_company: a DataFrame of the same result fields,
+        one row per row of df (same index). The 15-year DCF runs once across
+        all companies as array math.
+        """
+        n = len(df)
+        
+        def column(name, default=0.0):
+            if name not in df:
+                return np.full(n, default)
+            return df[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        fcf = column("fcf_current")
+        revenue_growth = column("revenue_growth_3y")
+        incremental_roic = column("incremental_roic")
+        reinvestment_rate = column("reinvestment_rate")
+        market_cap = column("market_cap")
+        price = column("price")
+        shares = column("shares_outstanding")
+        beta = column("beta", 1.0)
+        beta = np.where(beta == 0, 1.0, beta)
+        net_debt = column("net_debt")
+        tickers = df["ticker"].tolist() if "ticker" in df else [""] * n
+        names = df["company_name"].tolist() if "company_name" in df else [""] * n
+        
+        # Validate inputs
+        valid = ~((fcf <= 0) | (market_cap <= 0) | (shares <= 0))
+        
+        wacc = self._calculate_wacc(beta)
+        g_val = self._calculate_growth_rates(revenue_growth, incremental_roic, reinvestment_rate)
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intrinsic_equity_value, dcf_components = self._run_dcf_batch(fcf, g_val, wacc, net_debt)
+            intrinsic_value_per_share = intrinsic_equity_value / shares
+        
+        # Implied IRR at current prices
+        implied_irrs = self._calculate_implied_irr(
+            price, intrinsic_value_per_share, shares, net_debt,
+            dcf_components["projected_fcfs"], dcf_components["terminal_value"]
+        )
+        
+        # Margins: MOS is the upside when undervalued, 0 otherwise
+        with np.errstate(divide="ignore", invalid="ignore"):
+            upside_to_fair = np.where(price > 0, intrinsic_value_per_share / price - 1, 0.0)
+        margin_of_safety = np.where((intrinsic_value_per_share > price) & (price > 0), upside_to_fair, 0.0)
+        
+        actions = self._determine_actions(implied_irrs, margin_of_safety)
+        
+        # Calculate IRR-based entry prices: (companies x [15%, 12%, 10%])
+        buy_prices = self._calculate_entry_prices(fcf, g_val, net_debt, shares)
+        
+        # Status comes from the validity mask; only the config-side analyst
+        # lookup can fail per company, so only it is guarded
+        status = np.where(valid, "complete", "insufficient_data").astype(object)
+        divergence = [{}] * n
+        errors = {}
+        for i in np.flatnonzero(valid):
+            try:
+                divergence[i] = calculate_analyst_divergence(tickers[i], intrinsic_value_per_share[i])
+            except Exception as e:
+                status[i] = "error"
+                errors[i] = str(e)
+        
+        is_capital_returner = reinvestment_rate < self.params.get("capital_returner_reinv_threshold", 0.35)
+        
+        # Assemble column by column; fields past valuation_status only for complete rows
+        out = pd.DataFrame({
+            "ticker": tickers,
+            "company_name": names,
+            "valuation_date": datetime.now().isoformat(),
+            "valuation_status": status,
+        }, index=df.index)
+        complete = status == "complete"
+        fields = {
+            "wacc": wacc,
+            "g_val": g_val,
+            "fcf_base": fcf,
+            "intrinsic_value": np.round(intrinsic_value_per_share, 2),
+            "current_price": np.round(price, 2),
+            "upside_to_fair": np.round(upside_to_fair * 100, 1),
+            "margin_of_safety": np.round(margin_of_safety * 100, 1),
+            "buy_15_price": np.round(buy_prices[:, 0], 2),
+            "buy_12_price": np.round(buy_prices[:, 1], 2),
+            "buy_10_price": np.round(buy_prices[:, 2], 2),
+            "implied_irr": np.round(implied_irrs * 100, 1),
+            "action_signal": actions,
+            "enterprise_value": np.round(dcf_components["ev"] / 1e9, 2),
+            "terminal_value_pct": np.round(dcf_components["tv_pct"] * 100, 1),
+            "is_capital_returner": is_capital_returner,
+            "growth_method": np.where(is_capital_returner, "revenue_growth", "sustainable_growth"),
+            # Analyst divergence fields
+            "analyst_divergence_flag": [d.get("flag", "NO_DATA") for d in divergence],
+            "analyst_divergence_pct": [d.get("divergence_pct") for d in divergence],
+            "analyst_target_avg": [d.get("analyst_avg") for d in divergence],
+            "analyst_target_range": [d.get("analyst_range") for d in divergence],
+        }
+        for name, values in fields.items():
+            out[name] = pd.Series(values, index=df.index).where(complete).infer_objects()
+        if errors:
+            error = np.full(n, np.nan, dtype=object)
+            error[list(errors)] = list(errors.values())
+            out["error"] = error
+        
+        return out
+    
     def _calculate_wacc(self, beta: float) -> float:
         """
         Calculate WACC using CAPM with beta adjustment.
@@ -218,6 +320,32 @@ class DCFValuation:
         
         return g_val
     
+    def _calculate_growth_rates(self, revenue_growth: np.ndarray, inc_roic: np.ndarray,
+                                reinv_rate: np.ndarray) -> np.ndarray:
+        """
+        _calculate_growth_rate over arrays of companies: the same three-part
+        logic as branch-free array ops (NaN inputs give NaN, as in the scalar path).
+        """
+        g_floor = self.params.get("g_val_floor", 0.08)
+        g_cap = self.params.get("g_val_cap", 0.30)
+        capital_returner_threshold = self.params.get("capital_returner_reinv_threshold", 0.35)
+        use_revenue_for_capital_returners = self.params.get("capital_returner_use_revenue_growth", True)
+        
+        is_capital_returner = reinv_rate < capital_returner_threshold
+        
+        # g = min(Revenue Growth, Inc.ROIC × Reinvestment) when the latter is positive
+        sustainable_growth = np.where((inc_roic > 0) & (reinv_rate > 0), inc_roic * reinv_rate, 0)
+        g_val = np.where(sustainable_growth > 0, np.minimum(revenue_growth, sustainable_growth), revenue_growth)
+        if use_revenue_for_capital_returners:
+            g_val = np.where(is_capital_returner, revenue_growth, g_val)
+        
+        # Floor, then cap
+        g_val = np.maximum(g_val, g_floor)
+        if g_cap:
+            g_val = np.minimum(g_val, g_cap)
+        
+        return g_val
+    
     def _run_dcf(self, fcf: float, g_val: float, wacc: float, 
                   net_debt: float) -> Tuple[float, Dict]:
         """
@@ -240,6 +368,7 @@ class DCFValuation:
         growth_schedule = []
         
         current_fcf = fcf
+        discount_factor = 1.0
         
         for year in range(1, years + 1):
             # Determine growth rate for this year
@@ -258,8 +387,8 @@ class DCFValuation:
             current_fcf = current_fcf * (1 + growth)
             projected_fcfs.append(current_fcf)
             
-            # Calculate PV
-            discount_factor = (1 + wacc) ** year
+            # Calculate PV; the discount factor compounds one year at a time
+            discount_factor *= 1 + wacc
             pv = current_fcf / discount_factor
             pv_fcfs.append(pv)
         
@@ -269,7 +398,7 @@ class DCFValuation:
         # Ensure WACC > terminal growth
         wacc_for_terminal = max(wacc, terminal_growth + 0.02)
         terminal_value = terminal_fcf / (wacc_for_terminal - terminal_growth)
-        pv_terminal = terminal_value / ((1 + wacc) ** years)
+        pv_terminal = terminal_value / discount_factor
         
         # Sum up
         pv_fcf_total = sum(pv_fcfs)
@@ -282,6 +411,7 @@ class DCFValuation:
             "pv_terminal": pv_terminal,
             "tv_pct": pv_terminal / enterprise_value if enterprise_value > 0 else 0,
             "terminal_value": terminal_value,
+            "projected_fcfs": projected_fcfs,
             "final_year_fcf": projected_fcfs[-1] if projected_fcfs else 0,
             "year1_growth": growth_schedule[0] if growth_schedule else 0,
             "year15_growth": growth_schedule[-1] if growth_schedule else 0,
@@ -289,12 +419,63 @@ class DCFValuation:
         
         return max(equity_value, 0), components
     
-    def _calculate_entry_price(self, fcf: float, g_val: float, wacc: float,
-                                net_debt: float, shares: float, 
-                                target_irr: float) -> float:
+    def _run_dcf_batch(self, fcf: np.ndarray, g_val: np.ndarray, wacc: np.ndarray,
+                       net_debt: np.ndarray) -> Tuple[np.ndarray, Dict]:
         """
-        Calculate price that would deliver target IRR.
-        Uses iterative approach to find price where expected return = target.
+        _run_dcf over arrays of companies at once: the growth schedule,
+        projected FCFs and discount factors are (companies x years) matrices.
+        Both compound along the year axis with cumprod, matching the running
+        products in _run_dcf.
+        
+        Returns (equity_values, components_dict of arrays)
+        """
+        years = self.params["projection_years"]  # 15
+        high_growth_years = self.params.get("high_growth_years", 5)
+        mature_rate = self.params.get("mature_growth_rate", 0.06)
+        terminal_growth = self.params["terminal_growth_rate"]  # 3%
+        
+        year = np.arange(1, years + 1)
+        
+        # Years 1-5 at g_val, then a linear fade from g_val to mature_rate
+        fade_progress = (year - high_growth_years) / max(years - high_growth_years, 1)
+        g = g_val[:, None]
+        growth = np.where(year <= high_growth_years, g, g - (g - mature_rate) * fade_progress)
+        
+        # Compound year by year from the base FCF (first column)
+        projected_fcfs = np.cumprod(np.column_stack([fcf, 1 + growth]), axis=1)[:, 1:]
+        discount_factors = np.cumprod(np.broadcast_to(1 + wacc[:, None], projected_fcfs.shape), axis=1)
+        pv_fcfs = projected_fcfs / discount_factors
+        
+        # Terminal value (Gordon Growth), ensuring WACC > terminal growth
+        terminal_fcf = projected_fcfs[:, -1] * (1 + terminal_growth)
+        wacc_for_terminal = np.maximum(wacc, terminal_growth + 0.02)
+        terminal_value = terminal_fcf / (wacc_for_terminal - terminal_growth)
+        pv_terminal = terminal_value / discount_factors[:, -1]
+        
+        # Sum up
+        pv_fcf_total = pv_fcfs.sum(axis=1)
+        enterprise_value = pv_fcf_total + pv_terminal
+        equity_value = enterprise_value - net_debt
+        
+        components = {
+            "ev": enterprise_value,
+            "pv_fcfs": pv_fcf_total,
+            "pv_terminal": pv_terminal,
+            "tv_pct": np.where(enterprise_value > 0, pv_terminal / enterprise_value, 0),
+            "terminal_value": terminal_value,
+            "projected_fcfs": projected_fcfs,
+            "final_year_fcf": projected_fcfs[:, -1],
+            "year1_growth": growth[:, 0],
+            "year15_growth": growth[:, -1],
+        }
+        
+        return np.maximum(equity_value, 0), components
+    
+    def _calculate_entry_prices(self, fcf, g_val, net_debt, shares,
+                                target_irrs=(0.15, 0.12, 0.10)) -> np.ndarray:
+        """
+        Calculate prices that would deliver each target IRR, all targets in
+        one broadcast: shape (3,) for one company, (N, 3) for arrays of N.
         """
         # Simple approximation: IRR ≈ FCF Yield + Growth
         # Target Price = FCF / (target_irr - g_val × retention)
@@ -302,53 +483,82 @@ class DCFValuation:
         # For a rough estimate, use:
         # Price = FCF × (1 + g_val) / (target_irr - g_val/2)
         
+        fcf, g_val, net_debt, shares = (
+            np.asarray(x, dtype=np.float64)[..., None] for x in (fcf, g_val, net_debt, shares)
+        )
         effective_growth = g_val * 0.6  # Assume some multiple compression
-        required_yield = target_irr - effective_growth
-        
-        if required_yield <= 0:
-            required_yield = 0.02  # Floor at 2% yield
+        required_yield = np.asarray(target_irrs) - effective_growth
+        required_yield = np.where(required_yield <= 0, 0.02, required_yield)  # Floor at 2% yield
         
         implied_ev = fcf / required_yield
         implied_equity = implied_ev - net_debt
-        implied_price = implied_equity / shares if shares > 0 else 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            implied_price = np.where(shares > 0, implied_equity / shares, 0.0)
         
-        return max(implied_price, 0)
+        return np.maximum(implied_price, 0)
     
-    def _calculate_implied_irr(self, current_price: float, 
-                                 intrinsic_value: float, g_val: float) -> float:
+    def _calculate_implied_irr(self, current_price, intrinsic_value, shares, net_debt,
+                               projected_fcfs, terminal_value):
         """
-        Calculate implied IRR at current price.
-        
-        IRR components:
-        1. FCF Yield (earnings yield proxy)
-        2. Expected Growth
-        3. Multiple Expansion/Compression over holding period
-        
-        Formula: IRR ≈ FCF Yield + Growth + Annualized Rerating
+        Calculate implied IRR at current price: the rate r where
+        NPV(r) = 0 for the cashflows of buying the business today.
+        Works row-wise on arrays (projected_fcfs as companies x years)
+        as well as on a single company.
+        
+        Cashflows:
+        - CF0: -(Price × Shares + Net Debt), i.e. enterprise cost at market
+        - CF1..CF15: Projected FCFs from the DCF
+        - CF15 also receives the terminal value
+        
+        Solved by Newton-Raphson from 10% with the analytic derivative;
+        rows where Newton diverges fall back to bisection on [-50%, 50%].
         """
-        if current_price <= 0 or intrinsic_value <= 0:
-            return 0
-        
-        # Calculate upside to fair value
-        upside = (intrinsic_value / current_price) - 1
-        
-        # Annualize the rerating over 5-year holding period
-        # If 50% undervalued, that's ~8.4% annual rerating contribution
-        holding_years = 5
-        if upside > 0:
-            rerating_contribution = (1 + upside) ** (1/holding_years) - 1
-        else:
-            # If overvalued, rerating is a drag
-            rerating_contribution = -((1 - abs(upside)) ** (1/holding_years) - 1)
-        
-        # Total IRR = Growth + Rerating
-        # (In reality, also includes FCF yield, but growth captures reinvestment)
-        implied_irr = g_val + rerating_contribution
+        scalar = np.ndim(projected_fcfs) == 1
+        projected_fcfs = np.atleast_2d(np.asarray(projected_fcfs, dtype=np.float64))
+        current_price, intrinsic_value, shares, net_debt, terminal_value = (
+            np.atleast_1d(np.asarray(x, dtype=np.float64))
+            for x in (current_price, intrinsic_value, shares, net_debt, terminal_value)
+        )
+        
+        cashflows = np.column_stack([-(current_price * shares + net_debt), projected_fcfs])
+        cashflows[:, -1] += terminal_value
+        t = np.arange(cashflows.shape[1])
+        
+        def npv(r):
+            return (cashflows / (1 + r[:, None]) ** t).sum(axis=1)
+        
+        with np.errstate(all="ignore"):
+            # Newton: r -= NPV(r) / NPV'(r), NPV'(r) = -Σ t·CF_t / (1+r)^(t+1)
+            r = np.full(len(cashflows), 0.10)
+            for _ in range(20):
+                discounted = cashflows / (1 + r[:, None]) ** t
+                slope = -(t * discounted).sum(axis=1) / (1 + r)
+                step = discounted.sum(axis=1) / slope
+                r = r - step
+                converged = np.abs(step) < 1e-10
+                if converged.all():
+                    break
+            
+            # Bisection fallback; NPV falls as r rises, and a root outside
+            # the bracket lands on the nearer edge
+            diverged = ~converged | ~np.isfinite(r) | (r <= -1)
+            if diverged.any():
+                rows = np.flatnonzero(diverged)
+                cashflows = cashflows[rows]
+                lo = np.full(len(rows), -0.5)
+                hi = np.full(len(rows), 0.5)
+                for _ in range(60):
+                    mid = (lo + hi) / 2
+                    above = npv(mid) > 0
+                    lo = np.where(above, mid, lo)
+                    hi = np.where(above, hi, mid)
+                r[rows] = np.where(np.isfinite(cashflows).all(axis=1), (lo + hi) / 2, np.nan)
         
         # Cap at reasonable bounds
-        implied_irr = max(min(implied_irr, 0.50), -0.20)  # -20% to +50%
+        implied_irr = np.clip(r, -0.20, 0.50)  # -20% to +50%
         
-        return implied_irr
+        implied_irr = np.where((current_price <= 0) | (intrinsic_value <= 0), 0.0, implied_irr)
+        return float(implied_irr[0]) if scalar else implied_irr
     
     def _determine_action(self, implied_irr: float, mos: float, 
                            tier_label: str) -> str:
@@ -374,6 +584,14 @@ class DCFValuation:
         
         # Everything else we own is HOLD
         return "HOLD"
+    
+    def _determine_actions(self, implied_irr: np.ndarray, mos: np.ndarray) -> np.ndarray:
+        """_determine_action over arrays of IRR and MOS (decimal form): SELL, then BUY, else HOLD."""
+        return np.select(
+            [(implied_irr < 0.10) | (mos < -0.20), (implied_irr >= 0.15) & (mos >= 0.10)],
+            ["SELL", "BUY"],
+            default="HOLD",
+        )
 
 
 def run_tier3_valuation(input_file: str, output_file: str = "top20_buylist.csv",
@@ -386,6 +604,25 @@ def run_tier3_valuation(input_file: str, output_file: str = "top20_buylist.csv",
         output_file: Where to save valued companies
         min_score: Minimum score to value (default: 70 = ELITE+)
     
+    Returns:
+        DataFrame with valuations sorted by implied IRR
+    """
+    print(f"\nLoading data from {input_file}...")
+    df = read_table(input_file)
+    
+    return run_tier3_valuation_df(df, output_file, min_score)
+
+
+def run_tier3_valuation_df(df: pd.DataFrame, output_file: str = "top20_buylist.csv",
+                           min_score: int = 70) -> pd.DataFrame:
+    """
+    Run Tier 3 DCF valuation on an in-memory DataFrame of scored companies.
+    
+    Args:
+        df: Tier 2 scored companies
+        output_file: Where to save valued companies
+        min_score: Minimum score to value (default: 70 = ELITE+)
+    
     Returns:
         DataFrame with valuations sorted by implied IRR
     """
@@ -393,43 +630,41 @@ def run_tier3_valuation(input_file: str, output_file: str = "top20_buylist.csv",
     print("TIER 3: DCF VALUATION")
     print(f"{'='*60}")
     
-    print(f"\nLoading data from {input_file}...")
-    df = pd.read_csv(input_file)
-    
     # Filter to ELITE+ only
-    elite_df = df[df["total_score"] >= min_score].copy()
+    elite_df = df[df["total_score"] >= min_score].reset_index(drop=True)
     print(f"Valuing {len(elite_df)} ELITE+ companies...\n")
     
     valuator = DCFValuation()
-    valuations = []
+    val_df = valuator.value_companies(elite_df)
     
-    for i, (idx, row) in enumerate(elite_df.iterrows(), 1):
-        ticker = row.get("ticker", "N/A")
-        print(f"  [{i}/{len(elite_df)}] Valuing {ticker}...", end=" ")
-        
-        val_result = valuator.value_company(row)
-        
-        # Merge with original row data
-        merged = {**row.to_dict(), **val_result}
-        valuations.append(merged)
-        
-        status = val_result.get("valuation_status", "unknown")
-        if status == "complete":
-            irr = val_result.get("implied_irr", 0)
-            action = val_result.get("action_signal", "N/A")
-            print(f"✓ IRR: {irr}% ({action})")
-        else:
-            print(f"⚠️ {status}")
+    # Valuation fields become columns of the (freshly indexed) input rows
+    results_df = elite_df
+    for col in val_df.columns:
+        results_df[col] = val_df[col]
     
-    # Create results DataFrame
-    results_df = pd.DataFrame(valuations)
+    # The batch is already valued, so the per-ticker lines go out in one write
+    tickers = elite_df["ticker"].tolist() if "ticker" in elite_df else ["N/A"] * len(elite_df)
+    lines = [
+        f"  [{i}/{len(elite_df)}] Valuing {ticker}... "
+        + (f"✓ IRR: {irr}% ({action})" if status == "complete" else f"⚠️ {status}")
+        for i, (ticker, status, irr, action) in enumerate(zip(
+            tickers, val_df["valuation_status"], val_df.get("implied_irr", 0), val_df.get("action_signal", "N/A")), 1)
+    ]
+    if lines:
+        print("\n".join(lines))
     
     # Sort by implied IRR descending
     if "implied_irr" in results_df.columns:
         results_df = results_df.sort_values("implied_irr", ascending=False)
     
-    # Save results
-    results_df.to_csv(output_file, index=False)
+    # Save results; a CSV also gets a typed Parquet copy for programmatic reloads
+    write_table(results_df, output_file)
+    parquet_file = artifact_path(output_file, "parquet")
+    if HAS_PYARROW and parquet_file != str(output_file):
+        try:
+            write_table(results_df, parquet_file, compression="zstd")
+        except Exception as e:
+            print(f"\n⚠️  Parquet copy not written: {e}")
     
     # Print summary
     _print_valuation_summary(results_df)
@@ -464,7 +699,7 @@ def _print_valuation_summary(df: pd.DataFrame):
     print(f"{'Ticker':8} {'Score':>6} {'IRR':>7} {'MOS':>7} {'Price':>8} {'Buy@15%':>9} {'Action':>8}")
     print("-" * 70)
     
-    for i, row in complete.head(10).iterrows():
+    for row in complete.head(10).to_dict("records"):
         ticker = row.get("ticker", "N/A")
         score = row.get("total_score", 0)
         irr = row.get("implied_irr", 0)
@@ -480,7 +715,7 @@ def _print_valuation_summary(df: pd.DataFrame):
     if len(buys) > 0:
         print(f"\n🎯 BUY SIGNALS ({len(buys)}):")
         print("-" * 60)
-        for i, row in buys.iterrows():
+        for row in buys.to_dict("records"):
             ticker = row.get("ticker", "")
             irr = row.get("implied_irr", 0)
             mos = row.get("margin_of_safety", 0)
@@ -10,69 +10,163 @@ Usage:
 """
 
 import json
+import os
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from config import FMP_API_KEY
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 # Configuration
 MIN_MARKET_CAP = 1_000_000_000  # $1B
 CALLS_PER_MINUTE = 290  # Stay under 300 limit
 DELAY = 60 / CALLS_PER_MINUTE  # ~0.2 seconds
+MAX_WORKERS = 8  # quote calls in flight; the rate gate still caps calls/min
+QUOTE_BATCH_SIZE = 100  # symbols per comma-separated quote call
 
 # Files
 CANDIDATES_FILE = 'fmp_stock_candidates.json'
 PROGRESS_FILE = 'screening_progress.json'
+LOG_FILE = 'screening_progress.jsonl'   # one line per screened symbol, append-only
 RESULTS_FILE = 'screening_results.json'
 
+def _load(path):
+    """Parse a JSON file (orjson when installed)."""
+    if HAS_ORJSON:
+        return orjson.loads(Path(path).read_bytes())
+    with open(path) as f:
+        return json.load(f)
+
+def _dump(obj, path, indent=False):
+    """Write obj as JSON (orjson when installed)."""
+    if HAS_ORJSON:
+        Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2 if indent else None)
+
+def _json_line(obj):
+    """One LOG_FILE record as bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj) + '\n').encode()
+
+def _migrate_legacy_progress(old):
+    """
+    Rewrite a pre-JSONL progress file (whole lists) as LOG_FILE records.
+    The log is built in a temp file and renamed into place, and skipped if
+    it already exists, so a crash before PROGRESS_FILE is rewritten can't
+    migrate the lists twice.
+    """
+    if not Path(LOG_FILE).exists():
+        rows = {r['symbol']: ('passed', r) for r in old['passed']}
+        rows.update({s: ('failed', {'symbol': s}) for s in old['failed']})
+        tmp = LOG_FILE + '.tmp'
+        with open(tmp, 'wb') as log:
+            for symbol in old['completed']:
+                status, row = rows.get(symbol, ('errors', {'symbol': symbol}))
+                log.write(_json_line({'status': status, **row}))
+        os.replace(tmp, LOG_FILE)
+    save_progress({'started': old.get('started'), 'last_update': old.get('last_update')})
+
 def load_progress():
-    """Load progress from file or initialize."""
-    if Path(PROGRESS_FILE).exists():
-        with open(PROGRESS_FILE) as f:
-            return json.load(f)
-    return {
-        'completed': [],
+    """
+    Progress dict rebuilt from PROGRESS_FILE (start/update times only) and
+    LOG_FILE, which holds one JSON line per screened symbol.
+    'completed' is held as a set in memory.
+    """
+    progress = {
+        'completed': set(),
         'passed': [],
         'failed': [],
         'errors': [],
         'started': datetime.now().isoformat(),
         'last_update': None
     }
+    if Path(PROGRESS_FILE).exists():
+        meta = _load(PROGRESS_FILE)
+        if 'completed' in meta:
+            _migrate_legacy_progress(meta)
+        progress['started'] = meta.get('started', progress['started'])
+        progress['last_update'] = meta.get('last_update')
+    if Path(LOG_FILE).exists():
+        loads = orjson.loads if HAS_ORJSON else json.loads
+        with open(LOG_FILE, 'rb') as f:
+            for line in f:
+                try:
+                    rec = loads(line)
+                except ValueError:
+                    continue  # line cut short by an interrupted write
+                status = rec.pop('status')
+                progress['completed'].add(rec['symbol'])
+                progress[status].append(rec if status == 'passed' else rec['symbol'])
+    return progress
 
 def save_progress(progress):
-    """Save progress to file."""
+    """Save start/update times; results themselves live in LOG_FILE."""
     progress['last_update'] = datetime.now().isoformat()
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f)
+    _dump({'started': progress['started'], 'last_update': progress['last_update']}, PROGRESS_FILE)
+
+# One pooled keep-alive session shared by all workers (reuses TCP/TLS connections)
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+))
+
+_rate_lock = threading.Lock()
+_next_slot = 0.0
 
-def fetch_quote(symbol):
-    """Fetch quote for a single symbol."""
-    url = f'https://financialmodelingprep.com/stable/quote?symbol={symbol}&apikey={FMP_API_KEY}'
+def wait_for_slot():
+    """Block until the next call may start; spaces call starts DELAY apart across all threads."""
+    global _next_slot
+    with _rate_lock:
+        now = time.monotonic()
+        slot = max(now, _next_slot)
+        _next_slot = slot + DELAY
+    if slot > now:
+        time.sleep(slot - now)
+
+def fetch_quotes_batch(symbols):
+    """
+    Fetch quotes for a batch of symbols in one call; returns {symbol: quote},
+    or None when the call itself failed (transport error, non-200 after retries).
+    """
+    url = f'https://financialmodelingprep.com/stable/quote?symbol={",".join(symbols)}&apikey={FMP_API_KEY}'
     try:
-        r = requests.get(url, timeout=10)
-        if r.status_code == 200:
-            data = r.json()
-            if data and len(data) > 0:
-                return data[0]
+        r = _SESSION.get(url, timeout=30)
+        if r.status_code != 200:
+            return None
+        data = r.json()
+        return {q.get('symbol'): q for q in data or []}
+    except Exception:
         return None
-    except Exception as e:
-        return {'error': str(e)}
 
 def run_screening():
     """Run the market cap screening."""
     # Load candidates
-    with open(CANDIDATES_FILE) as f:
-        candidates = json.load(f)
+    candidates = _load(CANDIDATES_FILE)
     
     symbols = [c['symbol'] for c in candidates]
     
     # Load progress
     progress = load_progress()
-    completed = set(progress['completed'])
+    completed = progress['completed']
     
     # Find remaining
     remaining = [s for s in symbols if s not in completed]
+    batches = [remaining[i:i + QUOTE_BATCH_SIZE] for i in range(0, len(remaining), QUOTE_BATCH_SIZE)]
     
     print("="*60)
     print("FMP UNIVERSE SCREENER - Stage 2: Market Cap Filter")
@@ -81,8 +175,8 @@ def run_screening():
     print(f"Already completed: {len(completed)}")
     print(f"Remaining: {len(remaining)}")
     print(f"Passed so far: {len(progress['passed'])} (MCap > ${MIN_MARKET_CAP/1e9:.0f}B)")
-    print(f"Rate: {CALLS_PER_MINUTE}/min")
-    print(f"ETA: {len(remaining) * DELAY / 60:.1f} minutes")
+    print(f"Rate: {CALLS_PER_MINUTE}/min ({MAX_WORKERS} workers, {QUOTE_BATCH_SIZE} symbols/call)")
+    print(f"ETA: {len(batches) * DELAY / 60:.1f} minutes")
     print("="*60)
     
     if not remaining:
@@ -93,48 +187,66 @@ def run_screening():
     time.sleep(3)
     
     start_time = time.time()
+    save_progress(progress)  # so --status sees this run even after a hard kill
+    
+    def fetch(batch):
+        wait_for_slot()
+        return fetch_quotes_batch(batch)
     
-    for i, symbol in enumerate(remaining):
-        # Progress bar
-        total_done = len(completed) + i + 1
-        pct = total_done / len(symbols) * 100
-        passed_cnt = len(progress['passed'])
-        
-        print(f"\r[{total_done}/{len(symbols)}] {pct:.1f}% | Passed: {passed_cnt} | Current: {symbol:<6}", end='', flush=True)
-        
-        # Fetch quote
-        quote = fetch_quote(symbol)
-        
-        if quote and 'error' not in quote:
-            mcap = quote.get('marketCap', 0) or 0
-            if mcap >= MIN_MARKET_CAP:
-                progress['passed'].append({
-                    'symbol': symbol,
-                    'name': quote.get('name', ''),
-                    'marketCap': mcap,
-                    'price': quote.get('price', 0),
-                    'exchange': quote.get('exchange', '')
-                })
-            else:
-                progress['failed'].append(symbol)
-        else:
-            progress['errors'].append(symbol)
-        
-        progress['completed'].append(symbol)
-        
-        # Save progress every 100 symbols
-        if (i + 1) % 100 == 0:
-            save_progress(progress)
-        
-        # Rate limiting
-        time.sleep(DELAY)
+    retry_later = 0
+    ex = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    futures = {ex.submit(fetch, b): b for b in batches}
+    log = open(LOG_FILE, 'ab')
+    try:
+        for future in as_completed(futures):
+            batch = futures[future]
+            quotes = future.result()
+            if quotes is None:
+                # Failed call: leave the batch out of completed so a resume retries it
+                retry_later += len(batch)
+                continue
+            
+            # Symbols missing from a good response count as errors
+            for symbol in batch:
+                quote = quotes.get(symbol)
+                if quote:
+                    mcap = quote.get('marketCap', 0) or 0
+                    if mcap >= MIN_MARKET_CAP:
+                        status, row = 'passed', {
+                            'symbol': symbol,
+                            'name': quote.get('name', ''),
+                            'marketCap': mcap,
+                            'price': quote.get('price', 0),
+                            'exchange': quote.get('exchange', '')
+                        }
+                    else:
+                        status, row = 'failed', {'symbol': symbol}
+                else:
+                    status, row = 'errors', {'symbol': symbol}
+                
+                progress[status].append(row if status == 'passed' else symbol)
+                completed.add(symbol)
+                log.write(_json_line({'status': status, **row}))
+            log.flush()
+            
+            # Progress bar
+            total_done = len(completed)
+            pct = total_done / len(symbols) * 100
+            passed_cnt = len(progress['passed'])
+            
+            print(f"\r[{total_done}/{len(symbols)}] {pct:.1f}% | Passed: {passed_cnt} | Batch: {batch[0]:<6}", end='', flush=True)
+    except KeyboardInterrupt:
+        save_progress(progress)
+        raise
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+        log.close()
     
     # Final save
     save_progress(progress)
     
     # Save results
-    with open(RESULTS_FILE, 'w') as f:
-        json.dump(progress['passed'], f, indent=2)
+    _dump(progress['passed'], RESULTS_FILE, indent=True)
     
     elapsed = time.time() - start_time
     print(f"\n\n{'='*60}")
@@ -144,18 +256,19 @@ def run_screening():
     print(f"Passed (MCap > $1B): {len(progress['passed'])}")
     print(f"Failed: {len(progress['failed'])}")
     print(f"Errors: {len(progress['errors'])}")
+    if retry_later:
+        print(f"Failed calls: {retry_later} symbols left for the next run")
     print(f"Time: {elapsed/60:.1f} minutes")
     print(f"\nResults saved to: {RESULTS_FILE}")
 
 def show_status():
     """Show current screening status."""
-    if not Path(PROGRESS_FILE).exists():
+    if not Path(PROGRESS_FILE).exists() and not Path(LOG_FILE).exists():
         print("No screening in progress.")
         return
     
     progress = load_progress()
-    with open(CANDIDATES_FILE) as f:
-        candidates = json.load(f)
+    candidates = _load(CANDIDATES_FILE)
     
     print("="*60)
     print("SCREENING STATUS")
@@ -177,7 +290,7 @@ def show_status():
 
 def reset_screening():
     """Reset screening progress."""
-    for f in [PROGRESS_FILE, RESULTS_FILE]:
+    for f in [PROGRESS_FILE, LOG_FILE, RESULTS_FILE]:
         if Path(f).exists():
             Path(f).unlink()
             print(f"Deleted: {f}")